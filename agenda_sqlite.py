@@ -0,0 +1,109 @@
+"""Jobstore do APScheduler no banco SQLite do bot (tabela `agendamentos`).
+
+Os agendamentos sobrevivem a reinícios: cada job guarda o próximo disparo, e um disparo que
+venceu com o processo parado é executado (ou descartado como atrasado demais) na volta.
+Mesmo formato do SQLAlchemyJobStore: estado do job em pickle e próximo disparo em timestamp UTC.
+"""
+import pickle
+import sqlite3
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+import db_sqlite
+
+
+class SQLiteJobStore(BaseJobStore):
+    """Guarda os jobs em `agendamentos` usando a conexão da thread (`db_sqlite.get_connection`)."""
+
+    def __init__(self, pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.pickle_protocol = pickle_protocol
+
+    def lookup_job(self, job_id):
+        row = db_sqlite.get_connection().execute(
+            "SELECT job_state FROM agendamentos WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        row = db_sqlite.get_connection().execute(
+            "SELECT next_run_time FROM agendamentos WHERE next_run_time IS NOT NULL ORDER BY next_run_time LIMIT 1"
+        ).fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        conn = db_sqlite.get_connection()
+        try:
+            conn.execute(
+                "INSERT INTO agendamentos (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                (job.id, datetime_to_utc_timestamp(job.next_run_time),
+                 pickle.dumps(job.__getstate__(), self.pickle_protocol)),
+            )
+            conn.commit()
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        conn = db_sqlite.get_connection()
+        cur = conn.execute(
+            "UPDATE agendamentos SET next_run_time = ?, job_state = ? WHERE id = ?",
+            (datetime_to_utc_timestamp(job.next_run_time),
+             pickle.dumps(job.__getstate__(), self.pickle_protocol), job.id),
+        )
+        conn.commit()
+        if cur.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        conn = db_sqlite.get_connection()
+        cur = conn.execute("DELETE FROM agendamentos WHERE id = ?", (job_id,))
+        conn.commit()
+        if cur.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        conn = db_sqlite.get_connection()
+        conn.execute("DELETE FROM agendamentos")
+        conn.commit()
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where="", params=()):
+        jobs = []
+        falhos = []
+        rows = db_sqlite.get_connection().execute(
+            f"SELECT id, job_state FROM agendamentos {where} ORDER BY next_run_time", params
+        ).fetchall()
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except Exception:
+                self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                falhos.append(job_id)
+        # Jobs que não podem mais ser restaurados (ex.: função renomeada) saem da tabela
+        if falhos:
+            conn = db_sqlite.get_connection()
+            conn.executemany("DELETE FROM agendamentos WHERE id = ?", [(f,) for f in falhos])
+            conn.commit()
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (banco={db_sqlite.DB_PATH})>"
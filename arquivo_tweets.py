@@ -0,0 +1,291 @@
+"""Exportação e importação do histórico de tweets em stream (backup, análise e recarga).
+
+O formato vem da extensão do arquivo:
+- `.jsonl` / `.jsonl.gz`: um tweet por linha, {"id", "tweet_text", "type", "created_at", "perfil"};
+- `.parquet`: colunar com zstd, se o pyarrow estiver instalado;
+- `.ltw`: colunar empacotado só com a biblioteca padrão (blocos de colunas comprimidos com zlib).
+
+Nada carrega a tabela inteira: a exportação lê com `db_sqlite.iterar_tweets` e grava um bloco
+por vez, e a importação lê e grava um bloco por transação, então a memória usada depende de
+ARQUIVO_LOTE e não do tamanho do histórico.
+"""
+import gzip
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timezone
+
+import db_sqlite
+
+ARQUIVO_LOTE = int(os.getenv('ARQUIVO_LOTE', '10000'))
+
+COLUNAS = ('id', 'tweet_text', 'type', 'created_at', 'perfil')
+
+# Formato .ltw: cabeçalho e, para cada bloco, (linhas, bytes comprimidos) seguidos do bloco em zlib.
+# Dentro do bloco, cada coluna é uma seção (tamanho + bytes): ids em delta, created_at em delta de
+# segundos (ou texto, se algum valor não estiver no formato do SQLite), dicionário de types e
+# códigos de cada linha, textos e dicionário/códigos de perfis. Inteiros em little-endian.
+LTW_MAGICO = b'LAURATW\x02'
+_BLOCO = struct.Struct('<II')
+_SECAO = struct.Struct('<I')
+_NULO = 0xFFFFFFFF  # tamanho que marca texto NULL
+_DATA_SEGUNDOS, _DATA_TEXTO = 0, 1
+
+
+def formato(caminho: str) -> str:
+    nome = caminho.lower()
+    for sufixo, fmt in (('.jsonl.gz', 'jsonl.gz'), ('.jsonl', 'jsonl'), ('.parquet', 'parquet'), ('.ltw', 'ltw')):
+        if nome.endswith(sufixo):
+            return fmt
+    raise ValueError(f"extensão desconhecida em {caminho} (use .jsonl, .jsonl.gz, .parquet ou .ltw)")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow, pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet precisa do pyarrow (pip install pyarrow); sem ele use .ltw ou .jsonl.gz")
+
+
+def exportar(caminho: str, lote: int = None) -> int:
+    """Grava todos os tweets (em ordem de id) em `caminho`; retorna quantos foram exportados.
+
+    O arquivo é escrito num temporário e só substitui `caminho` no fim, então uma exportação
+    interrompida não deixa um backup pela metade.
+    """
+    fmt = formato(caminho)
+    blocos = db_sqlite.iterar_tweets(lote or ARQUIVO_LOTE)
+    temporario = caminho + '.tmp'
+    try:
+        if fmt == 'parquet':
+            total = _exportar_parquet(temporario, blocos)
+        elif fmt == 'ltw':
+            with open(temporario, 'wb') as f:
+                total = _exportar_ltw(f, blocos)
+        else:
+            abrir = gzip.open if fmt == 'jsonl.gz' else open
+            with abrir(temporario, 'wt', encoding='utf-8', newline='\n') as f:
+                total = 0
+                for rows in blocos:
+                    f.writelines(json.dumps(dict(r), ensure_ascii=False) + '\n' for r in rows)
+                    total += len(rows)
+        os.replace(temporario, caminho)
+        return total
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def ler(caminho: str, lote: int = None):
+    """Lê `caminho` em blocos de até `lote` tuplas (id, tweet_text, type, created_at, perfil).
+
+    Arquivos sem perfil (anteriores aos perfis) trazem o perfil padrão.
+    """
+    lote = lote or ARQUIVO_LOTE
+    fmt = formato(caminho)
+    if fmt == 'parquet':
+        _, pq = _pyarrow()
+        arquivo = pq.ParquetFile(caminho)
+        colunas = [c for c in COLUNAS if c in arquivo.schema_arrow.names]
+        for batch in arquivo.iter_batches(batch_size=lote, columns=colunas):
+            d = batch.to_pydict()
+            d.setdefault('perfil', [db_sqlite.PERFIL_PADRAO] * batch.num_rows)
+            yield list(zip(*(d[c] for c in COLUNAS)))
+    elif fmt == 'ltw':
+        with open(caminho, 'rb') as f:
+            # Os blocos do arquivo têm o tamanho da exportação; aqui saem no tamanho pedido
+            pendentes = []
+            for linhas in _ler_ltw(f):
+                pendentes.extend(linhas)
+                while len(pendentes) >= lote:
+                    yield pendentes[:lote]
+                    del pendentes[:lote]
+            if pendentes:
+                yield pendentes
+    else:
+        abrir = gzip.open if fmt == 'jsonl.gz' else open
+        with abrir(caminho, 'rt', encoding='utf-8') as f:
+            linhas = []
+            for n, linha in enumerate(f, 1):
+                if not linha.strip():
+                    continue
+                try:
+                    t = json.loads(linha)
+                    linhas.append((t.get('id'), t['tweet_text'], t['type'], t.get('created_at'),
+                                   t.get('perfil') or db_sqlite.PERFIL_PADRAO))
+                except (ValueError, KeyError) as e:
+                    raise ValueError(f"{caminho}:{n}: linha inválida ({e})")
+                if len(linhas) >= lote:
+                    yield linhas
+                    linhas = []
+            if linhas:
+                yield linhas
+
+
+def importar(caminho: str, lote: int = None, manter_ids: bool = False) -> int:
+    """Grava no banco os tweets de `caminho`, um bloco por transação; retorna quantos entraram.
+
+    Com `manter_ids` (restauração), os ids do arquivo são mantidos e os que já existem no banco
+    são ignorados; sem ele, o arquivo é anexado ao histórico com ids novos.
+    """
+    total = 0
+    for linhas in ler(caminho, lote):
+        if manter_ids and any(l[0] is None for l in linhas):
+            raise ValueError(f"{caminho}: tweet sem id; importe sem manter os ids")
+        total += db_sqlite.importar_tweets(linhas, manter_ids=manter_ids)
+    return total
+
+
+def _exportar_parquet(caminho, blocos) -> int:
+    pa, pq = _pyarrow()
+    esquema = pa.schema([('id', pa.int64()), ('tweet_text', pa.string()), ('type', pa.string()),
+                         ('created_at', pa.string()), ('perfil', pa.string())])
+    total = 0
+    with pq.ParquetWriter(caminho, esquema, compression='zstd', use_dictionary=['type', 'perfil']) as w:
+        for rows in blocos:
+            # Um row group por bloco lido do banco
+            w.write_table(pa.Table.from_pylist([dict(r) for r in rows], schema=esquema))
+            total += len(rows)
+    return total
+
+
+def _le(a: array) -> bytes:
+    if sys.byteorder == 'big':
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _de_le(typecode: str, dados) -> array:
+    a = array(typecode)
+    a.frombytes(dados)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a
+
+
+def _empacotar_textos(valores) -> bytes:
+    codificados = [None if v is None else v.encode('utf-8') for v in valores]
+    tamanhos = array('I', (_NULO if c is None else len(c) for c in codificados))
+    return _le(tamanhos) + b''.join(c for c in codificados if c)
+
+
+def _desempacotar_textos(dados, n: int) -> list:
+    tamanhos = _de_le('I', dados[:4 * n])
+    valores = []
+    pos = 4 * n
+    for t in tamanhos:
+        if t == _NULO:
+            valores.append(None)
+        else:
+            valores.append(str(dados[pos:pos + t], 'utf-8'))
+            pos += t
+    return valores
+
+
+def _deltas(valores) -> array:
+    d = array('q', valores)
+    for i in range(len(d) - 1, 0, -1):
+        d[i] -= d[i - 1]
+    return d
+
+
+def _acumular(d: array) -> list:
+    valores = d.tolist()
+    for i in range(1, len(valores)):
+        valores[i] += valores[i - 1]
+    return valores
+
+
+def _segundos(valores):
+    """created_at ('AAAA-MM-DD HH:MM:SS', UTC) em segundos; None se algum valor não voltar idêntico."""
+    segundos = []
+    for v in valores:
+        if v is None or len(v) != 19:
+            return None
+        try:
+            dt = datetime.fromisoformat(v)
+        except ValueError:
+            return None
+        if dt.isoformat(' ') != v:
+            return None
+        segundos.append(int(dt.replace(tzinfo=timezone.utc).timestamp()))
+    return segundos
+
+
+def _dicionario(valores) -> list:
+    """Seções (dicionário, códigos) de uma coluna com poucos valores distintos."""
+    dicionario = list(dict.fromkeys(valores))
+    indice = {v: i for i, v in enumerate(dicionario)}
+    codigos = array('H' if len(dicionario) <= 0xFFFF else 'I', (indice[v] for v in valores))
+    return [_SECAO.pack(len(dicionario)) + _empacotar_textos(dicionario), _le(codigos)]
+
+
+def _de_dicionario(s_dicionario, s_codigos, n: int) -> list:
+    (k,) = _SECAO.unpack_from(s_dicionario)
+    dicionario = _desempacotar_textos(s_dicionario[_SECAO.size:], k)
+    # Largura dos códigos (2 ou 4 bytes) vem do tamanho da seção
+    return [dicionario[c] for c in _de_le('H' if len(s_codigos) == 2 * n else 'I', s_codigos)]
+
+
+def _exportar_ltw(f, blocos) -> int:
+    f.write(LTW_MAGICO)
+    total = 0
+    for rows in blocos:
+        n = len(rows)
+        ids, textos, tipos, datas, perfis = zip(*rows)
+        segundos = _segundos(datas)
+        secoes = [
+            _le(_deltas(ids)),
+            _le(_deltas(segundos)) if segundos is not None else _empacotar_textos(datas),
+            *_dicionario(tipos),
+            _empacotar_textos(textos),
+            *_dicionario(perfis),
+        ]
+        bruto = struct.pack('<B', _DATA_TEXTO if segundos is None else _DATA_SEGUNDOS)
+        bruto += b''.join(_SECAO.pack(len(s)) + s for s in secoes)
+        comprimido = zlib.compress(bruto, 6)
+        f.write(_BLOCO.pack(n, len(comprimido)))
+        f.write(comprimido)
+        total += n
+    return total
+
+
+def _ler_ltw(f):
+    if f.read(len(LTW_MAGICO)) != LTW_MAGICO:
+        raise ValueError(f"{f.name}: não é um arquivo .ltw desta versão")
+    while True:
+        cabecalho = f.read(_BLOCO.size)
+        if not cabecalho:
+            return
+        if len(cabecalho) < _BLOCO.size:
+            raise ValueError(f"{f.name}: arquivo truncado")
+        n, tamanho = _BLOCO.unpack(cabecalho)
+        comprimido = f.read(tamanho)
+        if len(comprimido) < tamanho:
+            raise ValueError(f"{f.name}: arquivo truncado")
+        bruto = memoryview(zlib.decompress(comprimido))
+        modo_data = bruto[0]
+        secoes = []
+        pos = 1
+        while pos < len(bruto):
+            (t,) = _SECAO.unpack_from(bruto, pos)
+            secoes.append(bruto[pos + _SECAO.size:pos + _SECAO.size + t])
+            pos += _SECAO.size + t
+        s_ids, s_datas, s_tipos, s_codigos, s_textos, s_perfis, s_codigos_perfis = secoes
+        ids = _acumular(_de_le('q', s_ids))
+        if modo_data == _DATA_SEGUNDOS:
+            datas = [datetime.fromtimestamp(s, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                     for s in _acumular(_de_le('q', s_datas))]
+        else:
+            datas = _desempacotar_textos(s_datas, n)
+        tipos = _de_dicionario(s_tipos, s_codigos, n)
+        textos = _desempacotar_textos(s_textos, n)
+        perfis = _de_dicionario(s_perfis, s_codigos_perfis, n)
+        yield list(zip(ids, textos, tipos, datas, perfis))
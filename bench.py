@@ -0,0 +1,1891 @@
+"""Benchmarks locais (sem rede) das rotinas do bot.
+
+Uso:
+    python3 bench.py recent --sizes 100 10000 1000000
+    python3 bench.py pool --n 2000
+    python3 bench.py escrita --n 5000 --lotes 1 8 32 128 512
+    python3 bench.py publish --n 500
+    python3 bench.py arquivo --linhas 200000 2000000
+    python3 bench.py semana
+    python3 bench.py agenda
+    python3 bench.py tom-local --db tweets.db
+    python3 bench.py llm --n 20
+    python3 bench.py stream --n 30 --ruins 0.3
+    python3 bench.py candidatos --n 30 --ruins 0.5
+    python3 bench.py similares --sizes 1000 100000 1000000
+    python3 bench.py prefixo --n 20
+    python3 bench.py cache --janelas 20 --rodadas 5
+    python3 bench.py arranque --n 10
+    python3 bench.py chamadas
+    python3 bench.py e2e --sizes 0 1000 100000 --saida e2e.json
+    python3 bench.py perfis --n 100 --workers 1 16
+    python3 bench.py verificar
+
+`verificar` roda só as conferências (✅/❌) e sai com erro se alguma falhar; os demais medem tempo.
+Cada benchmark usa um banco SQLite temporário; o `tweets.db` do projeto não é tocado.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# O banco e a telemetria temporários precisam ser definidos antes de importar db_sqlite/novo
+_TMP_DIR = tempfile.mkdtemp(prefix='laura-bench-')
+os.environ['SQLITE_DB_PATH'] = os.path.join(_TMP_DIR, 'bench.db')
+os.environ.setdefault('TRACE_JSONL_PATH', os.path.join(_TMP_DIR, 'traces.jsonl'))
+os.environ.setdefault('METRICS_PROM_PATH', os.path.join(_TMP_DIR, 'metrics.prom'))
+os.environ.setdefault('OPENROUTER_API_KEY', 'bench')
+
+import db_sqlite  # noqa: E402
+
+ACOES = ['bom_dia', 'boa_tarde', 'boa_noite', 'sextou_bom_dia', 'sextou_boa_tarde']
+
+
+def _reset_db(path):
+    db_sqlite.fechar_conexoes()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db_sqlite.DB_PATH = path
+    db_sqlite.init_db()
+
+
+def _seed(n, chunk=50_000, sem_tom=0.0, texto=None):
+    """Insere `n` tweets sintéticos com created_at crescente e type func:tone_key.
+
+    Uma fração `sem_tom` fica com type só da função (histórico antigo), o que obriga a classificar o tom.
+    `texto(i)` gera o texto de cada tweet (padrão: "tweet sintético i").
+    """
+    from novo import TONES
+    keys = [t['key'] for t in TONES]
+    base = time.time() - n * 60
+    conn = db_sqlite.get_connection()
+    for start in range(0, n, chunk):
+        rows = []
+        for i in range(start, min(n, start + chunk)):
+            ts = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(base + i * 60))
+            tipo = random.choice(ACOES) if random.random() < sem_tom else f"{random.choice(ACOES)}:{random.choice(keys)}"
+            rows.append((texto(i) if texto else f"tweet sintético {i}", tipo, ts))
+        conn.executemany("INSERT INTO tweets (tweet_text, type, created_at) VALUES (?, ?, ?)", rows)
+        conn.commit()
+
+
+def _medir(fn, repeticoes):
+    amostras = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        amostras.append((time.perf_counter() - t0) * 1000)
+    amostras.sort()
+    return statistics.median(amostras), amostras[int(len(amostras) * 0.95) - 1]
+
+
+class _ClienteProibido:
+    """Cliente LLM que falha se for chamado: com 'type' preenchido a classificação não deve ir à rede."""
+
+    class chat:
+        class completions:
+            @staticmethod
+            async def create(**kwargs):
+                raise RuntimeError("chamada LLM inesperada no benchmark")
+
+
+def bench_recent(sizes, repeticoes):
+    import novo
+    novo.async_client = _ClienteProibido()
+    print(f"{'tweets':>10} | {'recent(5) ms':>14} | {'por função ms':>14} | {'_preparar_tom ms':>17}")
+    for n in sizes:
+        _reset_db(os.path.join(_TMP_DIR, f'recent-{n}.db'))
+        _seed(n)
+        r = _medir(lambda: db_sqlite.recent_tweets(5), repeticoes)
+        f = _medir(lambda: db_sqlite.recent_tweets(5, 'bom_dia'), repeticoes)
+        a = _medir(lambda: novo._preparar_tom(), repeticoes)
+        print(f"{n:>10} | {r[0]:>6.3f} p95 {r[1]:>5.3f} | {f[0]:>6.3f} p95 {f[1]:>5.3f} | {a[0]:>8.3f} p95 {a[1]:>5.3f}")
+    print(f"Chamadas LLM: {novo.llm_calls or 0}")
+
+
+def _legado_inserir(path, texto, tipo):
+    """Inserção como era antes do pool: conexão nova por chamada, sem pragmas."""
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO tweets (tweet_text, type) VALUES (?, ?)", (texto, tipo))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def _legado_recentes(path, limit):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    cur.execute("SELECT id, tweet_text, type, created_at FROM tweets ORDER BY created_at DESC, id DESC LIMIT ?", (limit,))
+    rows = [dict(r) for r in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return rows
+
+
+def _vazao(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return n / (time.perf_counter() - t0)
+
+
+def _leituras_com_escritor(ler, escrever, segundos=1.0, leitores=4):
+    """Leituras/s de `leitores` threads enquanto uma thread escreve sem parar."""
+    parar = threading.Event()
+    contagem = [0] * leitores
+    erros = []
+
+    def escritor():
+        i = 0
+        while not parar.is_set():
+            try:
+                escrever(i)
+            except Exception as e:
+                erros.append(e)
+            i += 1
+
+    def leitor(idx):
+        while not parar.is_set():
+            try:
+                ler()
+                contagem[idx] += 1
+            except Exception as e:
+                erros.append(e)
+
+    threads = [threading.Thread(target=escritor)] + [threading.Thread(target=leitor, args=(i,)) for i in range(leitores)]
+    for t in threads:
+        t.start()
+    time.sleep(segundos)
+    parar.set()
+    for t in threads:
+        t.join()
+    return sum(contagem) / segundos, len(erros)
+
+
+def bench_pool(n):
+    legado = os.path.join(_TMP_DIR, 'legado.db')
+    _reset_db(legado)
+    db_sqlite.fechar_conexoes()
+    # O banco legado fica no journal padrão (DELETE), como antes do pool
+    conn = sqlite3.connect(legado)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+
+    _reset_db(os.path.join(_TMP_DIR, 'pool.db'))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ins_legado = _vazao(lambda i: _legado_inserir(legado, f"t{i}", "bom_dia:fofo_carinho"), n)
+        ins_pool = _vazao(lambda i: db_sqlite.inserir_last_tweet(f"t{i}", "bom_dia:fofo_carinho"), n)
+    ler_legado = _vazao(lambda i: _legado_recentes(legado, 5), n)
+    ler_pool = _vazao(lambda i: db_sqlite.recent_tweets(5), n)
+    conc_legado, err_legado = _leituras_com_escritor(
+        lambda: _legado_recentes(legado, 5),
+        lambda i: _legado_inserir(legado, f"c{i}", "boa_noite:calmo_acolhedor"),
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        conc_pool, err_pool = _leituras_com_escritor(
+            lambda: db_sqlite.recent_tweets(5),
+            lambda i: db_sqlite.inserir_last_tweet(f"c{i}", "boa_noite:calmo_acolhedor"),
+        )
+
+    print(f"{'':<32} | {'por chamada':>12} | {'pool + WAL':>12}")
+    print(f"{'inserções/s':<32} | {ins_legado:>12.0f} | {ins_pool:>12.0f}")
+    print(f"{'leituras/s':<32} | {ler_legado:>12.0f} | {ler_pool:>12.0f}")
+    print(f"{'leituras/s com escritor ativo':<32} | {conc_legado:>12.0f} | {conc_pool:>12.0f}")
+    print(f"{'erros (locks) com escritor':<32} | {err_legado:>12} | {err_pool:>12}")
+
+
+def bench_escrita(n, lotes, intervalo_ms):
+    """Gravação de tweets: um commit por tweet no caminho de quem publica x fila em lotes (write-behind).
+
+    O que importa é o tempo que quem publica fica parado por tweet; a vazão até o último commit
+    aparece só como referência (a fila grava com synchronous=FULL, o direto com NORMAL).
+    """
+    import fila_gravacao
+
+    random.seed(3)
+    textos = [_mensagem_fake(str(i)) for i in range(n)]
+    print(f"{'modo':<20} | {'inserções/s':>11} | {'chamador p50 µs':>15} | {'chamador p99 µs':>15} | {'lotes':>6}")
+
+    _reset_db(os.path.join(_TMP_DIR, 'escrita-direto.db'))
+    chamador = []
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for texto in textos:
+            t1 = time.perf_counter()
+            db_sqlite.inserir_last_tweet(texto, "bom_dia:fofo_carinho")
+            chamador.append((time.perf_counter() - t1) * 1e6)
+    total = time.perf_counter() - t0
+    print(f"{'direto (1 commit)':<20} | {n / total:>11.0f} | {statistics.median(chamador):>15.1f} | "
+          f"{_percentil(chamador, 0.99):>15.1f} | {n:>6}")
+
+    for lote in lotes:
+        _reset_db(os.path.join(_TMP_DIR, f'escrita-{lote}.db'))
+        fila = fila_gravacao.FilaGravacao(max_lote=lote, intervalo_ms=intervalo_ms)
+        chamador = []
+        t0 = time.perf_counter()
+        futuros = []
+        for texto in textos:
+            t1 = time.perf_counter()
+            futuros.append(fila.enviar(texto, "bom_dia:fofo_carinho"))
+            chamador.append((time.perf_counter() - t1) * 1e6)
+        for f in futuros:
+            f.result()
+        total = time.perf_counter() - t0
+        fila.fechar()
+        gravados = db_sqlite.get_connection().execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+        if gravados != n or fila.stats["erros"]:
+            raise SystemExit(f"❌ lote {lote}: {gravados} de {n} gravados, {fila.stats['erros']} erro(s)")
+        print(f"{'fila, lote ' + str(lote):<20} | {n / total:>11.0f} | {statistics.median(chamador):>15.1f} | "
+              f"{_percentil(chamador, 0.99):>15.1f} | {fila.stats['lotes']:>6}")
+
+
+def _filho_arquivo(operacao, db_path, caminho, lote):
+    """Roda num processo novo: (tweets, segundos, pico de RSS acima do de partida em MB)."""
+    import arquivo_tweets
+    db_sqlite.DB_PATH = db_path
+    # Sem mmap, páginas do arquivo lidas pelo SQLite não contam como memória do processo
+    db_sqlite.PRAGMAS = tuple(p for p in db_sqlite.PRAGMAS if 'mmap_size' not in p)
+    db_sqlite.init_db()
+    # Zera o pico (VmHWM) para medir só a operação, não as importações do processo
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    base = _memoria_kb('VmRSS')
+    t0 = time.perf_counter()
+    if operacao == 'exportar':
+        total = arquivo_tweets.exportar(caminho, lote)
+    elif operacao == 'importar':
+        total = arquivo_tweets.importar(caminho, lote, manter_ids=True)
+    else:
+        # Referência: a tabela inteira em memória como dicts (como fazia o antigo listar_tweets)
+        rows = db_sqlite.get_connection().execute("SELECT id, tweet_text, type, created_at FROM tweets").fetchall()
+        total = len([dict(r) for r in rows])
+    segundos = time.perf_counter() - t0
+    return total, segundos, (_memoria_kb('VmHWM') - base) / 1024
+
+
+def _memoria_kb(campo):
+    with open('/proc/self/status') as f:
+        for linha in f:
+            if linha.startswith(campo + ':'):
+                return int(linha.split()[1])
+    raise RuntimeError(f"{campo} indisponível em /proc/self/status")
+
+
+def _em_processo_novo(*args):
+    """Executa `_filho_arquivo` num processo próprio (spawn), para o pico de memória ser só daquela operação."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as ex:
+        return ex.submit(_filho_arquivo, *args).result()
+
+
+def bench_arquivo(linhas, lote, formatos):
+    """Exportação e importação em stream de bancos sintéticos com milhões de tweets.
+
+    Cada operação roda num processo novo e mede o pico de memória acima do de partida; a
+    importação restaura os ids e é conferida linha a linha contra o banco de origem.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        if 'parquet' in formatos:
+            print("ℹ️ pyarrow não instalado: Parquet fica de fora")
+            formatos = [f for f in formatos if f != 'parquet']
+    random.seed(5)
+    print(f"{'tweets':>9} | {'formato':<9} | {'MB':>7} | {'exporta/s':>9} | {'RSS exp MB':>10} | "
+          f"{'importa/s':>9} | {'RSS imp MB':>10}")
+    for n in linhas:
+        origem = os.path.join(_TMP_DIR, f'arquivo-{n}.db')
+        _reset_db(origem)
+        _seed(n, texto=lambda i: _mensagem_fake(str(i)))
+        db_sqlite.fechar_conexoes()
+        total, seg, rss = _em_processo_novo('listar', origem, None, lote)
+        print(f"{n:>9} | {'(listar)':<9} | {'':>7} | {total / seg:>9.0f} | {rss:>10.1f} | {'':>9} | {'':>10}")
+        for fmt in formatos:
+            caminho = os.path.join(_TMP_DIR, f'arquivo-{n}.{fmt}')
+            exportados, seg_exp, rss_exp = _em_processo_novo('exportar', origem, caminho, lote)
+            destino = os.path.join(_TMP_DIR, f'arquivo-{n}-{fmt.replace(".", "-")}.db')
+            _reset_db(destino)
+            db_sqlite.fechar_conexoes()
+            importados, seg_imp, rss_imp = _em_processo_novo('importar', destino, caminho, lote)
+            conn = sqlite3.connect(destino)
+            conn.execute("ATTACH DATABASE ? AS origem", (origem,))
+            iguais = conn.execute(
+                "SELECT COUNT(*) FROM tweets t JOIN origem.tweets o ON o.id = t.id WHERE o.tweet_text = t.tweet_text "
+                "AND o.type = t.type AND o.created_at IS t.created_at"
+            ).fetchone()[0]
+            conn.close()
+            if not (exportados == importados == iguais == n):
+                raise SystemExit(f"❌ {fmt} com {n} tweets: {exportados} exportados, {importados} importados, "
+                                 f"{iguais} idênticos à origem")
+            print(f"{n:>9} | {fmt:<9} | {os.path.getsize(caminho) / 1e6:>7.1f} | {n / seg_exp:>9.0f} | {rss_exp:>10.1f} | "
+                  f"{n / seg_imp:>9.0f} | {rss_imp:>10.1f}")
+            os.remove(destino)
+    print("✅ Todos os arquivos voltaram idênticos ao banco de origem")
+    return _conferir_arquivo_sem_data(formatos)
+
+
+def _conferir_arquivo_sem_data(formatos):
+    """Tweet sem created_at no arquivo: entra com o horário da importação (nunca NULL) e volta igual em cada formato."""
+    import json
+    import arquivo_tweets
+
+    entrada = os.path.join(_TMP_DIR, 'sem-data.jsonl')
+    with open(entrada, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"id": 1, "tweet_text": "com data", "type": "bom_dia:fofo_carinho",
+                            "created_at": "2026-01-02 03:04:05"}) + '\n')
+        f.write(json.dumps({"id": 2, "tweet_text": "sem data", "type": "bom_dia:fofo_carinho"}) + '\n')
+    checagens = []
+    for manter_ids in (True, False):
+        _reset_db(os.path.join(_TMP_DIR, 'sem-data.db'))
+        arquivo_tweets.importar(entrada, manter_ids=manter_ids)
+        datas = dict(db_sqlite.get_connection().execute("SELECT tweet_text, created_at FROM tweets").fetchall())
+        checagens.append((f"sem created_at {'mantendo' if manter_ids else 'sem manter'} os ids: horário da importação",
+                          datas.get("com data") == "2026-01-02 03:04:05" and datas.get("sem data") is not None))
+    for fmt in formatos:
+        caminho = os.path.join(_TMP_DIR, f'sem-data.{fmt}')
+        arquivo_tweets.exportar(caminho)
+        origem = db_sqlite.get_connection().execute("SELECT tweet_text, created_at FROM tweets ORDER BY id").fetchall()
+        _reset_db(os.path.join(_TMP_DIR, f'sem-data-{fmt.replace(".", "-")}.db'))
+        arquivo_tweets.importar(caminho, manter_ids=True)
+        volta = db_sqlite.get_connection().execute("SELECT tweet_text, created_at FROM tweets ORDER BY id").fetchall()
+        checagens.append((f"{fmt}: tweet importado sem created_at volta com a mesma data",
+                          [tuple(r) for r in volta] == [tuple(r) for r in origem]))
+    for descricao, ok in checagens:
+        print(f"{'✅' if ok else '❌'} {descricao}")
+    return all(ok for _, ok in checagens)
+
+
+def _servidor_twitter_fake(atraso_ms=0.0, guardar=False):
+    """Sobe um endpoint local que imita POST /2/tweets (HTTP/1.1 com keep-alive).
+
+    Com `guardar`, `servidor.recebidos` acumula (instante, Authorization, corpo) de cada envio.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            tamanho = int(self.headers.get('Content-Length') or 0)
+            corpo = self.rfile.read(tamanho)
+            with lock:
+                servidor.requisicoes += 1
+                if guardar:
+                    servidor.recebidos.append((time.monotonic(), self.headers.get('Authorization'), corpo))
+            if atraso_ms:
+                time.sleep(atraso_ms / 1000)
+            corpo = json.dumps({"data": {"id": "1", "text": "ok"}}).encode()
+            self.send_response(201)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    lock = threading.Lock()
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    servidor.requisicoes = 0
+    servidor.recebidos = []
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+class PublicadorHttpFake:
+    """Publicador compatível com `main.set_publisher` que posta num endpoint local.
+
+    Com `reusar_sessao=False` abre uma sessão nova por envio, como o `tweetar` antigo.
+    `credencial` vai no cabeçalho Authorization (para conferir qual conta publicou).
+    """
+
+    def __init__(self, base_url, reusar_sessao=True, credencial=None):
+        import requests
+        self._requests = requests
+        self.base_url = base_url
+        self.reusar_sessao = reusar_sessao
+        self.headers = {"Authorization": f"Bearer {credencial}"} if credencial else {}
+        self.session = requests.Session() if reusar_sessao else None
+
+    def create_tweet(self, text):
+        session = self.session if self.reusar_sessao else self._requests.Session()
+        try:
+            resp = session.post(f"{self.base_url}/2/tweets", json={"text": text}, headers=self.headers)
+            resp.raise_for_status()
+            return resp.json()
+        finally:
+            if not self.reusar_sessao:
+                session.close()
+
+
+def bench_publish(n, atraso_ms):
+    import main as bot
+    servidor, url = _servidor_twitter_fake(atraso_ms)
+    try:
+        resultados = {}
+        for nome, reusar in (('sessão por envio', False), ('publicador reutilizado', True)):
+            bot.set_publisher(PublicadorHttpFake(url, reusar_sessao=reusar))
+            bot.publish_stats.update(envios=0, ultimo_ms=None, total_ms=0.0)
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                for i in range(n):
+                    bot.tweetar(f"tweet {i}", dry_run=False)
+                total = time.perf_counter() - t0
+            resultados[nome] = (bot.publish_stats['envios'], bot.publish_stats['total_ms'] / max(1, bot.publish_stats['envios']), n / total)
+        print(f"{'':<24} | {'envios':>7} | {'ms/envio':>9} | {'envios/s':>9}")
+        for nome, (envios, ms, vazao) in resultados.items():
+            print(f"{nome:<24} | {envios:>7} | {ms:>9.3f} | {vazao:>9.0f}")
+    finally:
+        bot.set_publisher(None)
+        servidor.shutdown()
+
+
+def _pseudo_palavras(n, semente=0):
+    rng = random.Random(semente)
+    silabas = [c + v for c in "bcdfglmnprstvz" for v in "aeiou"]
+    return ["".join(rng.choice(silabas) for _ in range(rng.randint(2, 3))) for _ in range(n)]
+
+
+# Vocabulário do gerador fake: grande o bastante para mensagens sorteadas não parecerem repetidas
+_PALAVRAS = _pseudo_palavras(3000)
+
+# Últimas mensagens do gerador fake, para simular repetições
+_geradas = []
+
+
+def _mensagem_fake(carimbo, ruim=0.0):
+    """Mensagem do gerador fake: palavras sorteadas + carimbo; com probabilidade `ruim`, um texto inválido."""
+    if random.random() < ruim:
+        return _rascunho_ruim()
+    texto = f"mensagem fake {' '.join(random.sample(_PALAVRAS, 12))} [{carimbo}]"
+    _geradas.append(texto)
+    del _geradas[:-50]
+    return texto
+
+
+def _resposta_fake(messages, ruim=0.0):
+    """Conteúdo da resposta fake: o gerador devolve o carimbo de data/hora recebido no prompt,
+    para conferir o relógio (uma lista JSON quando o prompt pede N candidatos); o classificador
+    devolve um tom válido para cada tweet numerado."""
+    import json
+    import re
+    usuario = messages[-1]['content']
+    if 'classificador' in messages[0]['content']:
+        n = len(re.findall(r'^\d+\) ', usuario, re.M))
+        return json.dumps([{"i": i + 1, "key": "fofo_carinho"} for i in range(n)])
+    m = re.search(r'Data e hora atual \(São Paulo/BR\): (.*?\))\.', usuario)
+    carimbo = m.group(1) if m else '?'
+    lista = re.search(r'JSON array de (\d+) strings', usuario)
+    if lista:
+        return json.dumps([_mensagem_fake(carimbo, ruim) for _ in range(int(lista.group(1)))], ensure_ascii=False)
+    return _mensagem_fake(carimbo, ruim)
+
+
+class LLMFake:
+    """Cliente compatível com AsyncOpenAI que responde localmente (ver `_resposta_fake`)."""
+
+    def __init__(self, atraso_ms=0.0):
+        import types
+        self.atraso_ms = atraso_ms
+        self.chamadas = []
+        self.chat = types.SimpleNamespace(completions=self)
+
+    async def create(self, **kwargs):
+        import asyncio
+        import types
+        self.chamadas.append(kwargs)
+        if self.atraso_ms:
+            await asyncio.sleep(self.atraso_ms / 1000)
+        conteudos = [_resposta_fake(kwargs['messages']) for _ in range(kwargs.get('n') or 1)]
+        prompt_tokens = sum(len(m['content']) for m in kwargs['messages']) // 4
+        usage = types.SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=20,
+                                      total_tokens=prompt_tokens + 20)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=c)) for c in conteudos], usage=usage
+        )
+
+
+def _rascunho_ruim():
+    """Texto que o gerador não deveria devolver: hashtag, mais de 280 caracteres ou repetição de uma mensagem recente."""
+    sorteio = random.random()
+    if _geradas and sorteio < 1 / 3:
+        return random.choice(_geradas[-10:]).replace("mensagem fake", "mensagem fake de novo")
+    if sorteio < 2 / 3:
+        return "bom dia laura #sextou " + "mensagem comprida que continua " * 12
+    return "bom dia laura " + "mensagem comprida que continua sem parar " * 10
+
+
+def _servidor_llm_fake(modelos, guardar=False):
+    """Sobe um servidor local compatível com /v1/chat/completions (com e sem stream SSE).
+
+    `modelos`: {nome_do_modelo: {"atraso_ms": float (até o 1º token), "falha": prob. de responder 500,
+    "falhar_primeiras": int (as N primeiras requisições do modelo respondem 500), "ms_por_token": float, "ruim": prob. de o gerador devolver texto inválido (`_rascunho_ruim`)}};
+    modelos ausentes usam a entrada "*" (se houver) ou respondem na hora.
+    O servidor imita o cache de prefixo do provedor: `cached_tokens` é o maior prefixo do prompt
+    (≈ 4 caracteres/token, em blocos de 64 tokens) igual ao de uma das últimas 64 requisições.
+    Retorna (servidor, base_url, contador de requisições e tokens de saída enviados, além do máximo
+    de requisições simultâneas em `max_em_voo`). Com `guardar`, `contador["recebidas"]` acumula
+    (instante, mensagens) de cada requisição.
+    """
+    import json
+    import re
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    contador = {"requisicoes": 0, "tokens": 0, "em_voo": 0, "max_em_voo": 0, "recebidas": [], "por_modelo": {}}
+    lock = threading.Lock()
+    anteriores = []
+
+    def tokens_em_cache(prompt):
+        with lock:
+            maior = max((len(os.path.commonprefix([prompt, p])) for p in anteriores), default=0)
+            anteriores.append(prompt)
+            del anteriores[:-64]
+        return (maior // 4) // 64 * 64
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            corpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            with lock:
+                contador["requisicoes"] += 1
+                contador["por_modelo"][corpo.get('model')] = contador["por_modelo"].get(corpo.get('model'), 0) + 1
+                corpo['_ordem'] = contador["por_modelo"][corpo.get('model')]
+                contador["em_voo"] += 1
+                contador["max_em_voo"] = max(contador["max_em_voo"], contador["em_voo"])
+                if guardar:
+                    contador["recebidas"].append((time.monotonic(), corpo.get('messages')))
+            try:
+                self._responder(corpo)
+            finally:
+                with lock:
+                    contador["em_voo"] -= 1
+
+        def _responder(self, corpo):
+            cfg = modelos.get(corpo.get('model'), modelos.get('*', {}))
+            if cfg.get('atraso_ms'):
+                time.sleep(cfg['atraso_ms'] / 1000)
+            try:
+                if corpo['_ordem'] <= cfg.get('falhar_primeiras', 0) or random.random() < cfg.get('falha', 0.0):
+                    self._json(500, {"error": {"message": "falha simulada", "type": "server_error"}})
+                    return
+                conteudos = [_resposta_fake(corpo['messages'], cfg.get('ruim', 0.0)) for _ in range(corpo.get('n') or 1)]
+                tokens = [tk for c in conteudos for tk in re.findall(r'\S+\s*', c)] or ['']
+                prompt = corpo.get('model', '') + "".join(f"\x00{m['role']}\x00{m.get('content') or ''}" for m in corpo['messages'])
+                prompt_tokens = sum(len(m.get('content') or '') for m in corpo['messages']) // 4
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                         "total_tokens": prompt_tokens + len(tokens),
+                         "prompt_tokens_details": {"cached_tokens": min(prompt_tokens, tokens_em_cache(prompt))}}
+                if corpo.get('stream'):
+                    self._stream(corpo.get('model'), tokens, cfg.get('ms_por_token', 0.0), usage)
+                    return
+                time.sleep(len(tokens) * cfg.get('ms_por_token', 0.0) / 1000)
+                with lock:
+                    contador["tokens"] += len(tokens)
+                self._json(200, {
+                    "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": corpo.get('model'),
+                    "choices": [{"index": i, "finish_reason": "stop", "message": {"role": "assistant", "content": c}}
+                                for i, c in enumerate(conteudos)],
+                    "usage": usage,
+                })
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # cliente desistiu (timeout ou stream cancelado)
+
+        def _json(self, status, resposta):
+            dados = json.dumps(resposta).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def _stream(self, modelo, tokens, ms_por_token, usage):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+            def evento(dados):
+                bloco = f"data: {dados}\n\n".encode()
+                self.wfile.write(f"{len(bloco):x}\r\n".encode() + bloco + b"\r\n")
+                self.wfile.flush()
+
+            base = {"id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": modelo}
+            for i, token in enumerate(tokens):
+                if i and ms_por_token:
+                    time.sleep(ms_por_token / 1000)
+                evento(json.dumps({**base, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}))
+                with lock:
+                    contador["tokens"] += 1
+            evento(json.dumps({**base, "choices": [], "usage": usage}))
+            evento("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/v1", contador
+
+
+class PublicadorFake:
+    def __init__(self):
+        self.textos = []
+
+    def create_tweet(self, text):
+        self.textos.append(text)
+        return {"data": {"id": str(len(self.textos)), "text": text}}
+
+
+def bench_semana(inicio):
+    """Simula uma semana de ticks (1/min) do scheduler com relógio fake e confere cada publicação."""
+    from datetime import datetime, timedelta
+    from apscheduler.triggers.cron import CronTrigger
+    import main as bot
+    import novo
+
+    _reset_db(os.path.join(_TMP_DIR, 'semana.db'))
+    novo.async_client = LLMFake()
+    publicador = PublicadorFake()
+    bot.set_publisher(publicador)
+
+    inicio = datetime.fromisoformat(inicio).replace(tzinfo=novo.TZ_SP)
+    relogio = [inicio]
+    novo.set_relogio(lambda: relogio[0])
+    gatilhos = [(acao, CronTrigger(timezone=novo.TZ_SP, **cron)) for acao, cron in bot.AGENDA]
+    proximos = [g.get_next_fire_time(None, inicio) for _, g in gatilhos]
+
+    publicados = []  # (ação, horário do slot, texto)
+    tempos_ociosos, tempos_ativos = [], []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            tick = inicio
+            while tick < inicio + timedelta(days=7):
+                relogio[0] = tick
+                t0 = time.perf_counter()
+                ativo = False
+                if (tick - inicio) % timedelta(minutes=bot.PREGEN_INTERVAL_MINUTES) == timedelta(0):
+                    bot.pre_gerar()
+                    ativo = True
+                for idx, (acao, gatilho) in enumerate(gatilhos):
+                    if proximos[idx] is not None and proximos[idx] <= tick:
+                        antes = len(publicador.textos)
+                        bot.publicar_acao(acao, dry_run=False)
+                        publicados.append((acao, proximos[idx], publicador.textos[antes] if len(publicador.textos) > antes else None))
+                        proximos[idx] = gatilho.get_next_fire_time(proximos[idx], tick + timedelta(seconds=1))
+                        ativo = True
+                (tempos_ativos if ativo else tempos_ociosos).append((time.perf_counter() - t0) * 1000)
+                tick += timedelta(minutes=1)
+    finally:
+        novo.set_relogio(None)
+        bot.set_publisher(None)
+
+    por_acao = {}
+    erros = []
+    for acao, slot, texto in publicados:
+        por_acao[acao] = por_acao.get(acao, 0) + 1
+        esperado = f"[{novo._carimbo(slot)}]"
+        if not texto or esperado not in texto:
+            erros.append(f"{acao} em {slot:%a %d %H:%M}: texto {texto!r}, esperado carimbo {esperado}")
+
+    print(f"Semana a partir de {inicio:%d/%m/%Y %H:%M} ({len(tempos_ociosos) + len(tempos_ativos)} ticks)")
+    print(f"Publicações por ação: {por_acao}")
+    print(f"Chamadas LLM: {novo.llm_calls}")
+    print(f"Tick ocioso: mediana {statistics.median(tempos_ociosos):.3f} ms | "
+          f"tick com trabalho: mediana {statistics.median(tempos_ativos):.3f} ms, máx {max(tempos_ativos):.3f} ms")
+    if erros:
+        print(f"❌ {len(erros)} publicação(ões) com horário errado:")
+        for e in erros:
+            print(f"   {e}")
+    else:
+        print("✅ Todas as publicações usaram o horário do próprio slot")
+    return not erros
+
+
+def _relogio_apscheduler(relogio):
+    """Faz o APScheduler (scheduler e executores) ler `relogio[0]` em vez do relógio real. Retorna a função que desfaz."""
+    from datetime import datetime
+    import apscheduler.executors.base as executores
+    import apscheduler.schedulers.base as schedulers
+
+    class DatetimeSimulado(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return relogio[0].astimezone(tz) if tz else relogio[0].replace(tzinfo=None)
+
+    originais = (schedulers.datetime, executores.datetime)
+    schedulers.datetime = executores.datetime = DatetimeSimulado
+
+    def desfazer():
+        schedulers.datetime, executores.datetime = originais
+    return desfazer
+
+
+def bench_agenda():
+    """Scheduler com relógio simulado: reinícios com disparos perdidos, coalesce, tolerância e sobreposição.
+
+    Cada "processo" é um scheduler novo sobre o mesmo banco (agendamentos persistidos); os ticks
+    (1/min) chamam `_process_jobs` diretamente, com o executor síncrono 'debug', exceto no cenário
+    de sobreposição, que usa threads e um publicador lento.
+    """
+    import logging
+    from datetime import datetime, timedelta
+    from apscheduler.events import EVENT_JOB_MAX_INSTANCES
+    from apscheduler.executors.debug import DebugExecutor
+    from apscheduler.executors.pool import ThreadPoolExecutor
+    from apscheduler.schedulers.base import BaseScheduler
+    import main as bot
+    import novo
+
+    class SchedulerSimulado(BaseScheduler):
+        def wakeup(self):
+            pass
+
+        def shutdown(self, wait=True):
+            super().shutdown(wait)
+
+    class PublicadorLento(PublicadorFake):
+        def create_tweet(self, text):
+            time.sleep(0.5)
+            return super().create_tweet(text)
+
+    # Os avisos do próprio APScheduler repetiriam os de `main._ao_evento`
+    logging.getLogger('apscheduler').setLevel(logging.ERROR)
+    _reset_db(os.path.join(_TMP_DIR, 'agenda.db'))
+    novo.async_client = LLMFake()
+    publicador = PublicadorFake()
+    bot.set_publisher(publicador)
+    relogio = [datetime(2026, 10, 19, 5, 0, tzinfo=novo.TZ_SP)]  # segunda-feira
+    novo.set_relogio(lambda: relogio[0])
+    desfazer = _relogio_apscheduler(relogio)
+    for campo in bot.scheduler_stats:
+        bot.scheduler_stats[campo] = 0
+    checagens = []
+
+    def checar(descricao, ok):
+        checagens.append((descricao, ok))
+
+    def processo(inicio, ate, executor=None, aviso_inicio=False):
+        """Sobe um scheduler em `inicio`, roda os ticks até `ate` e o derruba sem esperar (queda)."""
+        relogio[0] = inicio
+        sched = bot.iniciar_scheduler(bot.configurar_scheduler(SchedulerSimulado(), executor or DebugExecutor()),
+                                      dry_run=False, aviso_inicio=aviso_inicio)
+        antes_do_primeiro_tick = len(publicador.textos)
+        while relogio[0] <= ate:
+            sched._process_jobs()
+            relogio[0] += timedelta(minutes=1)
+        sched.shutdown(wait=False)
+        return antes_do_primeiro_tick
+
+    def publicados_desde(n):
+        return publicador.textos[n:]
+
+    seg = relogio[0].replace(hour=0)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            # 1) Sobe às 05:00 de segunda com aviso de início e cai às 06:30 (antes do bom_dia das 07:00)
+            n = len(publicador.textos)
+            antes = processo(seg.replace(hour=5), seg.replace(hour=6, minute=30), aviso_inicio=True)
+            checar("aviso de início não é enviado antes do scheduler começar", antes == n)
+            checar("aviso de início enviado pelo primeiro tick", len(publicados_desde(n)) == 1)
+
+            # 2) Volta às 07:40: bom_dia das 07:00 está 40 min atrasado (tolerância de 3 h) e sai uma vez
+            n = len(publicador.textos)
+            processo(seg.replace(hour=7, minute=40), seg.replace(hour=21))
+            textos = publicados_desde(n)
+            carimbo = f"[{novo._carimbo(seg.replace(hour=7))}]"
+            checar("bom_dia perdido na queda é recuperado uma vez, com o carimbo do slot das 07:00",
+                   len(textos) == 1 and carimbo in textos[0])
+
+            # 3) Volta à 01:30 de terça: boa_noite das 22:00 está 3,5 h atrasado (tolerância padrão de 1 h)
+            n, perdidos = len(publicador.textos), bot.scheduler_stats["perdidos"]
+            processo(seg + timedelta(days=1, hours=1, minutes=30), seg + timedelta(days=1, hours=6))
+            checar("boa_noite atrasado além da tolerância é descartado e avisado",
+                   len(publicados_desde(n)) == 0 and bot.scheduler_stats["perdidos"] == perdidos + 1)
+
+            # 4) Fora do ar de terça 06:00 a sexta 07:30: 2 bom_dia e 3 boa_noite vencidos viram 1 de cada (coalesce)
+            n, perdidos = len(publicador.textos), bot.scheduler_stats["perdidos"]
+            processo(seg + timedelta(days=4, hours=7, minutes=30), seg + timedelta(days=4, hours=8))
+            checar("disparos acumulados de cada job contam uma vez só (coalesce)",
+                   bot.scheduler_stats["perdidos"] == perdidos + 2)
+            checar("sextou_bom_dia das 07:00 de sexta recuperado às 07:30", len(publicados_desde(n)) == 1)
+
+            # 5) Sobreposição: publicação lenta (threads) e o disparo seguinte chegando antes de ela terminar
+            lento = PublicadorLento()
+            bot.set_publisher(lento)
+            sobrepostos = bot.scheduler_stats["sobrepostos"]
+            relogio[0] = seg + timedelta(days=4, hours=22)
+            pulados = []
+            sched = bot.iniciar_scheduler(bot.configurar_scheduler(SchedulerSimulado(), ThreadPoolExecutor(4)),
+                                          dry_run=False)
+            sched.add_listener(lambda e: pulados.append(e.job_id), EVENT_JOB_MAX_INSTANCES)
+            sched._process_jobs()
+            relogio[0] += timedelta(days=1)
+            sched._process_jobs()
+            sched.shutdown(wait=True)
+            checar("disparo que chega com a execução anterior em andamento é pulado (max_instances=1)",
+                   len(lento.textos) == 1 and 'boa_noite#0' in pulados
+                   and bot.scheduler_stats["sobrepostos"] == sobrepostos + len(pulados))
+    finally:
+        desfazer()
+        novo.set_relogio(None)
+        bot.set_publisher(None)
+
+    for descricao, ok in checagens:
+        print(f"{'✅' if ok else '❌'} {descricao}")
+    print(f"Disparos: {bot.scheduler_stats}")
+    return all(ok for _, ok in checagens)
+
+
+def _perfis_fake(n):
+    """`n` perfis de teste: destinatário, credenciais, janela de tom e horários diferentes em cada um."""
+    lista = []
+    for i in range(n):
+        perfil = {
+            "id": f"p{i:03d}",
+            "variaveis": {"destinatario": f"Pessoa{i:03d}", "apelido": f"Xodó{i:03d}"},
+            "credenciais": f"BENCH_P{i:03d}_",
+            "janela_tom": 1 + i % 5,
+            "agenda": {"bom_dia": [{"hour": 6 + i % 4}], "boa_tarde": [{"hour": 13 + i % 3}],
+                       "boa_noite": [{"hour": 20 + i % 4, "minute": i % 60}]},
+        }
+        if i % 10 == 0:
+            perfil["instrucoes"] = {"bom_dia": "Escreva um bom dia curto para {destinatario}, chamando de {apelido}."}
+        lista.append(perfil)
+    return lista
+
+
+def bench_perfis(n, workers, llm_concorrencia, llm_por_s, twitter_por_s, llm_atraso_ms, twitter_atraso_ms):
+    """`n` perfis num único processo contra LLM e Twitter locais: pré-geração de todos de uma vez
+    e publicação de cada rodada de disparos num pool de `workers` threads, com limite de taxa.
+
+    Confere a partição por perfil (rascunhos, tweets, conta que publicou, rotação de tom na janela
+    de cada perfil, destinatário no prompt), os limites de concorrência e de taxa e os jobs do scheduler.
+    """
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import datetime
+    from openai import AsyncOpenAI
+    from apscheduler.schedulers.background import BackgroundScheduler
+    import main as bot
+    import novo
+    import fila_gravacao
+    import limites
+    import perfis
+
+    lista = _perfis_fake(n)
+    for p in lista:
+        for nome in perfis.CREDENCIAIS:
+            os.environ[p['credenciais'] + nome] = f"{p['id']}-{nome.lower()}"
+    perfis.definir(lista)
+    # Cada perfil cria seu publicador com as próprias credenciais, como o cliente Tweepy
+    criar_original = bot._criar_publisher
+    servidor_llm, url_llm, contador = _servidor_llm_fake(
+        {"*": {"atraso_ms": llm_atraso_ms}}, guardar=True)
+    servidor_tw, url_tw = _servidor_twitter_fake(twitter_atraso_ms, guardar=True)
+    bot._criar_publisher = lambda credenciais: PublicadorHttpFake(url_tw, credencial=credenciais['consumer_key'])
+    originais = (novo.async_client, novo.LLM_MAX_CONCURRENCY)
+    novo.async_client = AsyncOpenAI(base_url=url_llm, api_key='fake', max_retries=0)
+    novo.LLM_MAX_CONCURRENCY = llm_concorrencia
+    inicio = datetime(2026, 10, 19, 0, 0, tzinfo=novo.TZ_SP)  # segunda-feira
+    novo.set_relogio(lambda: inicio)
+    checagens = []
+
+    def checar(descricao, ok):
+        checagens.append((descricao, ok))
+
+    def respeita_taxa(instantes, por_s, rajada):
+        # Em qualquer intervalo [t_i, t_j] do servidor cabem no máximo rajada + taxa * duração requisições,
+        # com 50 ms de folga para o atraso variável entre a liberação no cliente e a chegada
+        if por_s <= 0:
+            return True
+        instantes = sorted(instantes)
+        return all(j - i + 1 <= rajada + por_s * (instantes[j] - instantes[i] + 0.05)
+                   for i in range(len(instantes)) for j in range(i + 1, len(instantes)))
+
+    print(f"{n} perfis | LLM: {llm_concorrencia} simultâneas, {llm_por_s:g}/s, {llm_atraso_ms:.0f} ms | "
+          f"Twitter: {twitter_por_s:g}/s, {twitter_atraso_ms:.0f} ms")
+    print(f"{'workers':>7} | {'rascunhos':>9} | {'geração s':>9} | {'rasc./s':>7} | {'tweets':>6} | "
+          f"{'publicação s':>12} | {'tweets/s':>8} | {'p50 ms':>7} | {'p95 ms':>7}")
+    try:
+        for w in workers:
+            _reset_db(os.path.join(_TMP_DIR, f'perfis-{w}.db'))
+            bot.set_publisher(None)
+            novo._indices.clear()
+            novo._semaforos.clear()
+            limite_llm = limites.definir('llm', llm_por_s, llm_por_s)
+            limite_tw = limites.definir('twitter', twitter_por_s, twitter_por_s)
+            contador.update(requisicoes=0, max_em_voo=0, recebidas=[])
+            servidor_tw.recebidos.clear()
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                bot.pre_gerar(24)
+                geracao_s = time.perf_counter() - t0
+            total_rascunhos = sum(db_sqlite.contar_rascunhos(a, perfil=p['id']) for p in lista for a in p['agenda'])
+
+            # Rodadas de disparos: o i-ésimo slot de todos os perfis ao mesmo tempo, no pool de threads
+            rodadas = {}
+            for p in lista:
+                for i, (acao, _) in enumerate(bot._proximos_slots(24, perfil=p['id'])):
+                    rodadas.setdefault(i, []).append((p['id'], acao))
+            tempos = []
+
+            def publicar(perfil, acao):
+                t = time.perf_counter()
+                bot.publicar_acao(acao, dry_run=False, perfil=perfil)
+                tempos.append((time.perf_counter() - t) * 1000)
+
+            with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(w) as pool:
+                t0 = time.perf_counter()
+                for i in sorted(rodadas):
+                    list(pool.map(lambda pa: publicar(*pa), rodadas[i]))
+                publicacao_s = time.perf_counter() - t0
+            fila_gravacao.esvaziar()
+            enviados = len(servidor_tw.recebidos)
+            print(f"{w:>7} | {total_rascunhos:>9} | {geracao_s:>9.2f} | {total_rascunhos / geracao_s:>7.1f} | "
+                  f"{enviados:>6} | {publicacao_s:>12.2f} | {enviados / publicacao_s:>8.1f} | "
+                  f"{statistics.median(tempos):>7.1f} | {_percentil(tempos, 0.95):>7.1f}")
+
+            por_texto = {json.loads(corpo)['text']: auth for _, auth, corpo in servidor_tw.recebidos}
+            conn = db_sqlite.get_connection()
+            tweets = conn.execute("SELECT perfil, tweet_text, type FROM tweets ORDER BY id").fetchall()
+            por_perfil = {}
+            for t in tweets:
+                por_perfil.setdefault(t['perfil'], []).append(t)
+            esperados = {p['id']: sum(len(crons) for crons in p['agenda'].values()) for p in lista}
+            janelas = {p['id']: p['janela_tom'] for p in lista}
+            tons_ok = True
+            for perfil, linhas in por_perfil.items():
+                tons = [novo._tone_key_from_type(t['type']) for t in linhas]
+                janela = janelas[perfil]
+                tons_ok &= all(tom not in tons[max(0, k - janela):k] for k, tom in enumerate(tons))
+            prompts = " ".join(m.get('content') or '' for _, mensagens in contador["recebidas"] for m in mensagens)
+            instantes_tw = [instante for instante, _, _ in servidor_tw.recebidos]
+            instantes_llm = [instante for instante, _ in contador["recebidas"]]
+
+            checar(f"[{w}] um rascunho por disparo das próximas 24 h de cada perfil, todos publicados",
+                   total_rascunhos == sum(esperados.values()) and not any(
+                       db_sqlite.contar_rascunhos(a, perfil=p['id']) for p in lista for a in p['agenda']))
+            checar(f"[{w}] cada perfil publicou todos os seus disparos na própria partição",
+                   {p: len(l) for p, l in por_perfil.items()} == esperados and enviados == len(tweets))
+            checar(f"[{w}] cada tweet saiu com as credenciais do próprio perfil",
+                   all(por_texto.get(t['tweet_text']) == f"Bearer {t['perfil']}-consumer_key" for t in tweets))
+            checar(f"[{w}] rotação de tom respeita a janela de cada perfil (1 a 5)", tons_ok)
+            checar(f"[{w}] o prompt de cada perfil leva o próprio destinatário e variáveis",
+                   all(p['variaveis']['destinatario'] in prompts for p in lista)
+                   and all(p['variaveis']['apelido'] in prompts for p in lista if 'instrucoes' in p))
+            checar(f"[{w}] no máximo {llm_concorrencia} chamadas simultâneas ao LLM (máx. {contador['max_em_voo']})",
+                   contador["max_em_voo"] <= llm_concorrencia)
+            checar(f"[{w}] taxa do LLM dentro de {llm_por_s:g}/s ({limite_llm.stats['esperas']} esperas)",
+                   respeita_taxa(instantes_llm, llm_por_s, limite_llm.rajada))
+            checar(f"[{w}] taxa do Twitter dentro de {twitter_por_s:g}/s ({limite_tw.stats['esperas']} esperas)",
+                   respeita_taxa(instantes_tw, twitter_por_s, limite_tw.rajada))
+
+        # Agenda de todos os perfis num só scheduler: um job persistido por disparo, com o perfil
+        with contextlib.redirect_stdout(io.StringIO()):
+            sched = bot.configurar_scheduler(BackgroundScheduler())
+            sched.start(paused=True)
+            bot._sincronizar_agenda(sched, dry_run=True)
+            jobs = sched.get_jobs(jobstore='sqlite')
+            sched.shutdown(wait=False)
+        checar("scheduler único com um job por disparo de cada perfil (ids perfil:ação#i)",
+               len(jobs) == sum(esperados.values())
+               and all(j.id.startswith(f"{j.kwargs['perfil']}:") for j in jobs))
+
+        # Gatilho inválido num perfil: bootstrap recusa antes de o scheduler começar
+        invalida = [dict(lista[0], agenda={"bom_dia": [{"hour": 25}]})]
+        perfis.definir(invalida)
+        saida = io.StringIO()
+        with contextlib.redirect_stdout(saida):
+            aceito = bot.bootstrap(precisa_llm=False)
+        checar("bootstrap recusa perfil com hora inválida na agenda, citando perfil e ação",
+               not aceito and f"{invalida[0]['id']}: gatilho inválido em bom_dia" in saida.getvalue())
+    finally:
+        novo.set_relogio(None)
+        novo.async_client, novo.LLM_MAX_CONCURRENCY = originais
+        novo._indices.clear()
+        novo._semaforos.clear()
+        bot._criar_publisher = criar_original
+        bot.set_publisher(None)
+        perfis.definir(None)
+        limites.definir('llm', 0)
+        limites.definir('twitter', 0)
+        servidor_llm.shutdown()
+        servidor_tw.shutdown()
+
+    for descricao, ok in checagens:
+        print(f"{'✅' if ok else '❌'} {descricao}")
+    return all(ok for _, ok in checagens)
+
+
+def bench_tom_local(db_path, limiar, folds):
+    """Avaliação offline do classificador local contra os rótulos existentes (validação cruzada).
+
+    Rótulos: tom gravado em 'type' (pedido ao gerador) e classificações do LLM na tabela tweet_tones.
+    O banco é aberto somente leitura.
+    """
+    from novo import TONES, TONE_CACHE_VERSION, _tone_key_from_type
+    from tom_local import ClassificadorLocal
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    exemplos = []
+    for texto, tipo in conn.execute("SELECT tweet_text, type FROM tweets"):
+        key = _tone_key_from_type(tipo)
+        if key:
+            exemplos.append((texto, key, 'type'))
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tweet_tones'").fetchone():
+        for texto, key in conn.execute(
+            "SELECT t.tweet_text, tt.tone_key FROM tweet_tones tt JOIN tweets t ON t.id = tt.tweet_id "
+            "WHERE tt.version = ?", (TONE_CACHE_VERSION,)
+        ):
+            exemplos.append((texto, key, 'llm'))
+    conn.close()
+    if not exemplos:
+        print("Nenhum tweet rotulado no banco.")
+        return
+
+    random.Random(0).shuffle(exemplos)
+    folds = max(2, min(folds, len(exemplos)))
+    resultados = []  # (origem, acertou, confiante)
+    tempos = []
+    for f in range(folds):
+        treino = [(t, k) for i, (t, k, _) in enumerate(exemplos) if i % folds != f]
+        modelo = ClassificadorLocal(TONES).treinar(treino)
+        for i, (texto, key, origem) in enumerate(exemplos):
+            if i % folds != f:
+                continue
+            t0 = time.perf_counter()
+            previsto, confianca = modelo.prever(texto)
+            tempos.append((time.perf_counter() - t0) * 1e6)
+            resultados.append((origem, previsto == key, confianca >= limiar))
+
+    print(f"{len(exemplos)} rótulos ({folds} folds), limiar de confiança {limiar}")
+    for origem in ('type', 'llm', None):
+        sel = [r for r in resultados if origem is None or r[0] == origem]
+        if not sel:
+            continue
+        confiantes = [r for r in sel if r[2]]
+        nome = {'type': "tom em 'type'", 'llm': 'rótulos do LLM', None: 'total'}[origem]
+        acordo_conf = f"{sum(r[1] for r in confiantes) / len(confiantes):.1%}" if confiantes else "-"
+        print(f"  {nome:<16} n={len(sel):>5} | acordo geral {sum(r[1] for r in sel) / len(sel):.1%} | "
+              f"cobertura local {len(confiantes) / len(sel):.1%} | acordo quando confiante {acordo_conf}")
+    tempos.sort()
+    print(f"  latência por classificação: mediana {statistics.median(tempos):.1f} µs, "
+          f"p95 {tempos[int(len(tempos) * 0.95) - 1]:.1f} µs")
+
+
+def bench_llm(n):
+    """Cenários de falha contra o servidor LLM local: latência, retentativas, fallback e circuit breaker.
+
+    A tabela mede cenários aleatórios; depois, cenários determinísticos conferem o comportamento
+    de `llm.chamar` (retentativa, prazo, fallback, abertura e meia-abertura do circuito).
+    Retorna False se alguma conferência falhar.
+    """
+    import importlib
+    from openai import AsyncOpenAI
+    import llm
+    import novo
+
+    _reset_db(os.path.join(_TMP_DIR, 'llm.db'))
+    principal, reserva = novo.GENERATOR_MODEL, 'fake/reserva'
+    cenarios = [
+        ("normal", {principal: {"atraso_ms": 20}}, 5.0),
+        ("30% de erros 500", {principal: {"atraso_ms": 20, "falha": 0.3}}, 5.0),
+        ("principal lento + reserva", {principal: {"atraso_ms": 3000}, reserva: {"atraso_ms": 20}}, 1.0),
+        ("tudo falhando", {principal: {"falha": 1.0}, reserva: {"falha": 1.0}}, 5.0),
+    ]
+    originais = (novo.async_client, novo.LLM_TIMEOUT, llm.LLM_FALLBACK_MODELS, llm.LLM_BACKOFF_BASE)
+    print(f"{'cenário':<28} | {'ok':>4} | {'tentativas':>10} | {'fallbacks':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'req. servidor':>13} | {'tempo s':>7}")
+    try:
+        for nome, modelos, prazo in cenarios:
+            importlib.reload(llm)
+            novo.llm = llm
+            llm.LLM_FALLBACK_MODELS = [reserva]
+            llm.LLM_BACKOFF_BASE = 0.05
+            llm.LLM_ATTEMPT_TIMEOUT = prazo / 3
+            servidor, url, contador = _servidor_llm_fake(modelos)
+            novo.async_client = AsyncOpenAI(base_url=url, api_key='fake', max_retries=0)
+            novo.LLM_TIMEOUT = prazo
+            ok = 0
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(n):
+                    try:
+                        novo.gerar(random.choice(list(novo.ACOES)), persistir=False)
+                        ok += 1
+                    except llm.LLMIndisponivel:
+                        pass
+            total = time.perf_counter() - t0
+            r = llm.resumo('gerador')
+            print(f"{nome:<28} | {ok:>4} | {r['tentativas']:>10} | {r['fallbacks']:>9} | {r['p50_ms']:>7} | {r['p95_ms']:>7} | {contador['requisicoes']:>13} | {total:>7.2f}")
+            servidor.shutdown()
+    finally:
+        novo.async_client, novo.LLM_TIMEOUT, llm.LLM_FALLBACK_MODELS, llm.LLM_BACKOFF_BASE = originais
+    return _conferir_llm(principal, reserva)
+
+
+def _conferir_llm(principal, reserva):
+    """Cenários determinísticos de `llm.chamar` contra o servidor local (ver `bench_llm`)."""
+    import importlib
+    from openai import AsyncOpenAI
+    import llm
+    import novo
+
+    checagens = []
+
+    def checar(descricao, ok):
+        checagens.append((descricao, ok))
+
+    def preparar(modelos, fallback=(), retries=2, cb_falhas=5, cb_cooldown=60.0):
+        importlib.reload(llm)
+        llm.LLM_FALLBACK_MODELS = list(fallback)
+        llm.LLM_BACKOFF_BASE = 0.01
+        llm.LLM_RETRIES = retries
+        llm.LLM_ATTEMPT_TIMEOUT = 5.0
+        llm.LLM_CB_FAILURES = cb_falhas
+        llm.LLM_CB_COOLDOWN = cb_cooldown
+        servidor, url, contador = _servidor_llm_fake(modelos)
+        cliente = AsyncOpenAI(base_url=url, api_key='fake', max_retries=0)
+        return servidor, cliente, contador
+
+    def chamar(cliente, timeout=5.0):
+        """(ok, segundos) de uma chamada ao modelo principal."""
+        t0 = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                novo.executar(llm.chamar(cliente.chat.completions.create, 'bench', timeout, model=principal,
+                                         messages=[{"role": "user", "content": "oi"}]))
+            return True, time.perf_counter() - t0
+        except llm.LLMIndisponivel:
+            return False, time.perf_counter() - t0
+
+    servidores = []
+    try:
+        # Erro transitório seguido de sucesso: uma retentativa no mesmo modelo
+        servidor, cliente, contador = preparar({principal: {"falhar_primeiras": 1}})
+        servidores.append(servidor)
+        ok, _ = chamar(cliente)
+        r = llm.resumo('bench')
+        checar("500 na 1ª tentativa e sucesso na retentativa (2 tentativas, sem fallback)",
+               ok and r['tentativas'] == 2 and r['fallbacks'] == 0 and contador['requisicoes'] == 2)
+
+        # Modelo lento sem reserva: desiste no prazo total, sem esperar a resposta
+        servidor, cliente, contador = preparar({principal: {"atraso_ms": 3000}})
+        servidores.append(servidor)
+        ok, segundos = chamar(cliente, timeout=0.5)
+        checar(f"prazo de 0,5 s esgotado com o modelo lento ({segundos:.2f} s, LLMIndisponivel)",
+               not ok and segundos < 1.0)
+
+        # Principal sempre com erro: a reserva responde
+        servidor, cliente, contador = preparar({principal: {"falha": 1.0}, reserva: {}}, fallback=[reserva])
+        servidores.append(servidor)
+        ok, _ = chamar(cliente)
+        r = llm.resumo('bench')
+        checar("principal falhando e reserva respondendo (1 fallback, 3 tentativas no principal)",
+               ok and r['fallbacks'] == 1 and contador['por_modelo'] == {principal: 3, reserva: 1})
+
+        # Circuito: abre após 3 falhas seguidas, recusa sem ir à rede e meio-abre após o cooldown
+        modelos = {principal: {"falha": 1.0}}
+        servidor, cliente, contador = preparar(modelos, retries=2, cb_falhas=3, cb_cooldown=0.3)
+        servidores.append(servidor)
+        ok1, _ = chamar(cliente)
+        aberto = llm._circuito_aberto(principal)
+        ok2, segundos = chamar(cliente)
+        checar("circuito abre após 3 falhas seguidas",
+               not ok1 and aberto and contador['requisicoes'] == 3)
+        checar(f"com o circuito aberto a chamada falha na hora, sem requisição ({segundos * 1000:.1f} ms)",
+               not ok2 and contador['requisicoes'] == 3 and segundos < 0.1)
+        time.sleep(0.35)
+        ok3, _ = chamar(cliente)
+        checar("meio-aberto após o cooldown: uma tentativa de teste, que falha e reabre o circuito",
+               not ok3 and contador['requisicoes'] == 4 and llm._circuito_aberto(principal))
+        modelos[principal] = {}
+        time.sleep(0.35)
+        ok4, _ = chamar(cliente)
+        checar("meio-aberto com o modelo de volta: sucesso fecha o circuito",
+               ok4 and contador['requisicoes'] == 5 and principal not in llm._circuitos)
+    finally:
+        for servidor in servidores:
+            servidor.shutdown()
+        importlib.reload(llm)
+        novo.llm = llm
+
+    for descricao, ok in checagens:
+        print(f"{'✅' if ok else '❌'} {descricao}")
+    return all(ok for _, ok in checagens)
+
+
+def _contar_consultas(contador):
+    """Faz as conexões do pool contarem os comandos SQL executados (exceto PRAGMA e transações)."""
+    original = db_sqlite._abrir_conexao
+    lock = threading.Lock()
+
+    def contar(sql):
+        if sql.lstrip()[:6].upper() in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH ', 'REPLAC'):
+            with lock:
+                contador["consultas"] += 1
+
+    def abrir(path):
+        conn = original(path)
+        conn.set_trace_callback(contar)
+        return conn
+
+    db_sqlite._abrir_conexao = abrir
+    return original
+
+
+def _percentil(amostras, p):
+    amostras = sorted(amostras)
+    return amostras[max(0, int(round(len(amostras) * p)) - 1)]
+
+
+def bench_chamadas():
+    """Chamadas ao modelo por `run_action`, com um cliente fake que conta cada pedido.
+
+    Uma execução com o histórico já com tom no 'type' faz só a chamada do gerador; com histórico
+    sem tom (classificador local desligado) faz uma única classificação da janela inteira; repetida
+    no mesmo histórico, as classificações vêm de `tweet_tones`. Falha se alguma contagem diferir.
+    """
+    import main as bot
+    import novo
+
+    originais = (novo.async_client, novo.LOCAL_TONE_THRESHOLD, novo.GERACAO_CANDIDATOS, novo.LLM_STREAM)
+    novo.LOCAL_TONE_THRESHOLD = 2.0
+    novo.GERACAO_CANDIDATOS = 1
+    novo.LLM_STREAM = False
+    bot.set_publisher(PublicadorFake())
+    cenarios = [
+        # (descrição, fração do histórico sem tom, execuções antes da medida, classificador, gerador)
+        ("histórico com tom no type", 0.0, 0, 0, 1),
+        ("histórico sem tom", 1.0, 0, 1, 1),
+        ("sem tom, segunda execução", 1.0, 1, 0, 1),
+    ]
+    checagens = []
+    try:
+        for acao in ACOES:
+            for descricao, sem_tom, antes, esperado_cls, esperado_ger in cenarios:
+                random.seed(13)
+                _reset_db(os.path.join(_TMP_DIR, 'chamadas.db'))
+                _seed(20, sem_tom=sem_tom, texto=lambda i: _mensagem_fake(f"{i}"))
+                novo._indices.clear()
+                cliente = novo.async_client = LLMFake()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for _ in range(antes):
+                        bot.run_action(acao, dry_run=False)
+                    cliente.chamadas.clear()
+                    bot.run_action(acao, dry_run=False)
+                cls = sum('classificador' in c['messages'][0]['content'] for c in cliente.chamadas)
+                ger = len(cliente.chamadas) - cls
+                checagens.append((f"{acao:<16} | {descricao:<26} | classificador {cls} (esperado {esperado_cls}) | "
+                                  f"gerador {ger} (esperado {esperado_ger})", (cls, ger) == (esperado_cls, esperado_ger)))
+    finally:
+        novo.async_client, novo.LOCAL_TONE_THRESHOLD, novo.GERACAO_CANDIDATOS, novo.LLM_STREAM = originais
+        bot.set_publisher(None)
+
+    for descricao, ok in checagens:
+        print(f"{'✅' if ok else '❌'} {descricao}")
+    return all(ok for _, ok in checagens)
+
+
+def bench_e2e(sizes, n, llm_atraso_ms, twitter_atraso_ms, sem_tom, semente, saida, comparar):
+    """`run_action` de ponta a ponta para cada ação, contra servidor LLM e endpoint do Twitter locais.
+
+    Para cada tamanho de histórico: p50/p95 por ação, requisições ao LLM e ao Twitter e consultas
+    SQL por execução, e pico de memória (tracemalloc) de uma rodada com todas as ações.
+    """
+    import json
+    import resource
+    import subprocess
+    import tracemalloc
+    from openai import AsyncOpenAI
+    import main as bot
+    import novo
+
+    servidor_llm, url_llm, req_llm = _servidor_llm_fake({"*": {"atraso_ms": llm_atraso_ms}})
+    servidor_tw, url_tw = _servidor_twitter_fake(twitter_atraso_ms)
+    sql = {"consultas": 0}
+    abrir_original = _contar_consultas(sql)
+    cliente_original = novo.async_client
+    novo.async_client = AsyncOpenAI(base_url=url_llm, api_key='fake', max_retries=0)
+    bot.set_publisher(PublicadorHttpFake(url_tw))
+
+    def contadores():
+        return req_llm["requisicoes"], servidor_tw.requisicoes, sql["consultas"]
+
+    resultados = []
+    try:
+        for size in sizes:
+            random.seed(semente)
+            _reset_db(os.path.join(_TMP_DIR, f'e2e-{size}.db'))
+            _seed(size, sem_tom=sem_tom, texto=lambda i: _mensagem_fake(f"{i}"))
+            novo._classificador = None
+            novo._indices.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                bot.run_action(ACOES[0], dry_run=False)  # aquecimento: treino do classificador local, conexões
+                primeira_ms = (time.perf_counter() - t0) * 1000
+
+                por_acao = {}
+                for acao in ACOES:
+                    tempos = []
+                    antes = contadores()
+                    for _ in range(n):
+                        t0 = time.perf_counter()
+                        bot.run_action(acao, dry_run=False)
+                        tempos.append((time.perf_counter() - t0) * 1000)
+                    depois = contadores()
+                    llm_req, tw_req, consultas = ((d - a) / n for a, d in zip(antes, depois))
+                    por_acao[acao] = {
+                        "p50_ms": round(statistics.median(tempos), 3),
+                        "p95_ms": round(_percentil(tempos, 0.95), 3),
+                        "llm_req": llm_req, "twitter_req": tw_req, "consultas_sql": consultas,
+                    }
+
+                tracemalloc.start()
+                for acao in ACOES:
+                    bot.run_action(acao, dry_run=False)
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            resultados.append({"historico": size, "primeira_ms": round(primeira_ms, 3),
+                               "pico_mem_kb": round(pico / 1024, 1), "acoes": por_acao})
+    finally:
+        db_sqlite._abrir_conexao = abrir_original
+        db_sqlite.fechar_conexoes()
+        novo.async_client = cliente_original
+        bot.set_publisher(None)
+        servidor_llm.shutdown()
+        servidor_tw.shutdown()
+
+    base = {}
+    if comparar:
+        with open(comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+        print(f"Comparando com {comparar} (commit {anterior.get('commit') or '?'})")
+        base = {(r['historico'], a): m for r in anterior['resultados'] for a, m in r['acoes'].items()}
+
+    print(f"LLM {llm_atraso_ms:.0f} ms | Twitter {twitter_atraso_ms:.0f} ms | {n} execuções por ação | {sem_tom:.0%} do histórico sem tom")
+    print(f"{'histórico':>9} | {'ação':<16} | {'p50 ms':>8} | {'p95 ms':>8} | {'LLM/exec':>8} | {'Twitter/exec':>12} | {'SQL/exec':>8} | {'Δ p50':>7}")
+    for r in resultados:
+        for acao, m in r['acoes'].items():
+            anterior = base.get((r['historico'], acao))
+            delta = f"{(m['p50_ms'] / anterior['p50_ms'] - 1):+.0%}" if anterior and anterior['p50_ms'] else ''
+            print(f"{r['historico']:>9} | {acao:<16} | {m['p50_ms']:>8.2f} | {m['p95_ms']:>8.2f} | {m['llm_req']:>8.2f} | "
+                  f"{m['twitter_req']:>12.2f} | {m['consultas_sql']:>8.2f} | {delta:>7}")
+        print(f"{r['historico']:>9} | 1ª execução {r['primeira_ms']:.1f} ms | pico de memória {r['pico_mem_kb']:.0f} KiB")
+    print(f"RSS máximo do processo: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+    if saida:
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+        except OSError:
+            commit = None
+        with open(saida, 'w', encoding='utf-8') as f:
+            json.dump({"commit": commit, "llm_atraso_ms": llm_atraso_ms, "twitter_atraso_ms": twitter_atraso_ms,
+                       "n": n, "sem_tom": sem_tom, "semente": semente, "resultados": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {saida}")
+
+
+def bench_stream(n, ruins, atraso_ms, ms_por_token):
+    """Geração com e sem stream contra o servidor LLM local com uma fração de rascunhos inválidos."""
+    from openai import AsyncOpenAI
+    import novo
+
+    _reset_db(os.path.join(_TMP_DIR, 'stream.db'))
+    servidor, url, contador = _servidor_llm_fake({"*": {"atraso_ms": atraso_ms, "ms_por_token": ms_por_token, "ruim": ruins}})
+    originais = (novo.async_client, novo.LLM_STREAM)
+    novo.async_client = AsyncOpenAI(base_url=url, api_key='fake', max_retries=0)
+    print(f"{n} gerações | {ruins:.0%} de rascunhos inválidos | 1º token {atraso_ms:.0f} ms | {ms_por_token:.0f} ms/token")
+    print(f"{'modo':<10} | {'ok':>4} | {'tentativas':>10} | {'cancelados':>10} | {'tokens saída':>12} | {'p50 ms':>8} | {'p95 ms':>8} | {'TTFT p50':>8}")
+    try:
+        for nome, stream in (('completo', False), ('stream', True)):
+            novo.LLM_STREAM = stream
+            novo.geracao_stats.update(tentativas=0, invalidas=0, cancelados=0, chars_descartados=0)
+            contador["tokens"] = 0
+            random.seed(7)
+            tempos, ttfts, ok = [], [], 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(n):
+                    t0 = time.perf_counter()
+                    try:
+                        r = novo.gerar(random.choice(ACOES), persistir=False)
+                    except novo.GeracaoInvalida:
+                        continue
+                    finally:
+                        tempos.append((time.perf_counter() - t0) * 1000)
+                    ok += 1
+                    if r.get('ttft_ms') is not None:
+                        ttfts.append(r['ttft_ms'])
+            st = novo.geracao_stats
+            ttft = f"{statistics.median(ttfts):.1f}" if ttfts else '-'
+            print(f"{nome:<10} | {ok:>4} | {st['tentativas']:>10} | {st['cancelados']:>10} | {contador['tokens']:>12} | "
+                  f"{statistics.median(tempos):>8.1f} | {_percentil(tempos, 0.95):>8.1f} | {ttft:>8}")
+    finally:
+        novo.async_client, novo.LLM_STREAM = originais
+        servidor.shutdown()
+
+
+def bench_candidatos(n, ruins, atraso_ms, ms_por_token, tamanhos):
+    """Best-of-N numa chamada x gerar e tentar de novo, e latência da checagem de similaridade x histórico."""
+    from openai import AsyncOpenAI
+    import novo
+    from similaridade import IndiceLSH
+
+    print(f"Checagem de similaridade (índice LSH em memória, {novo.SIMILARIDADE_JANELA} na janela padrão)")
+    print(f"{'histórico':>10} | {'p50 µs':>8} | {'p95 µs':>8}")
+    random.seed(3)
+    for tamanho in tamanhos:
+        indice = IndiceLSH()
+        for i in range(tamanho):
+            indice.adicionar(i, _mensagem_fake(f"{i}"))
+        consultas = [_mensagem_fake("consulta") for _ in range(200)]
+        tempos = []
+        for texto in consultas:
+            t0 = time.perf_counter()
+            indice.max_similaridade(texto)
+            tempos.append((time.perf_counter() - t0) * 1e6)
+        print(f"{tamanho:>10} | {statistics.median(tempos):>8.1f} | {_percentil(tempos, 0.95):>8.1f}")
+
+    _reset_db(os.path.join(_TMP_DIR, 'candidatos.db'))
+    servidor, url, contador = _servidor_llm_fake({"*": {"atraso_ms": atraso_ms, "ms_por_token": ms_por_token, "ruim": ruins}})
+    originais = (novo.async_client, novo.GERACAO_CANDIDATOS, novo.LLM_STREAM)
+    novo.async_client = AsyncOpenAI(base_url=url, api_key='fake', max_retries=0)
+    novo.LLM_STREAM = False
+    novo._indices.clear()
+    print(f"\n{n} gerações | {ruins:.0%} de textos inválidos ou repetidos | 1º token {atraso_ms:.0f} ms | {ms_por_token:.0f} ms/token")
+    print(f"{'modo':<14} | {'ok':>4} | {'chamadas LLM':>12} | {'tokens saída':>12} | {'p50 ms':>8} | {'p95 ms':>8}")
+    try:
+        for nome, candidatos in (('1 + retentar', 1), ('best-of-4', 4)):
+            novo.GERACAO_CANDIDATOS = candidatos
+            contador.update(requisicoes=0, tokens=0)
+            random.seed(11)
+            tempos, ok = [], 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(n):
+                    t0 = time.perf_counter()
+                    try:
+                        novo.gerar(random.choice(ACOES))
+                        ok += 1
+                    except novo.GeracaoInvalida:
+                        pass
+                    tempos.append((time.perf_counter() - t0) * 1000)
+            print(f"{nome:<14} | {ok:>4} | {contador['requisicoes']:>12} | {contador['tokens']:>12} | "
+                  f"{statistics.median(tempos):>8.1f} | {_percentil(tempos, 0.95):>8.1f}")
+    finally:
+        novo.async_client, novo.GERACAO_CANDIDATOS, novo.LLM_STREAM = originais
+        novo._indices.clear()
+        servidor.shutdown()
+
+
+def _parafrasear(texto, fracao=0.25):
+    """Troca uma fração das palavras por outras do vocabulário fake (quase-repetição)."""
+    palavras = texto.split()
+    for j in random.sample(range(len(palavras)), int(len(palavras) * fracao)):
+        palavras[j] = random.choice(_PALAVRAS)
+    return " ".join(palavras)
+
+
+def bench_similares(sizes, consultas, bruto_max, limiar):
+    """`find_similar` (índice LSH no SQLite) x comparação com todos os tweets, por tamanho do histórico.
+
+    Confere que o p50 do LSH não acompanha o histórico: do menor ao maior (a partir de 1000 tweets)
+    cresce no máximo 5x. O que cresce é o número de candidatos por colisão, que para em
+    LSH_MAX_CANDIDATOS; uma busca que percorresse o histórico cresceria junto com ele.
+    """
+    import similaridade
+
+    p50s = {}
+    print(f"{'histórico':>10} | {'indexação s':>11} | {'LSH p50 ms':>10} | {'LSH p95 ms':>10} | {'bruto p50 ms':>12} | {'recall':>6}")
+    for size in sizes:
+        random.seed(5)
+        _reset_db(os.path.join(_TMP_DIR, f'similares-{size}.db'))
+        _seed(size, texto=lambda i: _mensagem_fake(f"{i}"))
+        t0 = time.perf_counter()
+        db_sqlite.indexar_similaridade()
+        db_sqlite._lsh_conferido.add((db_sqlite.DB_PATH, db_sqlite._geracao))
+        indexacao = time.perf_counter() - t0
+
+        conn = db_sqlite.get_connection()
+        ids = [random.randint(1, size) for _ in range(consultas // 2)]
+        originais = [conn.execute("SELECT tweet_text FROM tweets WHERE id = ?", (i,)).fetchone()[0] for i in ids]
+        textos = [_parafrasear(t) for t in originais] + [_mensagem_fake("nova") for _ in range(consultas - len(ids))]
+
+        tempos, achados = [], []
+        for texto in textos:
+            t0 = time.perf_counter()
+            achados.append({t['id'] for t in db_sqlite.find_similar(texto, limiar, limit=1000)})
+            tempos.append((time.perf_counter() - t0) * 1000)
+
+        bruto, recall = '-', '-'
+        if size <= bruto_max:
+            amostra = list(range(0, len(textos), max(1, len(textos) // 10)))
+            tempos_bruto, esperados, encontrados = [], 0, 0
+            for k in amostra:
+                t0 = time.perf_counter()
+                sh = similaridade.shingles(textos[k])
+                certos = {r[0] for r in conn.execute("SELECT id, tweet_text FROM tweets")
+                          if similaridade.jaccard(sh, similaridade.shingles(r[1])) >= limiar}
+                tempos_bruto.append((time.perf_counter() - t0) * 1000)
+                esperados += len(certos)
+                encontrados += len(certos & achados[k])
+            bruto = f"{statistics.median(tempos_bruto):.1f}"
+            recall = f"{encontrados / esperados:.0%}" if esperados else '-'
+        p50s[size] = statistics.median(tempos)
+        print(f"{size:>10} | {indexacao:>11.1f} | {p50s[size]:>10.3f} | {_percentil(tempos, 0.95):>10.3f} | "
+              f"{bruto:>12} | {recall:>6}")
+
+    medidos = sorted(s for s in p50s if s >= 1000)
+    if len(medidos) < 2:
+        return True
+    menor, maior = medidos[0], medidos[-1]
+    # Folga absoluta de 0,05 ms para o ruído de consultas que levam décimos de milissegundo
+    ok = p50s[maior] <= 5 * p50s[menor] + 0.05
+    print(f"{'✅' if ok else '❌'} p50 do LSH com {maior} tweets: {p50s[maior]:.3f} ms "
+          f"({p50s[maior] / p50s[menor]:.1f}x o de {menor} tweets; limite 5x)")
+    return ok
+
+
+def bench_prefixo(n):
+    """Parcela do prompt servida do cache de prefixo (simulado no servidor local) por ponto de chamada."""
+    from datetime import timedelta
+    from openai import AsyncOpenAI
+    import llm
+    import novo
+
+    _reset_db(os.path.join(_TMP_DIR, 'prefixo.db'))
+    servidor, url, _ = _servidor_llm_fake({})
+    cliente_original = novo.async_client
+    novo.async_client = AsyncOpenAI(base_url=url, api_key='fake', max_retries=0)
+    llm.metricas.clear()
+    random.seed(13)
+    # Cada geração num horário diferente, como nas rotinas reais
+    inicio = novo.agora()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(n):
+                novo.set_relogio(lambda: inicio + timedelta(minutes=37 * i))
+                novo.gerar(ACOES[i % len(ACOES)], persistir=False)
+                novo.executar(novo._classificar_textos_llm([_mensagem_fake(f"{i}-{j}") for j in range(5)]))
+    finally:
+        novo.set_relogio(None)
+        novo.async_client = cliente_original
+        servidor.shutdown()
+
+    print(f"{'ponto de chamada':<16} | {'chamadas':>8} | {'tokens prompt':>13} | {'em cache':>8} | {'%':>5}")
+    for site in ('gerador', 'classificador'):
+        r = llm.resumo(site)
+        parcela = r['cached_tokens'] / r['prompt_tokens'] if r['prompt_tokens'] else 0
+        print(f"{site:<16} | {r['chamadas']:>8} | {r['prompt_tokens']:>13} | {r['cached_tokens']:>8} | {parcela:>5.0%}")
+
+
+def bench_cache(janelas, rodadas, atraso_ms):
+    """Mesmas janelas sem tom no 'type' reclassificadas pelo caminho real (`_preparar_tom_async`).
+
+    Cada janela é um perfil com 5 tweets antigos; o classificador local fica desligado para todos
+    irem ao LLM. Com `tweet_tones`, só a primeira rodada de cada janela chama o LLM; sem ela
+    (tabela apagada a cada rodada), todas chamam. Falha se o cache por tweet não evitar as repetições.
+    """
+    from openai import AsyncOpenAI
+    import novo
+    import perfis
+
+    random.seed(7)
+    lista = [{"id": f"j{j:03d}", "variaveis": {"destinatario": "Laura"}} for j in range(janelas)]
+    originais = (novo.async_client, novo.LOCAL_TONE_THRESHOLD)
+    novo.LOCAL_TONE_THRESHOLD = 2.0
+    perfis.definir(lista)
+    resultados = {}
+    print(f"{'cenário':<22} | {'req. servidor':>13} | {'tons do cache':>13} | {'tons do LLM':>11} | {'ms/janela':>9}")
+    try:
+        for nome, manter in (("sem tweet_tones", False), ("com tweet_tones", True)):
+            _reset_db(os.path.join(_TMP_DIR, f"cache-{'com' if manter else 'sem'}.db"))
+            for p in lista:
+                for k in range(5):
+                    db_sqlite.inserir_tweets([(_mensagem_fake(f"{p['id']}-{k}"), 'bom_dia', None, p['id'])])
+            servidor, url, contador = _servidor_llm_fake({'*': {"atraso_ms": atraso_ms}})
+            novo.async_client = AsyncOpenAI(base_url=url, api_key='fake', max_retries=0)
+            antes = dict(novo.tom_stats)
+            t0 = time.perf_counter()
+            for _ in range(rodadas):
+                if not manter:
+                    db_sqlite.get_connection().execute("DELETE FROM tweet_tones")
+                    db_sqlite.get_connection().commit()
+                for p in lista:
+                    with perfis.usando(p['id']), contextlib.redirect_stdout(io.StringIO()):
+                        prev, _ = novo.executar(novo._preparar_tom_async(5))
+                    if len(prev) != 5:
+                        raise SystemExit(f"❌ classificação incompleta em '{nome}'")
+            ms = (time.perf_counter() - t0) * 1000 / (rodadas * janelas)
+            servidor.shutdown()
+            resultados[nome] = contador['requisicoes']
+            print(f"{nome:<22} | {contador['requisicoes']:>13} | {novo.tom_stats['cache'] - antes['cache']:>13} | "
+                  f"{novo.tom_stats['llm'] - antes['llm']:>11} | {ms:>9.2f}")
+    finally:
+        novo.async_client, novo.LOCAL_TONE_THRESHOLD = originais
+        perfis.definir(None)
+
+    ok = resultados["com tweet_tones"] == janelas and resultados["sem tweet_tones"] == janelas * rodadas
+    print(f"{'✅' if ok else '❌'} com tweet_tones só a primeira rodada de cada janela chama o LLM "
+          f"({resultados['com tweet_tones']} de {janelas * rodadas} chamadas)")
+    return ok
+
+
+def _tempos_importacao(saida_stderr):
+    """{módulo: ms acumulados} das linhas de `python -X importtime`."""
+    tempos = {}
+    for linha in saida_stderr.splitlines():
+        if linha.startswith('import time:') and '|' in linha:
+            _, acumulado, nome = linha[len('import time:'):].split('|')
+            if acumulado.strip().isdigit():
+                tempos[nome.strip()] = int(acumulado) / 1000
+    return tempos
+
+
+def bench_arranque(n, saida, comparar):
+    """Partida a frio de execuções avulsas (processo novo a cada vez), como num cron.
+
+    Mede o tempo de importação dos módulos (`python -X importtime -c "import main"`) e o tempo de
+    parede de `main.py --help` e de `main.py run <ação> --dry-run` contra o servidor LLM local.
+    """
+    import json
+    import subprocess
+    import sys
+
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    servidor, url, _ = _servidor_llm_fake({})
+    env = dict(os.environ, OPENROUTER_BASE_URL=url, OPENROUTER_API_KEY='fake',
+               SQLITE_DB_PATH=os.path.join(_TMP_DIR, 'arranque.db'), DRY_RUN='true')
+    modulos = ('main', 'novo', 'db_sqlite', 'openai', 'apscheduler', 'dotenv')
+    importacao = {m: [] for m in modulos}
+    comandos = {"--help": [sys.executable, 'main.py', '--help'],
+                "run --dry-run": [sys.executable, 'main.py', 'run', ACOES[0], '--dry-run']}
+    parede = {nome: [] for nome in comandos}
+    try:
+        for _ in range(n):
+            r = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=raiz, env=env,
+                               capture_output=True, text=True)
+            tempos = _tempos_importacao(r.stderr)
+            for m in modulos:
+                importacao[m].append(tempos.get(m, 0.0))
+            for nome, cmd in comandos.items():
+                t0 = time.perf_counter()
+                r = subprocess.run(cmd, cwd=raiz, env=env, capture_output=True, text=True)
+                parede[nome].append((time.perf_counter() - t0) * 1000)
+                if r.returncode != 0:
+                    raise SystemExit(f"❌ {' '.join(cmd[1:])} falhou:\n{r.stdout}{r.stderr}")
+    finally:
+        servidor.shutdown()
+
+    resultados = {"importacao_ms": {m: round(statistics.median(v), 1) for m, v in importacao.items()},
+                  "parede_ms": {c: round(statistics.median(v), 1) for c, v in parede.items()}}
+    base = {}
+    if comparar:
+        with open(comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+        print(f"Comparando com {comparar} (commit {anterior.get('commit') or '?'})")
+        base = {**anterior["importacao_ms"], **anterior["parede_ms"]}
+
+    def delta(chave, valor):
+        return f"{valor / base[chave] - 1:+.0%}" if base.get(chave) else ''
+
+    print(f"{'importação (p50 de ' + str(n) + ')':<22} | {'ms':>8} | {'Δ':>6}")
+    for m, ms in resultados["importacao_ms"].items():
+        print(f"{m:<22} | {ms:>8.1f} | {delta(m, ms):>6}")
+    print(f"{'processo (p50)':<22} | {'ms':>8} | {'Δ':>6}")
+    for c, ms in resultados["parede_ms"].items():
+        print(f"{c:<22} | {ms:>8.1f} | {delta(c, ms):>6}")
+
+    if saida:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=raiz).stdout.strip() or None
+        with open(saida, 'w', encoding='utf-8') as f:
+            json.dump({"commit": commit, "n": n, **resultados}, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {saida}")
+
+
+# Subcomandos que conferem comportamento e saem com erro se algo falhar, com os argumentos usados em `verificar`.
+# Os que só medem tempo ou vazão (recent, pool, escrita, similares, e2e...) ficam de fora; o `arquivo`
+# roda a conferência de ida e volta num banco pequeno, já que o tamanho padrão é de medição.
+CONFERENCIAS = (
+    ('chamadas', []),
+    ('llm', []),
+    ('semana', []),
+    ('agenda', []),
+    ('cache', []),
+    ('arquivo', ['--linhas', '2000']),
+    ('perfis', []),
+)
+
+
+def verificar():
+    """Roda cada conferência num processo próprio (estado de módulo isolado); False se alguma falhar."""
+    resultados = []
+    for nome, argumentos in CONFERENCIAS:
+        print(f"\n▶️ {nome} {' '.join(argumentos)}".rstrip(), flush=True)
+        t0 = time.perf_counter()
+        rc = subprocess.run([sys.executable, os.path.abspath(__file__), nome, *argumentos]).returncode
+        resultados.append((nome, rc, time.perf_counter() - t0))
+    print()
+    for nome, rc, segundos in resultados:
+        print(f"{'✅' if rc == 0 else '❌'} {nome:<10} {segundos:>6.1f} s" + (f" (saída {rc})" if rc else ""))
+    return all(rc == 0 for _, rc, _ in resultados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('recent', help='latência das consultas de tweets recentes x tamanho do histórico')
+    p.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 100_000, 1_000_000])
+    p.add_argument('--repeticoes', type=int, default=200)
+
+    p = sub.add_parser('pool', help='vazão de inserção/leitura: conexão por chamada x pool com WAL')
+    p.add_argument('--n', type=int, default=2000)
+
+    p = sub.add_parser('escrita', help='gravação de tweets: commit por tweet x fila em lotes de vários tamanhos')
+    p.add_argument('--n', type=int, default=5000)
+    p.add_argument('--lotes', type=int, nargs='+', default=[1, 8, 32, 128, 512])
+    p.add_argument('--intervalo-ms', type=float, default=200.0, help='espera máxima do lote')
+
+    p = sub.add_parser('arquivo', help='exportação/importação em stream em bancos com milhões de tweets')
+    p.add_argument('--linhas', type=int, nargs='+', default=[200_000, 2_000_000])
+    p.add_argument('--lote', type=int, default=10_000)
+    p.add_argument('--formatos', nargs='+', default=['jsonl', 'jsonl.gz', 'ltw', 'parquet'])
+
+    p = sub.add_parser('publish', help='envio ao Twitter contra endpoint local: sessão por envio x reutilizada')
+    p.add_argument('--n', type=int, default=500)
+    p.add_argument('--atraso-ms', type=float, default=0.0)
+
+    p = sub.add_parser('semana', help='semana simulada de ticks do scheduler com relógio fake')
+    p.add_argument('--inicio', default='2026-10-19T00:00:00', help='início (horário de São Paulo)')
+
+    p = sub.add_parser('agenda', help='scheduler com relógio simulado: reinícios, atrasos, coalesce e sobreposição')
+
+    p = sub.add_parser('tom-local', help='avaliação offline do classificador de tom local')
+    p.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tweets.db'))
+    # Limiar avaliado; o padrão de LOCAL_TONE_THRESHOLD desativa o classificador
+    p.add_argument('--limiar', type=float, default=0.6)
+    p.add_argument('--folds', type=int, default=5)
+
+    p = sub.add_parser('llm', help='retentativas, fallback e circuit breaker contra servidor LLM local')
+    p.add_argument('--n', type=int, default=20)
+
+    p = sub.add_parser('stream', help='geração com e sem stream com rascunhos inválidos (hashtag, >280)')
+    p.add_argument('--n', type=int, default=30)
+    p.add_argument('--ruins', type=float, default=0.3, help='fração de respostas inválidas do gerador')
+    p.add_argument('--atraso-ms', type=float, default=150.0, help='latência até o primeiro token')
+    p.add_argument('--ms-por-token', type=float, default=15.0)
+
+    p = sub.add_parser('candidatos', help='best-of-N numa chamada x retentativas; latência da checagem de similaridade')
+    p.add_argument('--n', type=int, default=30)
+    p.add_argument('--ruins', type=float, default=0.5, help='fração de respostas inválidas ou repetidas do gerador')
+    p.add_argument('--atraso-ms', type=float, default=150.0, help='latência até o primeiro token')
+    p.add_argument('--ms-por-token', type=float, default=5.0)
+    p.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10_000, 100_000])
+
+    p = sub.add_parser('similares', help='find_similar (LSH no SQLite) x comparação com todo o histórico')
+    p.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 100_000])
+    p.add_argument('--consultas', type=int, default=200, help='metade quase-repetições, metade textos novos')
+    p.add_argument('--bruto-max', type=int, default=100_000, help='maior histórico comparado por força bruta')
+    p.add_argument('--limiar', type=float, default=0.6)
+
+    p = sub.add_parser('prefixo', help='parcela do prompt servida do cache de prefixo por ponto de chamada')
+    p.add_argument('--n', type=int, default=20)
+
+    p = sub.add_parser('cache', help='janelas reclassificadas pelo caminho real, com e sem o cache tweet_tones')
+    p.add_argument('--janelas', type=int, default=20, help='janelas distintas de 5 tweets')
+    p.add_argument('--rodadas', type=int, default=5, help='vezes que cada janela é classificada')
+    p.add_argument('--atraso-ms', type=float, default=50.0)
+
+    p = sub.add_parser('arranque', help='partida a frio: tempo de importação e de execuções avulsas do main.py')
+    p.add_argument('--n', type=int, default=10, help='processos medidos por comando')
+    p.add_argument('--saida', help='grava os resultados em JSON (com o commit atual)')
+    p.add_argument('--comparar', help='JSON de uma execução anterior para mostrar a variação')
+
+    sub.add_parser('chamadas', help='chamadas ao modelo por run_action com cliente fake (classificador e gerador)')
+
+    p = sub.add_parser('e2e', help='run_action de ponta a ponta por ação contra LLM e Twitter locais')
+    p.add_argument('--sizes', type=int, nargs='+', default=[0, 1000, 100_000], help='tamanhos do histórico semeado')
+    p.add_argument('--n', type=int, default=20, help='execuções por ação')
+    p.add_argument('--llm-atraso-ms', type=float, default=50.0)
+    p.add_argument('--twitter-atraso-ms', type=float, default=20.0)
+    p.add_argument('--sem-tom', type=float, default=0.2, help='fração do histórico sem tom no type')
+    p.add_argument('--semente', type=int, default=42)
+    p.add_argument('--saida', help='grava os resultados em JSON (com o commit atual)')
+    p.add_argument('--comparar', help='JSON de uma execução anterior para mostrar a variação do p50')
+
+    p = sub.add_parser('perfis', help='vários perfis num processo: pré-geração e publicação em pool com limite de taxa')
+    p.add_argument('--n', type=int, default=100, help='perfis de teste')
+    p.add_argument('--workers', type=int, nargs='+', default=[1, 16], help='threads de publicação (SCHEDULER_WORKERS)')
+    p.add_argument('--llm-concorrencia', type=int, default=8)
+    p.add_argument('--llm-por-s', type=float, default=50.0)
+    p.add_argument('--twitter-por-s', type=float, default=100.0)
+    p.add_argument('--llm-atraso-ms', type=float, default=50.0)
+    p.add_argument('--twitter-atraso-ms', type=float, default=20.0)
+
+    sub.add_parser('verificar', help='todas as conferências de comportamento (✅/❌); sai com erro se alguma falhar')
+
+    args = parser.parse_args()
+    if args.bench == 'verificar':
+        raise SystemExit(0 if verificar() else 1)
+    if args.bench == 'recent':
+        bench_recent(args.sizes, args.repeticoes)
+    elif args.bench == 'pool':
+        bench_pool(args.n)
+    elif args.bench == 'escrita':
+        bench_escrita(args.n, args.lotes, args.intervalo_ms)
+    elif args.bench == 'arquivo':
+        raise SystemExit(0 if bench_arquivo(args.linhas, args.lote, args.formatos) else 1)
+    elif args.bench == 'publish':
+        bench_publish(args.n, args.atraso_ms)
+    elif args.bench == 'tom-local':
+        bench_tom_local(args.db, args.limiar, args.folds)
+    elif args.bench == 'llm':
+        raise SystemExit(0 if bench_llm(args.n) else 1)
+    elif args.bench == 'stream':
+        bench_stream(args.n, args.ruins, args.atraso_ms, args.ms_por_token)
+    elif args.bench == 'candidatos':
+        bench_candidatos(args.n, args.ruins, args.atraso_ms, args.ms_por_token, args.tamanhos)
+    elif args.bench == 'similares':
+        raise SystemExit(0 if bench_similares(args.sizes, args.consultas, args.bruto_max, args.limiar) else 1)
+    elif args.bench == 'prefixo':
+        bench_prefixo(args.n)
+    elif args.bench == 'cache':
+        raise SystemExit(0 if bench_cache(args.janelas, args.rodadas, args.atraso_ms) else 1)
+    elif args.bench == 'arranque':
+        bench_arranque(args.n, args.saida, args.comparar)
+    elif args.bench == 'e2e':
+        bench_e2e(args.sizes, args.n, args.llm_atraso_ms, args.twitter_atraso_ms, args.sem_tom, args.semente,
+                  args.saida, args.comparar)
+    elif args.bench == 'agenda':
+        raise SystemExit(0 if bench_agenda() else 1)
+    elif args.bench == 'semana':
+        raise SystemExit(0 if bench_semana(args.inicio) else 1)
+    elif args.bench == 'chamadas':
+        raise SystemExit(0 if bench_chamadas() else 1)
+    elif args.bench == 'perfis':
+        raise SystemExit(0 if bench_perfis(args.n, args.workers, args.llm_concorrencia, args.llm_por_s,
+                                           args.twitter_por_s, args.llm_atraso_ms, args.twitter_atraso_ms) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,99 +1,601 @@
+import atexit
 import os
 import sqlite3
-from dotenv import load_dotenv
+import threading
 
-# Carrega variáveis do .env (opcional)
-load_dotenv('./.env')
+import similaridade
+
+if __name__ == '__main__':
+    # Como módulo, quem carrega o .env é o ponto de entrada (main.py) antes de importar este arquivo
+    from dotenv import load_dotenv
+    load_dotenv('./.env')
 
 # Caminho do arquivo de banco
 DB_PATH = os.getenv('SQLITE_DB_PATH', os.path.join(os.path.dirname(__file__), 'tweets.db'))
 
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Perfil (conta/destinatário) dos dados gravados sem perfil explícito e do histórico anterior aos perfis
+PERFIL_PADRAO = 'laura'
+
+# Parte "função" de type (func:tone_key); precisa ser idêntica no índice e nas consultas
+TYPE_FUNC_EXPR = "(CASE WHEN instr(type, ':') > 0 THEN substr(type, 1, instr(type, ':') - 1) ELSE type END)"
+
+
+# Pragmas aplicados a cada conexão: WAL permite leitores concorrentes durante uma escrita
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # ~16 MB
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Uma conexão por thread e por caminho de banco, reaproveitada entre chamadas
+_local = threading.local()
+_conexoes_lock = threading.Lock()
+_conexoes = []
+_geracao = 0  # incrementada em fechar_conexoes para invalidar o cache das outras threads
+# Caminhos cujo esquema já foi criado nesta execução (na primeira conexão, não ao importar)
+_esquemas = set()
+
+
+def _abrir_conexao(path):
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+def get_connection():
+    """Retorna a conexão da thread atual para DB_PATH, abrindo-a na primeira vez.
+
+    A conexão é compartilhada entre chamadas; não feche-a (use `fechar_conexoes`).
+    """
+    conns = getattr(_local, 'conns', None)
+    if conns is None or getattr(_local, 'geracao', None) != _geracao:
+        conns = _local.conns = {}
+        _local.geracao = _geracao
+    conn = conns.get(DB_PATH)
+    if conn is None:
+        conn = _abrir_conexao(DB_PATH)
+        if DB_PATH not in _esquemas:
+            with _conexoes_lock:
+                if DB_PATH not in _esquemas:
+                    try:
+                        _criar_esquema(conn)
+                    except Exception:
+                        conn.close()
+                        raise
+                    _esquemas.add(DB_PATH)
+        conns[DB_PATH] = conn
+        with _conexoes_lock:
+            _conexoes.append(conn)
+    return conn
+
+
+def _rollback():
+    """Desfaz transação pendente da conexão da thread para não contaminar o próximo uso."""
+    conn = getattr(_local, 'conns', {}).get(DB_PATH)
+    if conn is not None and conn.in_transaction:
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            pass
+
+
+def fechar_conexoes():
+    """Fecha todas as conexões abertas (de todas as threads)."""
+    global _geracao
+    with _conexoes_lock:
+        _geracao += 1
+        for conn in _conexoes:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _conexoes.clear()
+        _esquemas.clear()
+
+
+atexit.register(fechar_conexoes)
+
+
+def _criar_esquema(conn):
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS tweets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tweet_text TEXT NOT NULL,
+            type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            perfil TEXT NOT NULL DEFAULT '{PERFIL_PADRAO}'
+        )
+        """
+    )
+    # Cache de classificação de tom por tweet (invalidado pela versão do catálogo/modelo)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tweet_tones (
+            tweet_id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            tone_key TEXT NOT NULL,
+            version TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    # Rascunhos pré-gerados aguardando o horário de publicação
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS drafts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,
+            tweet_text TEXT NOT NULL,
+            tone_key TEXT,
+            status TEXT NOT NULL DEFAULT 'pronto',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            used_at TIMESTAMP,
+            perfil TEXT NOT NULL DEFAULT '{PERFIL_PADRAO}'
+        )
+        """
+    )
+    _particionar_por_perfil(cur)
+    # Índice de similaridade (LSH): uma linha por banda da assinatura MinHash de cada tweet, por perfil
+    colunas_lsh = {r[1] for r in cur.execute("PRAGMA table_info(tweet_lsh)")}
+    if colunas_lsh and 'perfil' not in colunas_lsh:
+        # Índice anterior aos perfis: é refeito na próxima busca (indexar_similaridade desde o início)
+        cur.execute("DROP TABLE tweet_lsh")
+        cur.execute("DROP TABLE IF EXISTS similaridade_meta")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tweet_lsh (
+            perfil TEXT NOT NULL,
+            chave INTEGER NOT NULL,
+            tweet_id INTEGER NOT NULL,
+            PRIMARY KEY (perfil, chave, tweet_id)
+        ) WITHOUT ROWID
+        """
+    )
+    # Versão dos parâmetros do índice e último id coberto pela indexação em lote
+    cur.execute("CREATE TABLE IF NOT EXISTS similaridade_meta (chave TEXT PRIMARY KEY, valor TEXT)")
+    # Jobs do scheduler (agenda_sqlite.SQLiteJobStore): próximo disparo em timestamp UTC e estado em pickle
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agendamentos (
+            id TEXT PRIMARY KEY,
+            next_run_time REAL,
+            job_state BLOB NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_agendamentos_next_run_time ON agendamentos (next_run_time)")
+    conn.commit()
+    cur.close()
+
+
+def _particionar_por_perfil(cur):
+    """Coluna `perfil` em tweets e drafts (bancos anteriores aos perfis) e índices que começam por ela.
+
+    As consultas do bot filtram por perfil, então os índices antigos por função e por ação saem;
+    o de created_at fica para os rótulos do classificador local, que valem para todos os perfis.
+    """
+    for tabela in ('tweets', 'drafts'):
+        colunas = {r[1] for r in cur.execute(f"PRAGMA table_info({tabela})")}
+        if 'perfil' not in colunas:
+            cur.execute(f"ALTER TABLE {tabela} ADD COLUMN perfil TEXT NOT NULL DEFAULT '{PERFIL_PADRAO}'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tweets_created_at ON tweets (created_at)")
+    # Consultas "mais recentes" do perfil (geral e por função do 'type'), busca exata por texto
+    # e rascunhos prontos por ação
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tweets_perfil_created_at ON tweets (perfil, created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tweets_perfil_tweet_text ON tweets (perfil, tweet_text)")
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_tweets_perfil_func_created_at ON tweets (perfil, {TYPE_FUNC_EXPR}, created_at)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_drafts_perfil_action_status ON drafts (perfil, action, status, created_at)"
+    )
+    for antigo in ('idx_tweets_func_created_at', 'idx_drafts_action_status'):
+        cur.execute(f"DROP INDEX IF EXISTS {antigo}")
+
+
 def init_db():
+    """Cria as tabelas e índices em DB_PATH, se faltarem (também é feito na primeira conexão)."""
+    try:
+        get_connection()
+        return True
+    except Exception as e:
+        _rollback()
+        print(f"❌ Erro ao inicializar banco SQLite: {e}")
+        return False
+
+
+def inserir_tweets(itens):
+    """Grava vários tweets numa única transação, com as chaves LSH de cada um.
+
+    `itens`: [(tweet_text, type, created_at ou None, perfil)]; created_at no formato de CURRENT_TIMESTAMP (UTC).
+    Retorna [{"id", "tweet_text", "type", "perfil"}] na mesma ordem. Erros sobem para quem chamou (nada fica gravado).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        gravados = []
+        for tweet_text, type, created_at, perfil in itens:
+            cur.execute(
+                "INSERT INTO tweets (tweet_text, type, created_at, perfil) "
+                "VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)",
+                (tweet_text, type, created_at, perfil),
+            )
+            inserted_id = cur.lastrowid
+            _, chaves = similaridade.chaves_banco(tweet_text)
+            if chaves:
+                cur.execute(
+                    f"INSERT OR IGNORE INTO tweet_lsh (perfil, chave, tweet_id) VALUES {','.join(['(?, ?, ?)'] * len(chaves))}",
+                    [v for c in chaves for v in (perfil, c, inserted_id)],
+                )
+            gravados.append({"id": inserted_id, "tweet_text": tweet_text, "type": type, "perfil": perfil})
+        conn.commit()
+        return gravados
+    except Exception:
+        _rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def inserir_last_tweet(tweet_text, type, perfil=PERFIL_PADRAO):
+    try:
+        gravado = inserir_tweets([(tweet_text, type, None, perfil)])[0]
+        print(f"✅ Tweet inserido com sucesso: id={gravado['id']}")
+        return gravado
+    except Exception as e:
+        print(f"❌ Erro ao inserir tweet no SQLite: {e}")
+        return None
+
+
+def recent_tweets(limit, type_prefix=None, perfil=PERFIL_PADRAO):
+    """Retorna os `limit` tweets mais recentes do perfil, opcionalmente filtrando pela função em 'type'.
+
+    Usa os índices em (perfil, created_at) e (perfil, função de 'type'), então o custo não cresce
+    com o histórico nem com o número de perfis. Não imprime nada; para exibir use `imprimir_tweets`.
+    """
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        if type_prefix:
+            cur.execute(
+                f"SELECT id, tweet_text, type, created_at FROM tweets WHERE perfil = ? AND {TYPE_FUNC_EXPR} = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (perfil, type_prefix, int(limit)),
+            )
+        else:
+            cur.execute(
+                "SELECT id, tweet_text, type, created_at FROM tweets WHERE perfil = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (perfil, int(limit)),
+            )
+        rows = cur.fetchall()
+        cur.close()
+        return [dict(r) for r in rows]
+    except Exception as e:
+        print(f"❌ Erro ao listar tweets recentes no SQLite: {e}")
+        return []
+
+
+def imprimir_tweets(tweets):
+    print(f"📋 Tweets encontrados: {len(tweets)}")
+    for t in tweets:
+        print(f"  - {t['tweet_text']}: {t['type']}")
+
+
+def iterar_tweets(lote=10000, desde_id=0):
+    """Percorre a tabela tweets em ordem de id, `lote` linhas por vez (sqlite3.Row, acesso por nome ou posição).
+
+    Cada bloco é uma consulta própria a partir do último id visto, então a memória não cresce com
+    o histórico e nenhuma transação de leitura fica aberta entre um bloco e outro.
+    """
+    ultimo = int(desde_id)
+    while True:
+        rows = get_connection().execute(
+            "SELECT id, tweet_text, type, created_at, perfil FROM tweets WHERE id > ? ORDER BY id LIMIT ?",
+            (ultimo, int(lote)),
+        ).fetchall()
+        if not rows:
+            return
+        yield rows
+        ultimo = rows[-1]['id']
+
+
+def importar_tweets(linhas, manter_ids=False):
+    """Grava um bloco de tweets vindos de um arquivo numa única transação, sem montar o índice de similaridade.
+
+    `linhas`: [(id, tweet_text, type, created_at ou None, perfil)]; sem created_at vale o horário da importação,
+    como em `inserir_tweets`. Com `manter_ids`, ids que já existem são ignorados
+    (reimportar o mesmo arquivo não duplica); sem, os tweets ganham ids novos no fim da tabela.
+    As chaves LSH dos importados são geradas na próxima busca (`indexar_similaridade`).
+    Retorna quantos tweets foram gravados. Erros sobem para quem chamou (nada do bloco fica gravado).
+    """
+    if not linhas:
+        return 0
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        if manter_ids:
+            cur.executemany(
+                "INSERT OR IGNORE INTO tweets (id, tweet_text, type, created_at, perfil) "
+                "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)", linhas
+            )
+            gravados = cur.rowcount
+            # Ids abaixo do ponto já indexado ficariam fora do índice; a indexação recomeça antes deles
+            menor = min(l[0] for l in linhas)
+            cur.execute(
+                "UPDATE similaridade_meta SET valor = ? WHERE chave = 'indexado_ate' AND CAST(valor AS INTEGER) >= ?",
+                (str(menor - 1), menor),
+            )
+        else:
+            cur.executemany(
+                "INSERT INTO tweets (tweet_text, type, created_at, perfil) VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)",
+                [l[1:] for l in linhas]
+            )
+            gravados = len(linhas)
+        conn.commit()
+        _lsh_conferido.discard((DB_PATH, _geracao))
+        return gravados
+    except Exception:
+        _rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def buscar_tweet(tweet_text, perfil=PERFIL_PADRAO):
+    """Tweets do perfil com exatamente este texto (índice em (perfil, tweet_text))."""
     try:
         conn = get_connection()
         cur = conn.cursor()
         cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS tweets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tweet_text TEXT NOT NULL,
-                type TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            "SELECT id, tweet_text, type, created_at FROM tweets WHERE perfil = ? AND tweet_text = ?",
+            (perfil, tweet_text),
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return [dict(r) for r in rows]
+    except Exception as e:
+        _rollback()
+        print(f"❌ Erro ao buscar tweet no SQLite: {e}")
+        return []
+
+
+# Máximo de candidatos do LSH comparados pelo Jaccard exato em cada busca
+LSH_MAX_CANDIDATOS = 50
+
+# Tweets lidos de cada bucket (os mais recentes): buckets de trechos comuns crescem com o histórico
+LSH_MAX_POR_BUCKET = 256
+
+# Bancos cujo índice de similaridade já foi conferido nesta execução (por geração das conexões)
+_lsh_conferido = set()
+
+
+def indexar_similaridade(lote=5000):
+    """Indexa os tweets ainda fora do índice de similaridade (histórico antigo ou inserido por fora).
+
+    Refaz o índice inteiro se os parâmetros do MinHash mudaram. Retorna quantos tweets foram indexados.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        meta = dict(cur.execute("SELECT chave, valor FROM similaridade_meta").fetchall())
+        ate = int(meta.get('indexado_ate') or 0)
+        if meta.get('versao') != similaridade.VERSAO:
+            cur.execute("DELETE FROM tweet_lsh")
+            ate = 0
+        total = 0
+        while True:
+            rows = cur.execute(
+                "SELECT id, tweet_text, perfil FROM tweets WHERE id > ? ORDER BY id LIMIT ?", (ate, int(lote))
+            ).fetchall()
+            if not rows:
+                break
+            linhas = [(r['perfil'], c, r['id']) for r in rows for c in similaridade.chaves_banco(r['tweet_text'])[1]]
+            cur.executemany("INSERT OR IGNORE INTO tweet_lsh (perfil, chave, tweet_id) VALUES (?, ?, ?)", linhas)
+            ate = rows[-1]['id']
+            cur.executemany(
+                "INSERT OR REPLACE INTO similaridade_meta (chave, valor) VALUES (?, ?)",
+                [('versao', similaridade.VERSAO), ('indexado_ate', str(ate))],
             )
-            """
+            conn.commit()
+            total += len(rows)
+        if meta.get('versao') != similaridade.VERSAO:
+            cur.execute("INSERT OR REPLACE INTO similaridade_meta (chave, valor) VALUES ('versao', ?)", (similaridade.VERSAO,))
+            conn.commit()
+        return total
+    except Exception:
+        _rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _candidatos_similares(texto, perfil):
+    """(shingles do texto, tweets do perfil que colidem com ele em alguma banda do LSH)."""
+    if (DB_PATH, _geracao) not in _lsh_conferido:
+        indexados = indexar_similaridade()
+        if indexados:
+            print(f"🔎 Índice de similaridade atualizado com {indexados} tweet(s)")
+        _lsh_conferido.add((DB_PATH, _geracao))
+    sh, chaves = similaridade.chaves_banco(texto)
+    if not chaves:
+        return sh, []
+    conn = get_connection()
+    cur = conn.cursor()
+    # Quem colide em mais bandas vem primeiro. Cada bucket é lido do fim da chave primária
+    # (perfil, chave, tweet_id) e só até LSH_MAX_POR_BUCKET tweets, então o custo não cresce com o
+    # histórico nem com outros perfis, mesmo nos buckets de trechos comuns
+    buckets = " UNION ALL ".join(
+        ["SELECT * FROM (SELECT tweet_id FROM tweet_lsh WHERE perfil = ? AND chave = ? ORDER BY tweet_id DESC LIMIT ?)"]
+        * len(chaves)
+    )
+    cur.execute(
+        "SELECT t.id, t.tweet_text, t.type, t.created_at FROM "
+        f"(SELECT tweet_id, COUNT(*) AS bandas FROM ({buckets}) "
+        "GROUP BY tweet_id ORDER BY bandas DESC LIMIT ?) AS c JOIN tweets t ON t.id = c.tweet_id",
+        [v for c in chaves for v in (perfil, c, LSH_MAX_POR_BUCKET)] + [LSH_MAX_CANDIDATOS],
+    )
+    rows = cur.fetchall()
+    cur.close()
+    return sh, [dict(r) for r in rows]
+
+
+def find_similar(text, threshold=0.6, limit=10, perfil=PERFIL_PADRAO):
+    """Tweets do perfil parecidos com `text` (Jaccard de shingles >= threshold), do mais parecido ao menos.
+
+    Consulta o índice LSH em tweet_lsh, então o custo depende dos candidatos e não do tamanho
+    do histórico. Cada item traz os campos do tweet e "similaridade".
+    """
+    try:
+        sh, candidatos = _candidatos_similares(text, perfil)
+        for t in candidatos:
+            t['similaridade'] = similaridade.jaccard(sh, similaridade.shingles(t['tweet_text']))
+        parecidos = [t for t in candidatos if t['similaridade'] >= threshold]
+        parecidos.sort(key=lambda t: t['similaridade'], reverse=True)
+        return parecidos[:limit]
+    except Exception as e:
+        _rollback()
+        print(f"❌ Erro ao buscar tweets similares no SQLite: {e}")
+        return []
+
+
+def buscar_tons_cache(tweet_ids, version):
+    """Retorna {tweet_id: {"content_hash": str, "tone_key": str}} das classificações em cache na versão dada."""
+    ids = list(tweet_ids)
+    if not ids:
+        return {}
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        placeholders = ",".join("?" for _ in ids)
+        cur.execute(
+            f"SELECT tweet_id, content_hash, tone_key FROM tweet_tones WHERE version = ? AND tweet_id IN ({placeholders})",
+            (version, *ids),
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return {r['tweet_id']: {"content_hash": r['content_hash'], "tone_key": r['tone_key']} for r in rows}
+    except Exception as e:
+        print(f"❌ Erro ao buscar cache de tons no SQLite: {e}")
+        return {}
+
+
+def gravar_tons_cache(itens, version):
+    """Grava classificações no cache. `itens`: [(tweet_id, content_hash, tone_key)]."""
+    itens = list(itens)
+    if not itens:
+        return 0
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT OR REPLACE INTO tweet_tones (tweet_id, content_hash, tone_key, version) VALUES (?, ?, ?, ?)",
+            [(tid, h, key, version) for tid, h, key in itens],
         )
         conn.commit()
         cur.close()
-        conn.close()
-        return True
+        return len(itens)
     except Exception as e:
-        print(f"❌ Erro ao inicializar banco SQLite: {e}")
-        return False
+        _rollback()
+        print(f"❌ Erro ao gravar cache de tons no SQLite: {e}")
+        return 0
 
 
-# Inicializa a tabela ao importar
-init_db()
+def listar_rotulados(version, limit=5000):
+    """Pares (tweet_text, tone_key) com tom conhecido: o gravado em 'type' ou o classificado em cache na versão dada."""
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT t.tweet_text,
+                   CASE WHEN instr(t.type, ':') > 0 THEN substr(t.type, instr(t.type, ':') + 1) ELSE tt.tone_key END
+            FROM tweets t
+            LEFT JOIN tweet_tones tt ON tt.tweet_id = t.id AND tt.version = ?
+            WHERE instr(t.type, ':') > 0 OR tt.tone_key IS NOT NULL
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT ?
+            """,
+            (version, int(limit)),
+        )
+        rows = [(r[0], r[1]) for r in cur.fetchall()]
+        cur.close()
+        return rows
+    except Exception as e:
+        print(f"❌ Erro ao listar tweets rotulados no SQLite: {e}")
+        return []
 
 
-def inserir_last_tweet(tweet_text, type):
+def inserir_rascunho(action, tweet_text, tone_key, perfil=PERFIL_PADRAO):
     try:
         conn = get_connection()
         cur = conn.cursor()
         cur.execute(
-            "INSERT INTO tweets (tweet_text, type) VALUES (?, ?)",
-            (tweet_text, type),
+            "INSERT INTO drafts (action, tweet_text, tone_key, perfil) VALUES (?, ?, ?, ?)",
+            (action, tweet_text, tone_key, perfil),
         )
         conn.commit()
         inserted_id = cur.lastrowid
         cur.close()
-        conn.close()
-        print(f"✅ Tweet inserido com sucesso: id={inserted_id}")
-        return {"id": inserted_id, "tweet_text": tweet_text, "type": type}
+        print(f"📝 Rascunho guardado: id={inserted_id} ({perfil}/{action})")
+        return {"id": inserted_id, "action": action, "tweet_text": tweet_text, "tone_key": tone_key, "perfil": perfil}
     except Exception as e:
-        print(f"❌ Erro ao inserir tweet no SQLite: {e}")
+        _rollback()
+        print(f"❌ Erro ao inserir rascunho no SQLite: {e}")
         return None
 
 
-def listar_tweets():
+def contar_rascunhos(action, max_idade_horas=24, perfil=PERFIL_PADRAO):
+    """Quantidade de rascunhos prontos (e ainda válidos) para a ação do perfil."""
     try:
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute("SELECT id, tweet_text, type, created_at FROM tweets ORDER BY created_at DESC")
-        rows = cur.fetchall()
+        cur.execute(
+            "SELECT COUNT(*) FROM drafts WHERE perfil = ? AND action = ? AND status = 'pronto' "
+            "AND created_at >= datetime('now', ?)",
+            (perfil, action, f"-{int(max_idade_horas)} hours"),
+        )
+        total = cur.fetchone()[0]
         cur.close()
-        conn.close()
-        result = [dict(r) for r in rows]
-        print(f"📋 Tweets encontrados: {len(result)}")
-        for t in result:
-            print(f"  - {t['tweet_text']}: {t['type']}")
-        return result
+        return total
     except Exception as e:
-        print(f"❌ Erro ao listar tweets no SQLite: {e}")
-        return []
+        print(f"❌ Erro ao contar rascunhos no SQLite: {e}")
+        return 0
+
 
+def pegar_rascunho(action, max_idade_horas=24, perfil=PERFIL_PADRAO):
+    """Retira (marca como usado) o rascunho pronto mais antigo da ação do perfil; None se não houver.
 
-def buscar_tweet(tweet_text):
+    A leitura e a marcação acontecem na mesma transação, então dois publicadores nunca pegam o mesmo rascunho.
+    """
     try:
         conn = get_connection()
         cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
         cur.execute(
-            "SELECT id, tweet_text, type, created_at FROM tweets WHERE tweet_text = ?",
-            (tweet_text,),
+            "SELECT id, action, tweet_text, tone_key, created_at, perfil FROM drafts "
+            "WHERE perfil = ? AND action = ? AND status = 'pronto' AND created_at >= datetime('now', ?) "
+            "ORDER BY created_at, id LIMIT 1",
+            (perfil, action, f"-{int(max_idade_horas)} hours"),
         )
-        rows = cur.fetchall()
+        row = cur.fetchone()
+        if row is not None:
+            cur.execute("UPDATE drafts SET status = 'usado', used_at = CURRENT_TIMESTAMP WHERE id = ?", (row['id'],))
+        conn.commit()
         cur.close()
-        conn.close()
-        return [dict(r) for r in rows]
+        return dict(row) if row is not None else None
     except Exception as e:
-        print(f"❌ Erro ao buscar tweet no SQLite: {e}")
-        return []
+        _rollback()
+        print(f"❌ Erro ao pegar rascunho no SQLite: {e}")
+        return None
 
 
 if __name__ == '__main__':
@@ -0,0 +1,156 @@
+"""Gravação de tweets em segundo plano (write-behind), em lotes.
+
+Quem publica só enfileira o tweet; uma thread grava a fila no SQLite numa transação por lote,
+quando o lote chega a DB_GRAVACAO_LOTE itens ou o mais antigo espera DB_GRAVACAO_INTERVALO_MS,
+e no encerramento do processo. Cada item devolve um Future que só é resolvido depois do commit
+para quem precisar esperar. A conexão da thread grava com `synchronous=FULL`: em WAL com NORMAL o
+commit pode se perder numa queda de energia, então só com FULL o Future resolvido é uma confirmação
+durável.
+
+O ganho é de latência para quem publica (só enfileira, sem esperar o fsync); a vazão total de
+gravação fica na mesma ordem de um commit por tweet.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import db_sqlite
+
+DB_GRAVACAO_LOTE = int(os.getenv('DB_GRAVACAO_LOTE', '64'))
+DB_GRAVACAO_INTERVALO_MS = float(os.getenv('DB_GRAVACAO_INTERVALO_MS', '200'))
+
+# Sinal interno para a thread gravar o que tiver e avisar (flush) ou encerrar
+_ESVAZIAR = object()
+
+
+class FilaGravacao:
+    """Fila de tweets a gravar; `enviar` retorna um Future com o dict do tweet gravado (ou a exceção)."""
+
+    def __init__(self, max_lote: int = DB_GRAVACAO_LOTE, intervalo_ms: float = DB_GRAVACAO_INTERVALO_MS):
+        self.max_lote = max(1, max_lote)
+        self.intervalo_s = intervalo_ms / 1000
+        self.stats = {"enfileirados": 0, "gravados": 0, "erros": 0, "lotes": 0, "maior_lote": 0}
+        self._fila = queue.Queue()
+        self._pendentes = 0
+        self._lock = threading.Lock()
+        self._fechada = False
+        self._thread = threading.Thread(target=self._rodar, name='fila-gravacao', daemon=True)
+        self._thread.start()
+
+    @property
+    def pendentes(self) -> int:
+        return self._pendentes
+
+    def enviar(self, tweet_text: str, type: str, perfil: str = db_sqlite.PERFIL_PADRAO) -> Future:
+        futuro = Future()
+        with self._lock:
+            if self._fechada:
+                raise RuntimeError("fila de gravação encerrada")
+            self._pendentes += 1
+            self.stats["enfileirados"] += 1
+        # created_at do momento em que o tweet foi publicado, não do commit do lote
+        criado_em = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        self._fila.put((tweet_text, type, criado_em, perfil, futuro))
+        return futuro
+
+    def esvaziar(self, timeout: float = None) -> bool:
+        """Grava na hora tudo o que foi enfileirado antes; False se não terminar em `timeout` s."""
+        if not self._pendentes:
+            return True
+        pronto = threading.Event()
+        self._fila.put((_ESVAZIAR, pronto))
+        return pronto.wait(timeout)
+
+    def fechar(self, timeout: float = 30):
+        """Grava o que falta e encerra a thread (chamado também ao sair do processo)."""
+        with self._lock:
+            if self._fechada:
+                return
+            self._fechada = True
+        self.esvaziar(timeout)
+        self._fila.put(None)
+        self._thread.join(timeout)
+
+    def _rodar(self):
+        lote = []
+        limite = None
+        while True:
+            try:
+                item = self._fila.get(timeout=None if not lote else max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                # O mais antigo do lote já esperou o intervalo
+                self._gravar(lote)
+                lote = []
+                continue
+            if item is None:
+                self._gravar(lote)
+                return
+            if item[0] is _ESVAZIAR:
+                self._gravar(lote)
+                lote = []
+                item[1].set()
+                continue
+            if not lote:
+                limite = time.monotonic() + self.intervalo_s
+            lote.append(item)
+            if len(lote) >= self.max_lote:
+                self._gravar(lote)
+                lote = []
+
+    def _gravar(self, lote: list):
+        if not lote:
+            return
+        try:
+            # Por lote, pois a conexão da thread muda se DB_PATH mudar
+            db_sqlite.get_connection().execute("PRAGMA synchronous=FULL")
+            gravados = db_sqlite.inserir_tweets([item[:4] for item in lote])
+            resultados = list(zip(lote, gravados, [None] * len(lote)))
+        except Exception as e:
+            # Lote recusado: tenta item a item para isolar o que falhou
+            print(f"⚠️ Erro ao gravar lote de {len(lote)} tweet(s) no SQLite ({e}); tentando um a um")
+            resultados = []
+            for item in lote:
+                try:
+                    resultados.append((item, db_sqlite.inserir_tweets([item[:4]])[0], None))
+                except Exception as e_item:
+                    print(f"❌ Erro ao inserir tweet no SQLite: {e_item}")
+                    resultados.append((item, None, e_item))
+        with self._lock:
+            self._pendentes -= len(lote)
+            self.stats["lotes"] += 1
+            self.stats["maior_lote"] = max(self.stats["maior_lote"], len(lote))
+            for _, gravado, erro in resultados:
+                self.stats["gravados" if erro is None else "erros"] += 1
+        for item, gravado, erro in resultados:
+            if erro is None:
+                item[4].set_result(gravado)
+            else:
+                item[4].set_exception(erro)
+
+
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def obter() -> FilaGravacao:
+    """Fila do processo, criada no primeiro uso e esvaziada ao sair."""
+    global _fila
+    if _fila is None:
+        with _fila_lock:
+            if _fila is None:
+                _fila = FilaGravacao()
+                atexit.register(_fila.fechar)
+    return _fila
+
+
+def pendentes() -> int:
+    """Tweets enfileirados e ainda não gravados na fila do processo."""
+    return _fila.pendentes if _fila is not None else 0
+
+
+def esvaziar(timeout: float = None) -> bool:
+    """Grava o que estiver pendente na fila do processo (se existir)."""
+    return _fila.esvaziar(timeout) if _fila is not None else True
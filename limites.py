@@ -0,0 +1,77 @@
+"""Limite de taxa por provedor (token bucket), compartilhado por todos os perfis do processo.
+
+A taxa de cada provedor vem de LIMITE_<PROVEDOR>_POR_S (requisições por segundo; 0 desativa) e
+a rajada permitida de LIMITE_<PROVEDOR>_RAJADA. Quem chega sem ficha reserva a próxima e espera
+por ela, então chamadas concorrentes saem espaçadas em vez de todas tentarem de novo juntas.
+"""
+import asyncio
+import os
+import threading
+import time
+
+
+class LimiteTaxa:
+    """Token bucket: até `rajada` requisições seguidas e depois `por_segundo` em média."""
+
+    def __init__(self, por_segundo: float, rajada: float = None):
+        self.por_segundo = por_segundo
+        self.rajada = max(1.0, rajada if rajada is not None else por_segundo)
+        self.stats = {"liberados": 0, "esperas": 0, "espera_total_s": 0.0}
+        self._fichas = self.rajada
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reservar(self) -> float:
+        """Reserva uma ficha e retorna quantos segundos esperar por ela."""
+        if self.por_segundo <= 0:
+            return 0.0
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.rajada, self._fichas + (agora - self._ultimo) * self.por_segundo)
+            self._ultimo = agora
+            self._fichas -= 1
+            espera = -self._fichas / self.por_segundo if self._fichas < 0 else 0.0
+            self.stats["liberados"] += 1
+            if espera:
+                self.stats["esperas"] += 1
+                self.stats["espera_total_s"] += espera
+            return espera
+
+    def aguardar(self):
+        espera = self._reservar()
+        if espera:
+            time.sleep(espera)
+
+    async def aguardar_async(self):
+        espera = self._reservar()
+        if espera:
+            await asyncio.sleep(espera)
+
+
+_limites = {}
+_limites_lock = threading.Lock()
+
+
+def obter(provedor: str) -> LimiteTaxa:
+    """Limite do provedor ('llm', 'twitter'...), criado no primeiro uso a partir do ambiente."""
+    limite = _limites.get(provedor)
+    if limite is None:
+        with _limites_lock:
+            limite = _limites.get(provedor)
+            if limite is None:
+                nome = provedor.upper()
+                rajada = os.getenv(f'LIMITE_{nome}_RAJADA')
+                limite = _limites[provedor] = LimiteTaxa(float(os.getenv(f'LIMITE_{nome}_POR_S') or 0),
+                                                         float(rajada) if rajada else None)
+    return limite
+
+
+def definir(provedor: str, por_segundo: float, rajada: float = None) -> LimiteTaxa:
+    """Troca o limite de um provedor (ex.: benchmarks); por_segundo=0 desativa."""
+    with _limites_lock:
+        limite = _limites[provedor] = LimiteTaxa(por_segundo, rajada)
+    return limite
+
+
+def resumo() -> dict:
+    return {provedor: {"por_segundo": l.por_segundo, "rajada": l.rajada, **l.stats} for provedor, l in _limites.items()}
@@ -0,0 +1,179 @@
+"""Camada de chamadas ao provedor LLM: prazo por chamada, retentativas com jitter,
+circuit breaker por modelo, modelos de fallback e métricas por ponto de chamada.
+"""
+import asyncio
+import os
+import random
+import time
+
+# Retentativas por modelo (além da primeira tentativa) e base do backoff exponencial (s)
+LLM_RETRIES = int(os.getenv('LLM_RETRIES', '2'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+
+# Prazo (s) de cada tentativa, para sobrar tempo para retentativas e fallback dentro do prazo total
+LLM_ATTEMPT_TIMEOUT = float(os.getenv('LLM_ATTEMPT_TIMEOUT', '30'))
+
+# Circuit breaker: falhas seguidas que abrem o circuito de um modelo e tempo (s) aberto
+LLM_CB_FAILURES = int(os.getenv('LLM_CB_FAILURES', '5'))
+LLM_CB_COOLDOWN = float(os.getenv('LLM_CB_COOLDOWN', '60'))
+
+# Modelos tentados, em ordem, quando o principal falha ou está com o circuito aberto
+LLM_FALLBACK_MODELS = [m.strip() for m in os.getenv('LLM_FALLBACK_MODELS', '').split(',') if m.strip()]
+
+# Limites superiores (ms) dos buckets do histograma de latência
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float('inf'))
+
+# Métricas por ponto de chamada (classificador, gerador, ...)
+metricas = {}
+
+# Estado do circuit breaker por modelo: {"falhas": int, "aberto_ate": float}
+_circuitos = {}
+
+
+class LLMIndisponivel(Exception):
+    """Nenhum modelo respondeu dentro do prazo (falhas, timeouts ou circuitos abertos)."""
+
+
+def _metricas(call_site: str) -> dict:
+    m = metricas.get(call_site)
+    if m is None:
+        m = metricas[call_site] = {
+            "chamadas": 0,
+            "erros": 0,
+            "tentativas": 0,
+            "fallbacks": 0,
+            "buckets": [0] * len(BUCKETS_MS),
+            "soma_ms": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+        }
+    return m
+
+
+def _observar(m: dict, ms: float):
+    m["soma_ms"] += ms
+    for i, limite in enumerate(BUCKETS_MS):
+        if ms <= limite:
+            m["buckets"][i] += 1
+            break
+
+
+def _registrar_uso(m: dict, completion):
+    usage = getattr(completion, 'usage', None)
+    if usage is None:
+        return
+    m["prompt_tokens"] += getattr(usage, 'prompt_tokens', None) or 0
+    m["completion_tokens"] += getattr(usage, 'completion_tokens', None) or 0
+    detalhes = getattr(usage, 'prompt_tokens_details', None)
+    m["cached_tokens"] += getattr(detalhes, 'cached_tokens', None) or 0
+
+
+def registrar_uso(call_site: str, completion):
+    """Soma o uso de tokens conhecido só depois da chamada (ex.: fim de um stream)."""
+    _registrar_uso(_metricas(call_site), completion)
+
+
+def _circuito_aberto(modelo: str) -> bool:
+    estado = _circuitos.get(modelo)
+    return bool(estado) and estado["aberto_ate"] > time.monotonic()
+
+
+def _registrar_falha(modelo: str):
+    estado = _circuitos.setdefault(modelo, {"falhas": 0, "aberto_ate": 0.0})
+    estado["falhas"] += 1
+    if estado["falhas"] >= LLM_CB_FAILURES:
+        # Meio-aberto depois do cooldown: a próxima tentativa testa o modelo de novo
+        estado["aberto_ate"] = time.monotonic() + LLM_CB_COOLDOWN
+        estado["falhas"] = LLM_CB_FAILURES - 1
+        print(f"⚡ Circuito aberto para {modelo} por {LLM_CB_COOLDOWN:.0f}s")
+
+
+def _registrar_sucesso(modelo: str):
+    _circuitos.pop(modelo, None)
+
+
+def _retentavel(exc: Exception) -> bool:
+    """Timeouts, falhas de conexão, 429 e 5xx valem nova tentativa; o resto vai direto ao próximo modelo."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    nome = type(exc).__name__
+    if nome in ('APITimeoutError', 'APIConnectionError', 'RateLimitError', 'InternalServerError'):
+        return True
+    status = getattr(exc, 'status_code', None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+async def chamar(criar, call_site: str, timeout: float, model: str, **kwargs):
+    """Executa `criar(model=..., **kwargs)` com prazo total `timeout` (s), cada tentativa limitada a LLM_ATTEMPT_TIMEOUT.
+
+    Tenta o modelo pedido e depois LLM_FALLBACK_MODELS, pulando os de circuito aberto,
+    com até LLM_RETRIES retentativas (backoff exponencial com jitter) em erros transitórios.
+    Levanta LLMIndisponivel se nenhum responder no prazo.
+    """
+    m = _metricas(call_site)
+    m["chamadas"] += 1
+    inicio = time.perf_counter()
+    prazo = time.monotonic() + timeout
+    modelos = [model] + [f for f in LLM_FALLBACK_MODELS if f != model]
+    ultimo_erro = None
+    try:
+        for n_modelo, modelo in enumerate(modelos):
+            if _circuito_aberto(modelo):
+                continue
+            for tentativa in range(LLM_RETRIES + 1):
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    raise LLMIndisponivel(f"prazo de {timeout}s esgotado em {call_site}: {ultimo_erro}")
+                m["tentativas"] += 1
+                try:
+                    completion = await asyncio.wait_for(criar(model=modelo, **kwargs), min(restante, LLM_ATTEMPT_TIMEOUT))
+                except Exception as e:
+                    ultimo_erro = e
+                    _registrar_falha(modelo)
+                    if not _retentavel(e) or tentativa == LLM_RETRIES or _circuito_aberto(modelo):
+                        break
+                    espera = random.uniform(0, LLM_BACKOFF_BASE * (2 ** tentativa))
+                    await asyncio.sleep(min(espera, max(0.0, prazo - time.monotonic())))
+                    continue
+                _registrar_sucesso(modelo)
+                if n_modelo > 0:
+                    m["fallbacks"] += 1
+                _registrar_uso(m, completion)
+                return completion
+        raise LLMIndisponivel(f"nenhum modelo respondeu em {call_site}: {ultimo_erro}")
+    except BaseException:
+        m["erros"] += 1
+        raise
+    finally:
+        _observar(m, (time.perf_counter() - inicio) * 1000)
+
+
+def resumo(call_site: str) -> dict:
+    """Contagens, latência média e percentis aproximados (pelo histograma) de um ponto de chamada."""
+    m = _metricas(call_site)
+    total = sum(m["buckets"])
+
+    def percentil(p):
+        if not total:
+            return None
+        alvo = p * total
+        acumulado = 0
+        for limite, n in zip(BUCKETS_MS, m["buckets"]):
+            acumulado += n
+            if acumulado >= alvo:
+                return limite
+        return BUCKETS_MS[-1]
+
+    return {
+        "chamadas": m["chamadas"],
+        "erros": m["erros"],
+        "tentativas": m["tentativas"],
+        "fallbacks": m["fallbacks"],
+        "media_ms": m["soma_ms"] / total if total else None,
+        "p50_ms": percentil(0.5),
+        "p95_ms": percentil(0.95),
+        "prompt_tokens": m["prompt_tokens"],
+        "completion_tokens": m["completion_tokens"],
+        "cached_tokens": m["cached_tokens"],
+    }
@@ -1,46 +1,116 @@
+import argparse
 import os
-import time  # Importe 'time' se quiser adicionar um atraso, mas 'apscheduler' já cuida disso
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+# O .env é carregado antes dos módulos do bot, que leem a configuração ao serem importados
+load_dotenv('./.env')
+
 # Importa as defs de novo.py
-from novo import bom_dia, boa_tarde, boa_noite, sextou_bom_dia, sextou_boa_tarde
+import novo  # noqa: E402
+from novo import ACOES, TZ_SP, agora, gerar, gerar_varias, salvar_tweet  # noqa: E402
 
-# Para recuperar o último texto gerado e postar
-from db_sqlite import listar_tweets
+# Rascunhos pré-gerados
+from db_sqlite import PERFIL_PADRAO, init_db, inserir_rascunho, contar_rascunhos, pegar_rascunho  # noqa: E402
+import telemetria  # noqa: E402
+import arquivo_tweets  # noqa: E402
+import limites  # noqa: E402
+import perfis  # noqa: E402
 
-# Importações do Scheduler
-from apscheduler.schedulers.blocking import BlockingScheduler
-from zoneinfo import ZoneInfo
+# O APScheduler só é importado por quem agenda (scheduler e pré-geração), não numa ação avulsa
+
+
+# Publicadores do Twitter por perfil: criados no primeiro envio e reaproveitados (mantêm a sessão HTTP viva)
+_publishers = {}
+# Publicador de `set_publisher` sem perfil: vale para os perfis sem publicador próprio
+_publisher_fixo = None
+_publisher_lock = threading.Lock()
+
+# Tempos das chamadas de publicação (create_tweet)
+publish_stats = {"envios": 0, "ultimo_ms": None, "total_ms": 0.0}
+
+
+def _criar_publisher(credenciais: dict):
+    """Cliente Tweepy v2 com as credenciais de um perfil (ver `perfis.credenciais`)."""
+    from tweepy import Client
+    return Client(
+        consumer_key=credenciais['consumer_key'],
+        consumer_secret=credenciais['consumer_secret'],
+        access_token=credenciais['access_key'],
+        access_token_secret=credenciais['access_secret'],
+    )
 
-load_dotenv('./.env')
+
+def _get_publisher(perfil: str = None):
+    """Retorna o cliente do Twitter do perfil (o atual, se omitido), lendo as credenciais uma única vez.
+
+    None se faltarem as credenciais do perfil.
+    """
+    perfil = perfil or perfis.atual()
+    publisher = _publishers.get(perfil)
+    if publisher is None and _publisher_fixo is not None:
+        return _publisher_fixo
+    if publisher is None:
+        with _publisher_lock:
+            publisher = _publishers.get(perfil)
+            if publisher is None:
+                credenciais = perfis.credenciais(perfil)
+                publisher = _publishers[perfil] = _criar_publisher(credenciais) if credenciais else False
+    return publisher or None
+
+
+def set_publisher(publisher, perfil: str = None):
+    """Substitui o publicador (ex.: fake local em testes e benchmarks).
+
+    Qualquer objeto com `create_tweet(text=...)` serve. Sem `perfil`, vale para todos os perfis;
+    `None` volta ao cliente Tweepy com as credenciais de cada perfil.
+    """
+    global _publisher_fixo
+    with _publisher_lock:
+        if perfil is None:
+            _publisher_fixo = publisher
+            _publishers.clear()
+        elif publisher is None:
+            _publishers.pop(perfil, None)
+        else:
+            _publishers[perfil] = publisher
 
 
 def tweetar(texto: str, dry_run: bool) -> bool:
     """Envia um tweet com Tweepy se credenciais estiverem disponíveis; em dry-run, apenas imprime."""
+    with telemetria.span('publicacao', perfil=perfis.atual(), dry_run=dry_run) as s:
+        enviado = _tweetar(texto, dry_run)
+        if not enviado:
+            s["outcome"] = "dry_run" if dry_run else "nao_enviado"
+        return enviado
+
+
+def _tweetar(texto: str, dry_run: bool) -> bool:
     if dry_run:
         print("🧪 DRY_RUN ativo: não enviando para o Twitter. Conteúdo:")
         print(texto)
         return False
     try:
-        from tweepy import Client
-        consumer_key = os.getenv('TWITTER_CONSUMER_KEY')
-        consumer_secret = os.getenv('TWITTER_CONSUMER_SECRET')
-        access_token = os.getenv('TWITTER_ACCESS_KEY')
-        access_token_secret = os.getenv('TWITTER_ACCESS_SECRET')
-
-        if not all([consumer_key, consumer_secret, access_token, access_token_secret]):
-            print("⚠️ Credenciais do Twitter não encontradas em .env; não foi enviado. Conteúdo:")
+        client = _get_publisher()
+        if client is None:
+            print(f"⚠️ Credenciais do Twitter ({perfis.obter()['credenciais']}*) não encontradas em .env; "
+                  "não foi enviado. Conteúdo:")
             print(texto)
             return False
 
-        client = Client(
-            consumer_key=consumer_key,
-            consumer_secret=consumer_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret,
-        )
+        # Limite de envios do provedor, somando todos os perfis
+        limites.obter('twitter').aguardar()
+        inicio = time.perf_counter()
         client.create_tweet(text=texto)
-        print("✅ Tweet enviado com sucesso")
+        ms = (time.perf_counter() - inicio) * 1000
+        publish_stats["envios"] += 1
+        publish_stats["ultimo_ms"] = ms
+        publish_stats["total_ms"] += ms
+        print(f"✅ Tweet enviado com sucesso ({ms:.0f} ms)")
         return True
     except Exception as e:
         print(f"❌ Falha ao enviar tweet: {e}")
@@ -49,76 +119,466 @@ def tweetar(texto: str, dry_run: bool) -> bool:
         return False
 
 
-def run_action(acao: str, dry_run: bool):
-    """Executa a função de geração de conteúdo e depois tenta tweetar o resultado."""
-    mapping = {
-        'bom_dia': bom_dia,
-        'boa_tarde': boa_tarde,
-        'boa_noite': boa_noite,
-        'sextou_bom_dia': sextou_bom_dia,
-        'sextou_boa_tarde': sextou_boa_tarde,
-    }
-    fn = mapping.get(acao)
-    if not fn:
+def run_action(acao: str, dry_run: bool, perfil: str = None):
+    """Executa a função de geração de conteúdo, tweeta o texto retornado e só então o grava no DB.
+
+    `perfil`: conta/destinatário da execução (padrão: o perfil atual).
+    """
+    with perfis.usando(perfil), telemetria.trace('run_action', acao=acao, perfil=perfis.atual(), dry_run=dry_run) as t:
+        resultado = _gerar_e_publicar(acao, dry_run)
+        if not (resultado or {}).get('text'):
+            t["outcome"] = "vazio"
+        return resultado
+
+
+def _gerar_e_publicar(acao: str, dry_run: bool):
+    if acao not in ACOES:
         print(f"❌ Ação desconhecida: {acao}")
         return
     
-    print(f"Executando ação: {acao}")
-    fn()  # Roda a função de 'novo.py' (que deve salvar no DB)
-    
-    # Busca o resultado do banco de dados para postar
-    tweets = listar_tweets() or []
-    if tweets:
-        texto = tweets[0].get('tweet_text') or ''
-        if texto:
-            tweetar(texto, dry_run)
-        else:
-            print("⚠️ Texto do tweet está vazio, não enviado.")
+    print(f"Executando ação: {acao} ({perfis.atual()})")
+    # Gera sem gravar: o texto vai direto para o Twitter e o DB é gravado depois do envio
+    try:
+        resultado = gerar(acao, persistir=False, eco=dry_run) or {}
+    except Exception as e:
+        print(f"❌ Falha ao gerar {acao}: {e}")
+        return {}
+    texto = resultado.get('text') or ''
+    if texto:
+        tweetar(texto, dry_run)
+        salvar_tweet(resultado)
     else:
-        print("⚠️ Nenhum tweet encontrado no DB para enviar após a ação.")
+        print("⚠️ Texto do tweet está vazio, não enviado.")
+    return resultado
 
 
-def start_scheduler(dry_run: bool):
-    """Inicia o agendador de tarefas."""
-    scheduler = BlockingScheduler(timezone=ZoneInfo("America/Sao_Paulo"))
-    
+# Agenda padrão das rotinas: (ação, parâmetros do gatilho cron), vinda do registro de ações
+AGENDA = [(acao, cron) for acao, spec in ACOES.items() for cron in spec['agenda']]
+
+
+def agenda(perfil: str = None) -> list:
+    """Agenda do perfil (o atual, se omitido): a própria, se o perfil trouxer uma, ou a AGENDA padrão."""
+    propria = perfis.obter(perfil)['agenda']
+    if propria is None:
+        return AGENDA
+    return [(acao, cron) for acao, crons in propria.items() for cron in crons]
+
+# Pré-geração: quantas horas à frente cobrir e de quanto em quanto tempo verificar
+PREGEN_HORIZON_HOURS = float(os.getenv('PREGEN_HORIZON_HOURS', '12'))
+PREGEN_INTERVAL_MINUTES = int(os.getenv('PREGEN_INTERVAL_MINUTES', '60'))
+
+
+def _proximos_slots(horizonte_horas: float, inicio: datetime = None, perfil: str = None):
+    """Lista (ação, datetime) dos disparos da agenda do perfil dentro do horizonte, em ordem."""
+    inicio = inicio or agora()
+    limite = inicio + timedelta(hours=horizonte_horas)
+    slots = []
+    from apscheduler.triggers.cron import CronTrigger
+    for acao, cron in agenda(perfil):
+        trigger = CronTrigger(timezone=TZ_SP, **cron)
+        prox = trigger.get_next_fire_time(None, inicio)
+        while prox and prox <= limite:
+            slots.append((acao, prox))
+            prox = trigger.get_next_fire_time(prox, prox + timedelta(seconds=1))
+    return sorted(slots, key=lambda s: s[1])
+
+
+def pre_gerar(horizonte_horas: float = PREGEN_HORIZON_HOURS):
+    """Garante um rascunho pronto para cada disparo da agenda de cada perfil dentro do horizonte."""
+    with telemetria.trace('pre_gerar', horizonte_horas=horizonte_horas):
+        return _pre_gerar(horizonte_horas)
+
+
+def _pre_gerar(horizonte_horas: float):
+    pedidos = {}
+    for perfil in perfis.todos():
+        slots_por_acao = {}
+        for acao, quando in _proximos_slots(horizonte_horas, perfil=perfil):
+            slots_por_acao.setdefault(acao, []).append(quando)
+        # Rascunhos existentes cobrem os primeiros slots (são publicados do mais antigo ao mais novo)
+        faltando = []
+        for acao, slots in slots_por_acao.items():
+            faltando += [(acao, quando) for quando in slots[contar_rascunhos(acao, perfil=perfil):]]
+        if faltando:
+            pedidos[perfil] = ([a for a, _ in faltando], [q for _, q in faltando])
+    if not pedidos:
+        print("📝 Rascunhos em dia para as próximas rotinas")
+        return {}
+
+    total = sum(len(acoes) for acoes, _ in pedidos.values())
+    print(f"📝 Pré-gerando {total} rascunho(s) para {len(pedidos)} perfil(is): "
+          f"{', '.join(f'{p}/{a}' for p, (acoes, _) in pedidos.items() for a in acoes)}")
+    # Todos os perfis de uma vez, dividindo a concorrência e o limite de taxa do LLM
+    resultados = novo.gerar_perfis(pedidos, persistir=False)
+    for perfil, lista in resultados.items():
+        if isinstance(lista, Exception):
+            print(f"❌ Falha ao pré-gerar rascunhos de {perfil}: {lista}")
+            continue
+        for r in lista:
+            if isinstance(r, Exception):
+                print(f"❌ Falha ao pré-gerar rascunho de {perfil}: {r}")
+            elif r.get('text'):
+                inserir_rascunho(r['action'], r['text'], r['tone_key'], perfil=perfil)
+    return resultados
+
+
+def publicar_acao(acao: str, dry_run: bool, perfil: str = None):
+    """Publica o rascunho pronto da ação do perfil; se não houver, gera na hora como em `run_action`."""
+    with perfis.usando(perfil), telemetria.trace('publicar_acao', acao=acao, perfil=perfis.atual(),
+                                                 dry_run=dry_run) as t:
+        with telemetria.span('db_read') as s:
+            rascunho = pegar_rascunho(acao, perfil=perfis.atual())
+            s["rascunho"] = rascunho is not None
+        if rascunho is None:
+            print(f"⚠️ Nenhum rascunho pronto para {acao}; gerando na hora.")
+            t["origem"] = "na_hora"
+            return _gerar_e_publicar(acao, dry_run)
+
+        print(f"Publicando rascunho {rascunho['id']} da ação: {acao} ({perfis.atual()})")
+        t["origem"] = "rascunho"
+        resultado = {"text": rascunho['tweet_text'], "tone_key": rascunho['tone_key'], "action": acao}
+        tweetar(resultado['text'], dry_run)
+        salvar_tweet(resultado)
+        return resultado
+
+
+# Scheduler: threads para rodar os jobs e tolerância (s) de atraso de um disparo; passado isso,
+# o disparo é descartado com aviso (ex.: processo parado durante o horário da rotina)
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', '4'))
+SCHEDULER_MISFIRE_GRACE_S = int(os.getenv('SCHEDULER_MISFIRE_GRACE_S', '3600'))
+
+# Disparos do scheduler: executados, encontrados atrasados ao iniciar, perdidos, pulados por sobreposição e com erro
+scheduler_stats = {"executados": 0, "atrasados": 0, "perdidos": 0, "sobrepostos": 0, "erros": 0}
+
+
+def _politica(acao: str) -> dict:
+    """max_instances/coalesce/misfire_grace_time do job da ação: padrão + `politica` do registro de ações.
+
+    Padrão: uma execução por vez (um disparo que chega com a anterior ainda rodando é pulado) e
+    disparos acumulados viram um só.
+    """
+    return {"max_instances": 1, "coalesce": True, "misfire_grace_time": SCHEDULER_MISFIRE_GRACE_S,
+            **ACOES[acao].get('politica', {})}
+
+
+def _ao_evento(evento):
+    from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+    if evento.code == EVENT_JOB_EXECUTED:
+        scheduler_stats["executados"] += 1
+    elif evento.code == EVENT_JOB_MISSED:
+        scheduler_stats["perdidos"] += 1
+        print(f"⚠️ Disparo perdido: {evento.job_id} de {evento.scheduled_run_time:%d/%m %H:%M} "
+              f"(atraso acima da tolerância)")
+    elif evento.code == EVENT_JOB_MAX_INSTANCES:
+        scheduler_stats["sobrepostos"] += 1
+        print(f"⚠️ Disparo de {evento.job_id} pulado: a execução anterior ainda não terminou")
+    elif evento.code == EVENT_JOB_ERROR:
+        scheduler_stats["erros"] += 1
+        print(f"❌ Erro no job {evento.job_id}: {evento.exception}")
+
+
+def configurar_scheduler(scheduler, executor=None):
+    """Prepara (sem iniciar) jobstores, executor e listener de um scheduler do APScheduler.
+
+    Os agendamentos das ações ficam no SQLite (`agendamentos`), para disparos perdidos com o
+    processo parado serem recuperados na volta; os jobs internos (pré-geração) ficam em memória.
+    """
+    from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+    from apscheduler.executors.pool import ThreadPoolExecutor
+    from agenda_sqlite import SQLiteJobStore
+    scheduler.configure(
+        jobstores={"sqlite": SQLiteJobStore()},
+        executors={"default": executor or ThreadPoolExecutor(SCHEDULER_WORKERS)},
+        timezone=TZ_SP,
+    )
+    scheduler.add_listener(_ao_evento, EVENT_JOB_EXECUTED | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES | EVENT_JOB_ERROR)
+    return scheduler
+
+
+def _sincronizar_agenda(scheduler, dry_run: bool):
+    """Alinha os jobs persistidos com a agenda de cada perfil sem perder o próximo disparo de quem não mudou.
+
+    Job novo é criado; job cujo gatilho mudou é reagendado; job fora das agendas é removido.
+    Os demais mantêm o próximo disparo gravado, mesmo que já tenha passado (recuperação).
+    Os jobs do perfil padrão mantêm os ids de antes dos perfis (`ação#i`); os outros são `perfil:ação#i`.
+    """
+    from apscheduler.triggers.cron import CronTrigger
+    desejados = {}
+    for perfil in perfis.todos():
+        prefixo = '' if perfil == PERFIL_PADRAO else f"{perfil}:"
+        vistos = {}
+        for acao, cron in agenda(perfil):
+            i = vistos[acao] = vistos.get(acao, -1) + 1
+            desejados[f"{prefixo}{acao}#{i}"] = (acao, perfil, CronTrigger(timezone=TZ_SP, **cron))
+    agora_ = agora()
+    for job in scheduler.get_jobs(jobstore='sqlite'):
+        if job.id not in desejados:
+            print(f"🗑️ Removendo agendamento antigo: {job.id}")
+            job.remove()
+    for job_id, (acao, perfil, trigger) in desejados.items():
+        politica = _politica(acao)
+        job = scheduler.get_job(job_id, jobstore='sqlite')
+        if job is None:
+            scheduler.add_job('main:publicar_acao', trigger, args=[acao, dry_run], kwargs={'perfil': perfil},
+                              id=job_id, name=f"{perfil}:{acao}", jobstore='sqlite', **politica)
+            continue
+        if str(job.trigger) != str(trigger):
+            job.reschedule(trigger)
+        job.modify(args=[acao, dry_run], kwargs={'perfil': perfil}, name=f"{perfil}:{acao}", **politica)
+        if job.next_run_time is not None and job.next_run_time < agora_:
+            scheduler_stats["atrasados"] += 1
+            print(f"⏪ {job_id}: disparo de {job.next_run_time:%d/%m %H:%M} ficou para trás; "
+                  f"será executado agora se estiver dentro de {politica['misfire_grace_time']}s")
+
+
+def iniciar_scheduler(scheduler, dry_run: bool, aviso_inicio: bool = False):
+    """Inicia um scheduler configurado: sincroniza a agenda, agenda a pré-geração e libera os disparos."""
+    scheduler.start(paused=True)
+    _sincronizar_agenda(scheduler, dry_run)
+    # No horário só publica o rascunho pronto; a geração acontece antes, no job de pré-geração
+    scheduler.add_job('main:pre_gerar', 'interval', minutes=PREGEN_INTERVAL_MINUTES, next_run_time=agora(),
+                      id='pre_gerar', max_instances=1, coalesce=True, replace_existing=True)
+    if aviso_inicio:
+        # Um por perfil, pelo executor como qualquer job, sem atrasar o início do scheduler
+        for perfil in perfis.todos():
+            prefixo = '' if perfil == PERFIL_PADRAO else f"{perfil}:"
+            scheduler.add_job('main:avisar_inicio', 'date', run_date=agora(), args=[dry_run], kwargs={'perfil': perfil},
+                              id=f"{prefixo}aviso_inicio", replace_existing=True)
+    scheduler.resume()
+    return scheduler
+
+
+def start_scheduler(dry_run: bool, aviso_inicio: bool = False):
+    """Inicia o agendador em segundo plano e espera até Ctrl+C/SIGTERM; então encerra esperando os jobs em curso."""
+    import signal
+    from apscheduler.schedulers.background import BackgroundScheduler
+
     print("Configurando agendamentos...")
-    
-    # Replicando horários do bot.py
-    scheduler.add_job(lambda: run_action('bom_dia', dry_run), 'cron', hour=7, day_of_week='tue,thu')
-    scheduler.add_job(lambda: run_action('bom_dia', dry_run), 'cron', hour=7, day_of_week='mon')
-    scheduler.add_job(lambda: run_action('bom_dia', dry_run), 'cron', hour=7, day_of_week='wed')
-    # Sexta de manhã usa sextou_bom_dia
-    scheduler.add_job(lambda: run_action('sextou_bom_dia', dry_run), 'cron', hour=7, day_of_week='fri')
-    # Fim de semana bom dia às 9
-    scheduler.add_job(lambda: run_action('bom_dia', dry_run), 'cron', hour=9, day_of_week='sat,sun')
-    # Boa noite diário 22:00
-    scheduler.add_job(lambda: run_action('boa_noite', dry_run), 'cron', hour=22, day_of_week='mon,tue,wed,thu,fri,sat,sun')
-    
+    scheduler = iniciar_scheduler(configurar_scheduler(BackgroundScheduler()), dry_run, aviso_inicio)
+    for job in scheduler.get_jobs():
+        print(f"   {job.id}: próximo disparo {job.next_run_time:%d/%m %H:%M}")
+
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
     print("⏱️ Scheduler iniciado. Pressione Ctrl+C para parar.")
-    scheduler.start()
+    try:
+        while not parar.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    print("⏹️ Encerrando scheduler (aguardando jobs em execução)...")
+    scheduler.shutdown(wait=True)
 
 
-def main():
-    """Função principal que inicia o bot."""
-    
-    # A lógica de 'dry_run' agora vem apenas do arquivo .env
+def gerar_lote(acoes: list, k: int, dry_run: bool = False, concorrencia: int = None, perfil: str = None):
+    """Gera `k` rascunhos por ação em paralelo e os guarda na tabela `drafts` do perfil para revisão.
+
+    Nada é publicado; em dry-run os textos só são gerados (teste de carga do gerador).
+    Mostra o progresso a cada rascunho e, no fim, a vazão. Retorna a lista de resultados.
+    """
+    with perfis.usando(perfil):
+        return _gerar_lote(acoes, k, dry_run, concorrencia)
+
+
+def _gerar_lote(acoes: list, k: int, dry_run: bool, concorrencia: int):
+    itens = [acao for acao in acoes for _ in range(k)]
+    total = len(itens)
+    feitos = {"ok": 0, "falhas": 0}
+    lock = threading.Lock()
+    chamadas_antes = sum(novo.llm_calls.values())
+    perfil = perfis.atual()
+    print(f"📝 Gerando {k} rascunho(s) para {len(acoes)} ação(ões) de {perfil} = {total} "
+          f"(concorrência {concorrencia or novo.LLM_MAX_CONCURRENCY}{', dry-run' if dry_run else ''})")
+    inicio = time.perf_counter()
+
+    def progresso(i, resultado):
+        ok = not isinstance(resultado, Exception) and bool(resultado.get('text'))
+        if ok and not dry_run:
+            ok = inserir_rascunho(resultado['action'], resultado['text'], resultado['tone_key'],
+                                  perfil=perfil) is not None
+        with lock:
+            feitos["ok" if ok else "falhas"] += 1
+            n = feitos["ok"] + feitos["falhas"]
+            decorrido = time.perf_counter() - inicio
+            marca = "✅" if ok else f"❌ {resultado}" if isinstance(resultado, Exception) else "⚠️ vazio"
+            print(f"[{n:>{len(str(total))}}/{total}] {itens[i]} {marca} | "
+                  f"{decorrido:.1f}s | {n / decorrido:.2f} rascunhos/s", flush=True)
+
+    resultados = gerar_varias(itens, persistir=False, progresso=progresso, concorrencia=concorrencia)
+    decorrido = time.perf_counter() - inicio
+
+    validos = [r for r in resultados if not isinstance(r, Exception) and r.get('text')]
+    latencias = sorted(r['latency_ms'] for r in validos)
+    tokens = sum((r.get('usage') or {}).get('completion_tokens') or 0 for r in validos)
+    print(f"📊 {feitos['ok']}/{total} rascunho(s) em {decorrido:.2f}s: {total / decorrido:.2f} rascunhos/s, "
+          f"{tokens / decorrido:.0f} tokens gerados/s, {sum(novo.llm_calls.values()) - chamadas_antes} chamada(s) ao LLM")
+    if latencias:
+        p95 = latencias[max(0, int(round(len(latencias) * 0.95)) - 1)]
+        print(f"⏱️ Latência por rascunho: p50 {statistics.median(latencias):.0f} ms, p95 {p95:.0f} ms")
+    if feitos["falhas"]:
+        print(f"⚠️ {feitos['falhas']} falha(s)")
+    return resultados
+
+
+def _dry_run_env() -> bool:
     # Se DRY_RUN não estiver no .env, o padrão é 'false' (ou seja, vai postar)
-    env_dry = os.getenv('DRY_RUN', 'false').lower() == 'true'
-    
-    if env_dry:
-        print("🧪 DRY_RUN ativo (definido no .env). Nenhum tweet será enviado.")
+    return os.getenv('DRY_RUN', 'false').lower() == 'true'
+
+
+# Tweet opcional de início (`schedule --aviso-inicio`); {destinatario} e as outras variáveis vêm do perfil
+AVISO_INICIO_TEXTO = "Estou iniciando... tweets para {destinatario} em breve"
+
+
+def avisar_inicio(dry_run: bool, perfil: str = None) -> bool:
+    """Publica o tweet de início na conta do perfil, com o destinatário dele."""
+    with perfis.usando(perfil) as p:
+        return tweetar(AVISO_INICIO_TEXTO.format(**p['variaveis']), dry_run)
+
+
+def iniciar_bot(dry_run: bool, aviso_inicio: bool = False):
+    """Roda o scheduler até ser interrompido; o tweet de início, se pedido, vai como job."""
+    if dry_run:
+        print("🧪 DRY_RUN ativo. Nenhum tweet será enviado.")
     else:
         print("🚀 Bot iniciando em MODO DE PRODUÇÃO. Tweets serão enviados.")
-    
-    # Envio imediato simples antes de iniciar o scheduler
-    msg = "Estou iniciando... tweets para Laura em breve"
-    print(f"💬 Envio imediato: {msg}")
-    tweetar(msg, env_dry)
-    
-    # Inicia o scheduler
-    start_scheduler(dry_run=env_dry)
+    start_scheduler(dry_run=dry_run, aviso_inicio=aviso_inicio)
+
+
+def bootstrap(precisa_llm: bool = True) -> bool:
+    """Prepara a execução: esquema do banco e, se o comando vai gerar texto, o cliente do LLM.
+
+    Importar os módulos não faz nada disso; aqui erros de configuração aparecem antes de começar.
+    """
+    if not init_db():
+        return False
+    try:
+        problemas = novo.validar_perfis()
+    except (OSError, ValueError) as e:
+        print(f"❌ Perfis inválidos em {perfis.PERFIS_PATH}: {e}")
+        return False
+    if problemas:
+        for problema in problemas:
+            print(f"❌ {problema}")
+        return False
+    if precisa_llm:
+        try:
+            novo._cliente()
+        except Exception as e:
+            print(f"❌ Cliente do LLM indisponível: {e}")
+            return False
+    return True
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        description="Bot de tweets para a Laura. Sem subcomando, roda o scheduler.",
+    )
+    # Formas antigas (README): --acao <ação> e --schedule
+    parser.add_argument('--acao', choices=list(ACOES), help='executa uma ação (o mesmo que `run <ação>`)')
+    parser.add_argument('--schedule', action='store_true', help='inicia o scheduler (o mesmo que `schedule`)')
+    parser.add_argument('--dry-run', action='store_true', help='não envia nada ao Twitter (padrão: DRY_RUN do .env)')
+    sub = parser.add_subparsers(dest='comando')
+
+    # SUPPRESS: o --dry-run do subcomando não apaga o informado antes dele
+    p = sub.add_parser('run', help='gera e publica uma ação agora')
+    p.add_argument('acao', choices=list(ACOES))
+    p.add_argument('--perfil', help=f'perfil que publica (padrão: {PERFIL_PADRAO})')
+    p.add_argument('--dry-run', action='store_true', default=argparse.SUPPRESS)
+
+    p = sub.add_parser('schedule', help='roda o scheduler (agendamentos persistidos no SQLite)')
+    p.add_argument('--dry-run', action='store_true', default=argparse.SUPPRESS)
+    p.add_argument('--aviso-inicio', action='store_true', help='publica um tweet avisando que o bot iniciou')
+
+    p = sub.add_parser('generate-batch', help='gera K rascunhos por ação em paralelo para revisão (não publica)')
+    p.add_argument('--acoes', nargs='+', choices=list(ACOES), default=list(ACOES), help='padrão: todas')
+    p.add_argument('-k', type=int, default=3, help='rascunhos por ação')
+    p.add_argument('--concorrencia', type=int, help='chamadas LLM simultâneas (padrão: LLM_MAX_CONCURRENCY)')
+    p.add_argument('--perfil', help=f'perfil dos rascunhos (padrão: {PERFIL_PADRAO})')
+    p.add_argument('--dry-run', action='store_true', default=argparse.SUPPRESS,
+                   help='só gera, sem gravar os rascunhos')
+
+    p = sub.add_parser('export', help='exporta o histórico de tweets (.jsonl, .jsonl.gz, .parquet ou .ltw)')
+    p.add_argument('arquivo')
+    p.add_argument('--lote', type=int, help='tweets lidos por vez (padrão: ARQUIVO_LOTE)')
+
+    p = sub.add_parser('import', help='importa tweets de um arquivo exportado')
+    p.add_argument('arquivo')
+    p.add_argument('--lote', type=int, help='tweets gravados por transação (padrão: ARQUIVO_LOTE)')
+    p.add_argument('--manter-ids', action='store_true',
+                   help='restauração: mantém os ids do arquivo e ignora os que já existem')
+
+    sub.add_parser('perfis', help='lista os perfis configurados (PERFIS_PATH) e suas agendas')
+    return parser
+
+
+def listar_perfis():
+    """Mostra cada perfil: destinatário, credenciais encontradas, janela de tom e agenda."""
+    for perfil_id, perfil in perfis.todos().items():
+        credenciais = "ok" if perfis.credenciais(perfil_id) else "faltando"
+        janela = perfil['janela_tom'] or novo.TONE_ROTATION_WINDOW
+        print(f"👤 {perfil_id}: para {perfil['variaveis']['destinatario']} | "
+              f"credenciais {perfil['credenciais']}* {credenciais} | janela de tom {janela}")
+        for acao, cron in agenda(perfil_id):
+            print(f"   {acao}: {', '.join(f'{k}={v}' for k, v in cron.items())}")
+
+
+def transferir_arquivo(comando: str, arquivo: str, lote: int = None, manter_ids: bool = False) -> bool:
+    """Executa `export`/`import` do histórico e mostra quantos tweets passaram e em quanto tempo."""
+    t0 = time.perf_counter()
+    try:
+        if comando == 'export':
+            total = arquivo_tweets.exportar(arquivo, lote)
+        else:
+            total = arquivo_tweets.importar(arquivo, lote, manter_ids=manter_ids)
+    except Exception as e:
+        print(f"❌ Falha ao {'exportar' if comando == 'export' else 'importar'} {arquivo}: {e}")
+        return False
+    segundos = time.perf_counter() - t0
+    if comando == 'export':
+        print(f"📦 {total} tweet(s) exportado(s) para {arquivo} "
+              f"({os.path.getsize(arquivo) / 1e6:.1f} MB, {segundos:.1f} s, {total / max(segundos, 1e-9):.0f} tweets/s)")
+    else:
+        print(f"📥 {total} tweet(s) importado(s) de {arquivo} ({segundos:.1f} s, {total / max(segundos, 1e-9):.0f} tweets/s)")
+    return True
+
+
+def main(argv: list = None):
+    """Função principal que inicia o bot."""
+    args = _parser().parse_args(argv)
+    dry_run = args.dry_run or _dry_run_env()
+    if not bootstrap(precisa_llm=args.comando not in ('export', 'import', 'perfis')):
+        return 1
+
+    if args.comando == 'perfis':
+        listar_perfis()
+        return 0
+
+    perfil = getattr(args, 'perfil', None)
+    usa_perfil = args.comando in ('run', 'generate-batch') or (args.comando is None and args.acao)
+    if usa_perfil and (perfil or PERFIL_PADRAO) not in perfis.todos():
+        # Sem --perfil vale o perfil padrão, que pode não estar em PERFIS_PATH
+        print(f"❌ Perfil desconhecido: {perfil or PERFIL_PADRAO} (configurados: {', '.join(perfis.todos())})")
+        return 2
+
+    if args.comando in ('export', 'import'):
+        return 0 if transferir_arquivo(args.comando, args.arquivo, args.lote,
+                                       manter_ids=getattr(args, 'manter_ids', False)) else 1
+
+    if args.comando == 'generate-batch':
+        resultados = gerar_lote(args.acoes, args.k, dry_run=args.dry_run, concorrencia=args.concorrencia,
+                                perfil=perfil)
+        return 0 if any(not isinstance(r, Exception) and r.get('text') for r in resultados) else 1
+
+    acao = getattr(args, 'acao', None)
+    if args.comando == 'run' or (args.comando is None and acao):
+        resultado = run_action(acao, dry_run, perfil=perfil)
+        return 0 if (resultado or {}).get('text') else 1
+
+    iniciar_bot(dry_run, aviso_inicio=getattr(args, 'aviso_inicio', False))
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    # Os jobs persistidos referenciam 'main:<função>'; rodando como script, 'main' é este módulo
+    sys.modules.setdefault('main', sys.modules['__main__'])
+    raise SystemExit(main())
@@ -1,24 +1,64 @@
-from openai import OpenAI
+import asyncio
+import contextvars
 import os
-from dotenv import load_dotenv
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import inspect
+import hashlib
 import json
 import random
+import re
+import threading
+import time
+import types
+import weakref
+
+if __name__ == '__main__':
+    # Como módulo, quem carrega o .env é o ponto de entrada (main.py) antes de importar este arquivo
+    from dotenv import load_dotenv
+    load_dotenv('./.env')
+
+from db_sqlite import inserir_last_tweet, recent_tweets, buscar_tons_cache, gravar_tons_cache, listar_rotulados, find_similar
+from tom_local import ClassificadorLocal
+from similaridade import IndiceLSH
+import fila_gravacao
+import limites
+import llm
+import perfis
+import telemetria
+
+TZ_SP = ZoneInfo("America/Sao_Paulo")
+
+
+def _relogio_padrao():
+    return datetime.now(TZ_SP)
+
+
+# Relógio consultado a cada geração; substituível em testes com `set_relogio`
+_relogio = _relogio_padrao
 
-load_dotenv('./.env')
 
-client = OpenAI(
-  base_url="https://openrouter.ai/api/v1",
-  api_key=os.getenv('OPENROUTER_API_KEY'),
-)
-from db_sqlite import inserir_last_tweet, listar_tweets
+def set_relogio(fn):
+    """Troca o relógio usado pelo bot (função sem argumentos que retorna datetime); `None` restaura o real."""
+    global _relogio
+    _relogio = fn or _relogio_padrao
 
-now_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
-data_hora_sp = now_sp.strftime("%d/%m/%Y %H:%M:%S")
-offset = now_sp.strftime("%z")  # ex: -0300
-offset_fmt = f"UTC{offset[:3]}:{offset[3:]}"  # ex: UTC-03:00
+
+def agora() -> datetime:
+    """Instante atual em São Paulo segundo o relógio configurado."""
+    quando = _relogio()
+    return quando.replace(tzinfo=TZ_SP) if quando.tzinfo is None else quando.astimezone(TZ_SP)
+
+
+def _carimbo(quando: datetime = None) -> str:
+    """Data/hora para o prompt, ex.: '18/10/2026 07:00:00 (UTC-03:00)'."""
+    if quando is None:
+        quando = agora()
+    elif quando.tzinfo is None:
+        quando = quando.replace(tzinfo=TZ_SP)
+    else:
+        quando = quando.astimezone(TZ_SP)
+    offset = quando.strftime("%z")  # ex: -0300
+    return f"{quando.strftime('%d/%m/%Y %H:%M:%S')} (UTC{offset[:3]}:{offset[3:]})"
 
 
 # Conjunto de 10 tons possíveis para guiar geração
@@ -75,67 +115,259 @@ TONES = [
     },
 ]
 
+TONES_BY_KEY = {t["key"]: t for t in TONES}
+
+# Modelo usado para classificar o tom dos tweets anteriores
+CLASSIFIER_MODEL = "openai/gpt-oss-120b"
+
+# Prompt de sistema do classificador com o catálogo de tons, serializado uma única vez: é o
+# prefixo fixo de toda chamada (só os tweets numerados variam), aproveitando o cache do provedor
+_MSG_SISTEMA_CLASSIFICADOR = {
+    "role": "system",
+    "content": (
+        "Você é um classificador de tom. Para CADA texto listado, escolha exatamente UM dos 10 tons. "
+        "Não copie, não parafraseie conteúdo; produza APENAS um JSON array com itens no formato:\n"
+        "[{\"i\": <numero_do_item>, \"key\": <key>, \"nome\": <nome>, \"diretriz\": <diretriz>}, ...]\n\n"
+        "Tons disponíveis (key, nome, diretriz):\n"
+        + json.dumps([{"key": t["key"], "nome": t["nome"], "diretriz": t["diretriz"]} for t in TONES], ensure_ascii=False)
+    ),
+}
+
+# Versão do cache de classificação: muda quando o catálogo de tons ou o modelo mudam
+TONE_CACHE_VERSION = hashlib.sha256(
+    json.dumps({"model": CLASSIFIER_MODEL, "tones": TONES}, ensure_ascii=False, sort_keys=True).encode('utf-8')
+).hexdigest()[:16]
+
 # Janela configurável para evitar repetição de tom (padrão: 5)
 TONE_ROTATION_WINDOW = int(os.getenv('TONE_ROTATION_WINDOW', '5'))
 
+# Confiança mínima do classificador local para dispensar o LLM (acima de 1 desativa).
+# Desativado por padrão: com os rótulos atuais o acordo com o LLM é baixo (ver `bench.py tom-local`)
+LOCAL_TONE_THRESHOLD = float(os.getenv('LOCAL_TONE_THRESHOLD', '2'))
+
+# Limites do motor assíncrono: chamadas LLM simultâneas e timeout (s) por chamada
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '60'))
+
+# Geração em stream: o texto é validado enquanto chega e o stream é cancelado na primeira violação
+LLM_STREAM = os.getenv('LLM_STREAM', 'false').lower() in ('1', 'true', 'yes', 'sim')
+
+# Tentativas de geração quando o texto passa do limite do tweet ou traz hashtag
+GERACAO_TENTATIVAS = int(os.getenv('GERACAO_TENTATIVAS', '3'))
+TWEET_MAX_CHARS = 280
+_HASHTAG = re.compile(r'#\w')
+
+# Best-of-N: candidatos pedidos numa única chamada ('json' = lista JSON no texto, 'n' = parâmetro n da API)
+GERACAO_CANDIDATOS = int(os.getenv('GERACAO_CANDIDATOS', '1'))
+GERACAO_CANDIDATOS_MODO = os.getenv('GERACAO_CANDIDATOS_MODO', 'json').lower()
+
+# Quase-repetição: Jaccard (shingles) a partir do qual o texto é descartado e tweets recentes no índice
+SIMILARIDADE_LIMIAR = float(os.getenv('SIMILARIDADE_LIMIAR', '0.6'))
+SIMILARIDADE_JANELA = int(os.getenv('SIMILARIDADE_JANELA', '1000'))
+
+# Tweets publicados vão para a fila de gravação em lote (fora do caminho da publicação)
+DB_GRAVACAO_ASSINCRONA = os.getenv('DB_GRAVACAO_ASSINCRONA', 'true').lower() in ('1', 'true', 'yes', 'sim')
+
+# Faixa de tamanho preferida na pontuação dos candidatos (caracteres)
+TAMANHO_IDEAL = (60, 220)
+
+# Chamadas feitas ao provedor LLM nesta execução, por ponto de chamada
+llm_calls = {}
+
+# Tentativas de geração, textos descartados, streams cancelados e caracteres jogados fora
+geracao_stats = {"tentativas": 0, "invalidas": 0, "cancelados": 0, "chars_descartados": 0, "candidatos": 0}
+
+# Origem de cada tom classificado: 'type', cache, classificador local ou LLM
+tom_stats = {"type": 0, "cache": 0, "local": 0, "llm": 0}
+
+# Classificador local, treinado sob demanda com o histórico rotulado e refeito a cada 6 h
+_classificador = None
+_classificador_treinado_em = 0.0
+_classificador_lock = threading.Lock()
+CLASSIFICADOR_LOCAL_TTL_S = 6 * 3600
+
+# Índice LSH dos tweets recentes de cada perfil, carregado sob demanda e atualizado em `salvar_tweet`
+_indices = {}
+_indice_lock = threading.Lock()
+
+
+# Cliente do provedor LLM, criado na primeira chamada (importar o SDK da OpenAI custa ~0,3 s)
+async_client = None
+_cliente_lock = threading.Lock()
+
+
+class GeracaoInvalida(Exception):
+    """Todas as tentativas de geração violaram as regras do tweet (tamanho ou hashtag)."""
+
+
+# Loop de eventos dedicado ao motor assíncrono (usado pelos wrappers síncronos)
+_loop = None
+_loop_lock = threading.Lock()
+_semaforos = weakref.WeakKeyDictionary()
+# Semáforo de um lote com concorrência própria (`gerar_varias_async(concorrencia=...)`); vale só nas tasks do lote
+_semaforo_lote = contextvars.ContextVar('semaforo_lote', default=None)
+
+
+def _tone_key_from_type(typ):
+    """Extrai a key de tom de um 'type' no formato func:tone_key (ou None)."""
+    typ = typ or ''
+    if ':' in typ:
+        parts = typ.split(':', 1)
+        if len(parts) == 2 and parts[1]:
+            return parts[1].strip()
+    return None
+
+
+def _janela_tom() -> int:
+    """Janela de rotação de tom do perfil atual (padrão: TONE_ROTATION_WINDOW)."""
+    return perfis.obter()['janela_tom'] or TONE_ROTATION_WINDOW
+
+
+def _recent_tone_keys(limit: int = None, tweets: list = None):
+    """Extrai as keys de tom registradas em 'type' dos últimos N tweets (formato func:ton_key)."""
+    try:
+        limit = limit or _janela_tom()
+        if tweets is None:
+            tweets = recent_tweets(limit, perfil=perfis.atual())
+        keys = []
+        for t in tweets[:limit]:
+            key = _tone_key_from_type(t.get('type'))
+            if key:
+                keys.append(key)
+        return keys
+    except Exception:
+        return []
+
+
+def _engine_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='novo-engine', daemon=True).start()
+    return _loop
+
+
+async def _no_contexto(coro, ctx: contextvars.Context):
+    # Leva as contextvars de quem chamou (ex.: trace atual) para a task no loop do motor
+    for var, valor in ctx.items():
+        var.set(valor)
+    return await coro
+
+
+def executar(coro):
+    """Roda uma corrotina no loop do motor e espera o resultado (para CLI, scheduler e wrappers síncronos)."""
+    ctx = contextvars.copy_context()
+    return asyncio.run_coroutine_threadsafe(_no_contexto(coro, ctx), _engine_loop()).result()
+
+
+def _cliente():
+    """Cliente AsyncOpenAI do OpenRouter; as retentativas ficam a cargo de `llm.chamar` (com circuit breaker e fallback)."""
+    global async_client
+    if async_client is None:
+        with _cliente_lock:
+            if async_client is None:
+                from openai import AsyncOpenAI
+                async_client = AsyncOpenAI(
+                    base_url=os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1'),
+                    api_key=os.getenv('OPENROUTER_API_KEY'),
+                    max_retries=0,
+                )
+    return async_client
+
+
+def _semaforo():
+    sem = _semaforo_lote.get()
+    if sem is not None:
+        return sem
+    loop = asyncio.get_running_loop()
+    sem = _semaforos.get(loop)
+    if sem is None:
+        sem = _semaforos[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return sem
+
+
+async def _achat(call_site: str, timeout: float = None, **kwargs):
+    """Chamada ao provedor LLM com limite de taxa e de concorrência, prazo, retentativas e fallback (ver `llm.chamar`)."""
+    llm_calls[call_site] = llm_calls.get(call_site, 0) + 1
+    # A taxa do provedor vale para todos os perfis; espera fora do semáforo para não prender uma vaga
+    await limites.obter('llm').aguardar_async()
+    async with _semaforo():
+        completion = await llm.chamar(_cliente().chat.completions.create, call_site, timeout or LLM_TIMEOUT, **kwargs)
+    telemetria.anotar_uso(completion)
+    return completion
 
-def _definir_tom(limit: int = TONE_ROTATION_WINDOW):
-    """Analisa os últimos tweets apenas para inferir um tom e retorna um dos 10 tons.
+
+async def _achat_stream(call_site: str, validar, eco: bool = False, timeout: float = None, **kwargs):
+    """Como `_achat`, mas em stream: acumula o texto e cancela assim que `validar(texto)` devolver um motivo.
+
+    Com `eco`, imprime o texto conforme chega. Retorna (texto, usage, ttft_ms, motivo);
+    motivo é None quando o stream terminou sem violação.
+    """
+    llm_calls[call_site] = llm_calls.get(call_site, 0) + 1
+    await limites.obter('llm').aguardar_async()
+    timeout = timeout or LLM_TIMEOUT
+    prazo = time.monotonic() + timeout
+    inicio = time.perf_counter()
+    partes = []
+    estado = {"usage": None, "ttft_ms": None, "motivo": None}
+
+    async def consumir(stream):
+        async for chunk in stream:
+            if getattr(chunk, 'usage', None):
+                estado["usage"] = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ''
+            if not delta:
+                continue
+            if estado["ttft_ms"] is None:
+                estado["ttft_ms"] = (time.perf_counter() - inicio) * 1000
+            partes.append(delta)
+            if eco:
+                print(delta, end='', flush=True)
+            estado["motivo"] = validar(''.join(partes))
+            if estado["motivo"]:
+                return
+
+    async with _semaforo():
+        # Abrir o stream passa por llm.chamar (retentativas, fallback); a leitura respeita o mesmo prazo
+        stream = await llm.chamar(_cliente().chat.completions.create, call_site, timeout,
+                                  stream=True, stream_options={"include_usage": True}, **kwargs)
+        try:
+            await asyncio.wait_for(consumir(stream), max(0.0, prazo - time.monotonic()))
+        finally:
+            await stream.close()
+    if eco and partes:
+        print()
+    texto = ''.join(partes)
+    if estado["motivo"]:
+        geracao_stats["cancelados"] += 1
+        geracao_stats["chars_descartados"] += len(texto)
+    completion = types.SimpleNamespace(usage=estado["usage"])
+    llm.registrar_uso(call_site, completion)
+    telemetria.anotar_uso(completion)
+    return texto, estado["usage"], estado["ttft_ms"], estado["motivo"]
+
+
+def _definir_tom(limit: int = None, prev_class: list = None, tweets: list = None, excluir=()):
+    """Escolhe um dos 10 tons a partir da classificação dos últimos tweets.
+
+    Reaproveita `prev_class` (saída de `_classificar_tons_por_tweet`) quando informado,
+    evitando nova chamada ao classificador. Exclui o tom dominante e os tons registrados
+    recentemente em 'type' para garantir rotação, além das keys em `excluir`.
 
     Saída: dict { "key": str, "nome": str, "diretriz": str }
     """
     try:
-        tweets = listar_tweets() or []
-        textos = []
-        for t in tweets[:limit]:
-            txt = (t.get('tweet_text') or '').replace('\n', ' ').strip()
-            if txt:
-                textos.append(txt)
-
-        # Se não houver tweets, escolhe um tom aleatório
-        if not textos:
-            return random.choice(TONES)
-
-        tones_brief = [{"key": t["key"], "nome": t["nome"], "diretriz": t["diretriz"]} for t in TONES]
-
-        system_msg = (
-            "Você é um classificador de tom. Analise APENAS para perceber o estilo geral, "
-            "não copie, não parafraseie e não reutilize nenhum conteúdo. "
-            "Escolha exatamente UM dos 10 tons fornecidos e produza APENAS um JSON com o formato:\n"
-            "{\"key\": <key>, \"nome\": <nome>, \"diretriz\": <diretriz>}\n"
-            "Se os textos estiverem mistos, escolha o tom dominante ou um que permita VARIAÇÃO."
-        )
-
-        user_msg = (
-            "Tons disponíveis (key, nome, diretriz):\n" + json.dumps(tones_brief, ensure_ascii=False) + "\n\n"
-            "Tweets recentes (apenas para ANÁLISE DE TOM, nunca para uso):\n" + "\n".join(textos)
-        )
-
-        completion = client.chat.completions.create(
-            extra_body={"temperature": 0.2},
-            model="openai/gpt-oss-120b",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
-        )
-        resp_text = completion.choices[0].message.content
-        # Tenta parsear o JSON
-        data = json.loads(resp_text)
-        key = data.get("key")
-        match = next((t for t in TONES if t["key"] == key), None)
-        chosen = None
-        if match:
-            nome = data.get("nome") or match["nome"]
-            diretriz = data.get("diretriz") or match["diretriz"]
-            chosen = {"key": key, "nome": nome, "diretriz": diretriz}
-        else:
-            chosen = random.choice(TONES)
+        limit = limit or _janela_tom()
+        if tweets is None:
+            tweets = recent_tweets(limit, perfil=perfis.atual())
+        if prev_class is None:
+            prev_class = _classificar_tons_por_tweet(limit, tweets=tweets)
 
-        # Evitar repetição: se o tom escolhido já foi usado recentemente, variar
-        recent_keys = set(_recent_tone_keys(limit))
-        # Dominante dos últimos pela classificação por tweet
-        prev_class = _classificar_tons_por_tweet(limit)
+        # Evitar repetição: tons já usados recentemente e o dominante da classificação
+        recent_keys = _recent_tone_keys(limit, tweets=tweets)
         counts = {}
         for item in prev_class:
             k = item.get('key')
@@ -145,26 +377,22 @@ def _definir_tom(limit: int = TONE_ROTATION_WINDOW):
         if counts:
             dominant_key = max(counts.items(), key=lambda x: x[1])[0]
 
-        excluded = set(recent_keys)
+        excluded = set(recent_keys) | set(excluir)
         if dominant_key:
             excluded.add(dominant_key)
 
-        if chosen and chosen.get('key') in excluded:
-            candidates = [t for t in TONES if t['key'] not in excluded]
-            if candidates:
-                alt = random.choice(candidates)
-                print(f"🔄 Variei tom para evitar repetição: {chosen['key']} -> {alt['key']}")
-                return {"key": alt['key'], "nome": alt['nome'], "diretriz": alt['diretriz']}
-            else:
-                # Se todos excluídos, pelo menos evita último usado
-                avoid = list(recent_keys)[:1]
-                candidates = [t for t in TONES if t['key'] not in avoid]
-                if candidates:
-                    alt = random.choice(candidates)
-                    print(f"🔄 Variei tom (fallback): {chosen['key']} -> {alt['key']}")
-                    return {"key": alt['key'], "nome": alt['nome'], "diretriz": alt['diretriz']}
-        return chosen
-    except Exception:
+        candidates = [t for t in TONES if t['key'] not in excluded]
+        if not candidates:
+            # Se todos excluídos, pelo menos evita o último usado
+            avoid = recent_keys[:1] + list(excluir)
+            candidates = [t for t in TONES if t['key'] not in avoid] or TONES
+            print("🔄 Todos os tons usados recentemente; evitando apenas o último")
+        alt = random.choice(candidates)
+        return {"key": alt['key'], "nome": alt['nome'], "diretriz": alt['diretriz']}
+    except Exception as e:
+        # Segue com um tom qualquer, mas a falha aparece no log e no outcome do span (metrics.prom)
+        print(f"⚠️ Erro ao escolher tom ({type(e).__name__}: {e}); usando um tom aleatório")
+        telemetria.anotar(outcome='tom_aleatorio', erro=f"{type(e).__name__}: {e}")
         return random.choice(TONES)
 
 
@@ -179,42 +407,55 @@ def _print_tone_info(tone: dict):
         print(f"⚠️ Erro ao exibir tom: {e}")
 
 
-def _classificar_tons_por_tweet(limit: int = 5):
-    """Classifica o tom de cada um dos últimos N tweets. Retorna lista de dicts.
+def _classificador_local():
+    """Retorna o classificador local, (re)treinando-o com o histórico rotulado quando necessário."""
+    global _classificador, _classificador_treinado_em
+    if _classificador is None or time.monotonic() - _classificador_treinado_em > CLASSIFICADOR_LOCAL_TTL_S:
+        with _classificador_lock:
+            if _classificador is None or time.monotonic() - _classificador_treinado_em > CLASSIFICADOR_LOCAL_TTL_S:
+                exemplos = listar_rotulados(TONE_CACHE_VERSION)
+                _classificador = ClassificadorLocal(TONES).treinar(exemplos)
+                _classificador_treinado_em = time.monotonic()
+    return _classificador
 
-    Saída: [{"i": int, "key": str, "nome": str, "diretriz": str}]
+
+def _indice_recentes(perfil: str = None):
+    """Retorna o índice de similaridade dos últimos SIMILARIDADE_JANELA tweets do perfil (o atual, se omitido).
+
+    Carregado na primeira vez que o perfil gera algo.
     """
-    try:
-        tweets = listar_tweets() or []
-        textos = []
-        for t in tweets[:limit]:
-            txt = (t.get('tweet_text') or '').replace('\n', ' ').strip()
-            if txt:
-                textos.append(txt)
-        if not textos:
-            return []
+    perfil = perfil or perfis.atual()
+    indice = _indices.get(perfil)
+    if indice is None:
+        with _indice_lock:
+            indice = _indices.get(perfil)
+            if indice is None:
+                indice = IndiceLSH(SIMILARIDADE_JANELA)
+                for t in reversed(recent_tweets(SIMILARIDADE_JANELA, perfil=perfil)):
+                    indice.adicionar(t['id'], t['tweet_text'])
+                _indices[perfil] = indice
+    return indice
+
 
-        tones_brief = [{"key": t["key"], "nome": t["nome"], "diretriz": t["diretriz"]} for t in TONES]
+def _hash_texto(texto: str) -> str:
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
 
-        system_msg = (
-            "Você é um classificador de tom. Para CADA texto listado, escolha exatamente UM dos 10 tons. "
-            "Não copie, não parafraseie conteúdo; produza APENAS um JSON array com itens no formato:\n"
-            "[{\"i\": <numero_do_item>, \"key\": <key>, \"nome\": <nome>, \"diretriz\": <diretriz>}, ...]"
-        )
+
+async def _classificar_textos_llm(textos: list) -> dict:
+    """Classifica os textos numa única chamada ao LLM. Retorna {posição (1..N): key}."""
+    try:
         enumerados = [f"{i+1}) {txt}" for i, txt in enumerate(textos)]
-        user_msg = (
-            "Tons disponíveis (key, nome, diretriz):\n" + json.dumps(tones_brief, ensure_ascii=False) + "\n\n"
-            "Tweets numerados (apenas para ANÁLISE DE TOM):\n" + "\n".join(enumerados)
-        )
-
-        completion = client.chat.completions.create(
-            extra_body={"temperature": 0.2},
-            messages=[
-                {"role": "system", "content": system_msg},
+        user_msg = "Tweets numerados (apenas para ANÁLISE DE TOM):\n" + "\n".join(enumerados)
+
+        pedido = {
+            "extra_body": {"temperature": 0.2},
+            "messages": [
+                _MSG_SISTEMA_CLASSIFICADOR,
                 {"role": "user", "content": user_msg},
             ],
-            model="openai/gpt-oss-120b",
-        )
+            "model": CLASSIFIER_MODEL,
+        }
+        completion = await _achat('classificador', **pedido)
         resp_text = completion.choices[0].message.content.strip()
         try:
             # Tenta parse direto; se falhar, tenta extrair o bloco JSON entre []
@@ -227,22 +468,190 @@ def _classificar_tons_por_tweet(limit: int = 5):
             else:
                 data = []
 
-        resultados = []
+        resultado = {}
         for item in data:
             key = item.get('key')
-            match = next((t for t in TONES if t['key'] == key), None)
-            if match:
-                resultados.append({
-                    'i': item.get('i'),
-                    'key': key,
-                    'nome': item.get('nome') or match['nome'],
-                    'diretriz': item.get('diretriz') or match['diretriz'],
-                })
-        return resultados
+            try:
+                i = int(item.get('i'))
+            except (TypeError, ValueError):
+                continue
+            if key in TONES_BY_KEY and 1 <= i <= len(textos):
+                resultado[i] = key
+        return resultado
+    except Exception as e:
+        print(f"⚠️ Classificador LLM indisponível ({type(e).__name__}: {e}); seguindo sem esses tons")
+        return {}
+
+
+def _classificar_tons_por_tweet(limit: int = None, tweets: list = None):
+    return executar(_classificar_tons_por_tweet_async(limit, tweets))
+
+
+async def _classificar_tons_por_tweet_async(limit: int = None, tweets: list = None):
+    """Classifica o tom de cada um dos últimos N tweets. Retorna lista de dicts.
+
+    Se `tweets` for informado, usa essa janela em vez de consultar o banco.
+    Tweets gerados pelo bot já trazem o tom em 'type' (func:tone_key); os demais são
+    buscados no cache `tweet_tones`, depois no classificador local, e só os que ficarem
+    abaixo de LOCAL_TONE_THRESHOLD vão ao LLM.
+
+    Saída: [{"i": int, "key": str, "nome": str, "diretriz": str}]
+    """
+    try:
+        limit = limit or _janela_tom()
+        if tweets is None:
+            tweets = await asyncio.to_thread(recent_tweets, limit, perfil=perfis.atual())
+        janela = []
+        for t in tweets[:limit]:
+            txt = (t.get('tweet_text') or '').replace('\n', ' ').strip()
+            if txt:
+                janela.append((t, txt))
+        if not janela:
+            return []
+
+        ids = [t.get('id') for t, _ in janela if t.get('id') is not None]
+        cache = await asyncio.to_thread(buscar_tons_cache, ids, TONE_CACHE_VERSION)
+
+        keys = {}
+        pendentes = []
+        for pos, (t, txt) in enumerate(janela, start=1):
+            key = _tone_key_from_type(t.get('type'))
+            origem = 'type'
+            if key not in TONES_BY_KEY:
+                hit = cache.get(t.get('id'))
+                key, origem = None, 'cache'
+                if hit and hit['content_hash'] == _hash_texto(txt) and hit['tone_key'] in TONES_BY_KEY:
+                    key = hit['tone_key']
+            if not key and LOCAL_TONE_THRESHOLD <= 1:
+                # Caminho rápido: classificador local; o LLM só entra se a confiança for baixa
+                classificador = await asyncio.to_thread(_classificador_local)
+                local_key, confianca = classificador.prever(txt)
+                if confianca >= LOCAL_TONE_THRESHOLD:
+                    key, origem = local_key, 'local'
+            if key:
+                keys[pos] = key
+                tom_stats[origem] += 1
+            else:
+                pendentes.append((pos, t, txt))
+
+        if pendentes:
+            classificados = await _classificar_textos_llm([txt for _, _, txt in pendentes])
+            novos = []
+            for n, (pos, t, txt) in enumerate(pendentes, start=1):
+                key = classificados.get(n)
+                if key:
+                    keys[pos] = key
+                    tom_stats['llm'] += 1
+                    if t.get('id') is not None:
+                        novos.append((t['id'], _hash_texto(txt), key))
+            await asyncio.to_thread(gravar_tons_cache, novos, TONE_CACHE_VERSION)
+
+        return [
+            {'i': pos, 'key': key, 'nome': TONES_BY_KEY[key]['nome'], 'diretriz': TONES_BY_KEY[key]['diretriz']}
+            for pos, key in sorted(keys.items())
+        ]
     except Exception:
         return []
 
 
+def _preparar_tom(limit: int = None):
+    return executar(_preparar_tom_async(limit))
+
+
+async def _preparar_tom_async(limit: int = None):
+    """Lê e classifica a janela recente do perfil uma única vez por execução.
+
+    O mesmo resultado alimenta a auditoria (`_print_prev_tones`), o cálculo do tom
+    dominante e a exclusão por rotação. Retorna (classificacoes, tom).
+    """
+    limit = limit or _janela_tom()
+    with telemetria.span('db_read', limit=limit):
+        await _esvaziar_fila()
+        tweets = await asyncio.to_thread(recent_tweets, limit, perfil=perfis.atual())
+    with telemetria.span('classificacao', tweets=len(tweets)) as s:
+        antes = dict(tom_stats)
+        prev = await _classificar_tons_por_tweet_async(limit, tweets=tweets)
+        s["origens"] = {k: v - antes.get(k, 0) for k, v in tom_stats.items() if v != antes.get(k, 0)}
+    with telemetria.span('escolha_tom') as s:
+        tone = _definir_tom(limit, prev_class=prev, tweets=tweets)
+        s["tone_key"] = tone.get('key')
+    return prev, tone
+
+
+def _montar_resultado(action: str, text: str, tone: dict, inicio: float, completion) -> dict:
+    """Monta o resultado estruturado de uma geração.
+
+    Saída: dict { "text": str, "tone_key": str, "action": str, "perfil": str, "latency_ms": float,
+                  "usage": {"prompt_tokens": int, "completion_tokens": int, "total_tokens": int,
+                            "cached_tokens": int (tokens do prompt servidos do cache do provedor)} }
+    `gerar_async` acrescenta "ttft_ms" (só em stream), "tentativas" e "similaridade" (com o histórico recente).
+    """
+    usage = getattr(completion, 'usage', None)
+    return {
+        "text": text,
+        "tone_key": tone.get('key'),
+        "action": action,
+        "perfil": perfis.atual(),
+        "latency_ms": (time.perf_counter() - inicio) * 1000,
+        "usage": {
+            "prompt_tokens": getattr(usage, 'prompt_tokens', None),
+            "completion_tokens": getattr(usage, 'completion_tokens', None),
+            "total_tokens": getattr(usage, 'total_tokens', None),
+            "cached_tokens": getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', None),
+        },
+    }
+
+
+def salvar_tweet(resultado: dict, esperar: bool = False):
+    """Grava no SQLite, no perfil atual, o texto de um resultado de geração com type=action:tone_key.
+
+    Com DB_GRAVACAO_ASSINCRONA, o tweet vai para a fila de gravação (`fila_gravacao`) e a função
+    retorna sem esperar o commit (None); `esperar=True` espera a confirmação e retorna o dict gravado.
+    """
+    with telemetria.span('db_insert', fila=DB_GRAVACAO_ASSINCRONA) as s:
+        try:
+            if not resultado or not resultado.get('text'):
+                s["outcome"] = "vazio"
+                return None
+            tipo = f"{resultado['action']}:{resultado['tone_key']}"
+            perfil = perfis.atual()
+            if not DB_GRAVACAO_ASSINCRONA:
+                gravado = inserir_last_tweet(resultado['text'], tipo, perfil)
+                if gravado is None:
+                    s["outcome"] = "erro"
+                else:
+                    _indexar_gravado(gravado)
+                return gravado
+            futuro = fila_gravacao.obter().enviar(resultado['text'], tipo, perfil)
+            futuro.add_done_callback(_ao_gravar)
+            if esperar:
+                return futuro.result()
+            s["outcome"] = "enfileirado"
+            return None
+        except Exception as e:
+            s["outcome"] = "erro"
+            print(f"❌ Erro ao gravar no SQLite: {e}")
+            return None
+
+
+def _indexar_gravado(gravado: dict):
+    indice = _indices.get(gravado['perfil'])
+    if indice is not None:
+        indice.adicionar(gravado['id'], gravado['tweet_text'])
+
+
+def _ao_gravar(futuro):
+    # Roda na thread da fila depois do commit do lote (erros já são impressos pela fila)
+    if futuro.exception() is None:
+        _indexar_gravado(futuro.result())
+
+
+async def _esvaziar_fila():
+    """Leituras do histórico precisam ver os tweets ainda na fila de gravação."""
+    if fila_gravacao.pendentes():
+        await asyncio.to_thread(fila_gravacao.esvaziar)
+
+
 def _print_prev_tones(classificacoes: list):
     if not classificacoes:
         print("🧭 Toms dos últimos tweets: nenhum disponível")
@@ -251,251 +660,368 @@ def _print_prev_tones(classificacoes: list):
     for item in classificacoes:
         print(f"   {item.get('i')}) {item.get('nome')} ({item.get('key')})")
 
-def bom_dia():
-    prev = _classificar_tons_por_tweet()
-    _print_prev_tones(prev)
-    tone = _definir_tom()
-    user_content = (
-        f"Data e hora atual (São Paulo/BR): {data_hora_sp} ({offset_fmt}). "
-        "Gere uma única mensagem jovem de bom dia para Laura, pronta para postagem, sem hashtags. "
-        f"Tom alvo: {tone['nome']}. Diretriz de tom: {tone['diretriz']}. "
-        "Varie o estilo; não repita fórmulas; não use conteúdo de tweets anteriores."
-    )
-    completion = client.chat.completions.create(
-      extra_body={},
-      model="openai/gpt-oss-120b",
-      messages=[
-                  {
-                    "role": "system",
-                    "content": (
-                        "Você é um robô e suas respostas vão direto para uma conta no X (Twitter). "
-                        "Não faça perguntas, não peça confirmação e não inclua metacommentários. "
-                        "Escreva como alguém jovem (nascido em 2003+), com tom natural e leve, usando gírias brasileiras quando fizer sentido, sem soar forçado. "
-                        "Não use hashtags em nenhuma hipótese. "
-                        "Responda apenas com uma única mensagem pronta para postagem, sem prefixos. "
-                        "Você foi criado para escrever mensagens de bom dia carinhosas e divertidas para a Laura. "
-                        "Use o dia e a hora que eu te enviar para criar uma saudação única: "
-                        "pode ser super romântica, bem-humorada, descontraída, educada ou até com um toque de malícia leve — "
-                        "sempre de forma surpreendente e aleatória. "
-                        "Varie o estilo a cada mensagem, mas sempre com carinho. "
-                        "Siga o 'Tom alvo' e a 'Diretriz de tom' enviados pelo usuário; use exatamente um dos 10 tons definidos. "
-                        "Não copie, não parafraseie e não use nenhum conteúdo dos tweets anteriores. Gere mensagem ORIGINAL."
-                    )
-                  },
-                  {
-                    "role": "user",
-                    "content": user_content
-                  }
-                ]
-    )
-    resp_text = completion.choices[0].message.content
-    _print_tone_info(tone)
-    print(resp_text)
-    try:
-        type_name = inspect.currentframe().f_code.co_name
-        inserir_last_tweet(resp_text, f"{type_name}:{tone['key']}")
-    except Exception as e:
-        print(f"❌ Erro ao gravar no SQLite: {e}")
+# Modelo e parâmetros padrão da geração
+GENERATOR_MODEL = "openai/gpt-oss-120b"
 
-def boa_tarde():
-    prev = _classificar_tons_por_tweet()
-    _print_prev_tones(prev)
-    tone = _definir_tom()
-    user_content = (
-        f"Data e hora atual (São Paulo/BR): {data_hora_sp} ({offset_fmt}). "
-        "Gere uma única mensagem jovem de boa tarde para Laura, pronta para postagem, sem hashtags. "
-        f"Tom alvo: {tone['nome']}. Diretriz de tom: {tone['diretriz']}. "
-        "Varie o estilo; não repita fórmulas; não use conteúdo de tweets anteriores."
-    )
-    completion = client.chat.completions.create(
-      extra_body={},
-      model="openai/gpt-oss-120b",
-      messages=[
-                  {
-                    "role": "system",
-                    "content": (
-                        "Você é um robô e suas respostas vão direto para uma conta no X (Twitter). "
-                        "Não faça perguntas, não peça confirmação e não inclua metacommentários. "
-                        "Escreva como alguém jovem (nascido em 2003+), com tom natural e leve, usando gírias brasileiras quando fizer sentido, sem soar forçado. "
-                        "Não use hashtags em nenhuma hipótese. "
-                        "Responda apenas com uma única mensagem pronta para postagem, sem prefixos. "
-                        "Você foi criado para escrever mensagens carinhosas e divertidas para a Laura. "
-                        "Use o dia e a hora que eu te enviar para criar uma saudação única: "
-                        "pode ser super romântica, bem-humorada, descontraída, educada ou até com um toque de malícia leve — "
-                        "sempre de forma surpreendente e aleatória. "
-                        "Varie o estilo a cada mensagem, mas sempre com carinho. "
-                        "Siga o 'Tom alvo' e a 'Diretriz de tom' enviados pelo usuário; use exatamente um dos 10 tons definidos. "
-                        "Não copie, não parafraseie e não use nenhum conteúdo dos tweets anteriores. Gere mensagem ORIGINAL."
-                    )
-                  },
-                  {
-                    "role": "user",
-                    "content": user_content
-                  }
-                ]
-    )
-    resp_text = completion.choices[0].message.content
-    _print_tone_info(tone)
-    print(resp_text)
-    try:
-        type_name = inspect.currentframe().f_code.co_name
-        inserir_last_tweet(resp_text, f"{type_name}:{tone['key']}")
-    except Exception as e:
-        print(f"❌ Erro ao gravar no SQLite: {e}")
 
+def _system_prompt(tema: str = "") -> str:
+    """Prompt de sistema da geração; `tema` especializa a frase de propósito (ex.: "de bom dia ").
 
-def boa_noite():
-    prev = _classificar_tons_por_tweet()
-    _print_prev_tones(prev)
-    tone = _definir_tom()
-    user_content = (
-        f"Data e hora atual (São Paulo/BR): {data_hora_sp} ({offset_fmt}). "
-        "Gere uma única mensagem jovem de boa noite para Laura, pronta para postagem, sem hashtags. "
-        f"Tom alvo: {tone['nome']}. Diretriz de tom: {tone['diretriz']}. "
-        "Varie o estilo; não repita fórmulas; não use conteúdo de tweets anteriores."
-    )
-    completion = client.chat.completions.create(
-      extra_body={},
-      model="openai/gpt-oss-120b",
-      messages=[
-                  {
-                    "role": "system",
-                    "content": (
-                        "Você é um robô e suas respostas vão direto para uma conta no X (Twitter). "
-                        "Não faça perguntas, não peça confirmação e não inclua metacommentários. "
-                        "Escreva como alguém jovem (nascido em 2003+), com tom natural e leve, usando gírias brasileiras quando fizer sentido, sem soar forçado. "
-                        "Não use hashtags em nenhuma hipótese. "
-                        "Responda apenas com uma única mensagem pronta para postagem, sem prefixos. "
-                        "Você foi criado para escrever mensagens carinhosas e divertidas para a Laura. "
-                        "Use o dia e a hora que eu te enviar para criar uma saudação única: "
-                        "pode ser super romântica, bem-humorada, descontraída, educada ou até com um toque de malícia leve — "
-                        "sempre de forma surpreendente e aleatória. "
-                        "Varie o estilo a cada mensagem, mas sempre com carinho. "
-                        "Siga o 'Tom alvo' e a 'Diretriz de tom' enviados pelo usuário; use exatamente um dos 10 tons definidos. "
-                        "Não copie, não parafraseie e não use nenhum conteúdo dos tweets anteriores. Gere mensagem ORIGINAL."
-                    )
-                  },
-                  {
-                    "role": "user",
-                    "content": user_content
-                  }
-                ]
+    `{destinatario}` fica para as variáveis do perfil (ver `_prompts`).
+    """
+    return (
+        "Você é um robô e suas respostas vão direto para uma conta no X (Twitter). "
+        "Não faça perguntas, não peça confirmação e não inclua metacommentários. "
+        "Escreva como alguém jovem (nascido em 2003+), com tom natural e leve, usando gírias brasileiras quando fizer sentido, sem soar forçado. "
+        "Não use hashtags em nenhuma hipótese. "
+        "Responda apenas com uma única mensagem pronta para postagem, sem prefixos. "
+        f"Você foi criado para escrever mensagens {tema}carinhosas e divertidas para {{destinatario}}. "
+        "Use o dia e a hora que eu te enviar para criar uma saudação única: "
+        "pode ser super romântica, bem-humorada, descontraída, educada ou até com um toque de malícia leve — "
+        "sempre de forma surpreendente e aleatória. "
+        "Varie o estilo a cada mensagem, mas sempre com carinho. "
+        "Siga o 'Tom alvo' e a 'Diretriz de tom' enviados pelo usuário; use exatamente um dos 10 tons definidos. "
+        "Não copie, não parafraseie e não use nenhum conteúdo dos tweets anteriores. Gere mensagem ORIGINAL."
     )
-    resp_text = completion.choices[0].message.content
-    _print_tone_info(tone)
-    print(resp_text)
+
+
+# Prompts de sistema montados uma única vez e compartilhados entre as ações
+_SYSTEM_PADRAO = _system_prompt()
+_SYSTEM_BOM_DIA = _system_prompt("de bom dia ")
+
+# Registro das ações: instrução enviada ao modelo, prompt de sistema, agenda (gatilhos cron
+# em America/Sao_Paulo), parâmetros do modelo e, opcionalmente, a política do job no scheduler
+# (max_instances, coalesce, misfire_grace_time). Nova ação = nova entrada aqui. Instrução e
+# prompt de sistema são modelos com as variáveis do perfil ({destinatario}); a agenda é a
+# padrão, que cada perfil pode trocar.
+ACOES = {
+    'bom_dia': {
+        "instrucao": "Gere uma única mensagem jovem de bom dia para {destinatario}, pronta para postagem, sem hashtags.",
+        "system": _SYSTEM_BOM_DIA,
+        "agenda": [
+            dict(hour=7, day_of_week='mon,tue,wed,thu'),
+            # Fim de semana bom dia às 9
+            dict(hour=9, day_of_week='sat,sun'),
+        ],
+        # Bom dia atrasado em até 3 h ainda faz sentido (padrão do scheduler: SCHEDULER_MISFIRE_GRACE_S)
+        "politica": {"misfire_grace_time": 3 * 3600},
+        "modelo": {"model": GENERATOR_MODEL, "extra_body": {}},
+    },
+    'boa_tarde': {
+        "instrucao": "Gere uma única mensagem jovem de boa tarde para {destinatario}, pronta para postagem, sem hashtags.",
+        "system": _SYSTEM_PADRAO,
+        "agenda": [],
+        "modelo": {"model": GENERATOR_MODEL, "extra_body": {}},
+    },
+    'boa_noite': {
+        "instrucao": "Gere uma única mensagem jovem de boa noite para {destinatario}, pronta para postagem, sem hashtags.",
+        "system": _SYSTEM_PADRAO,
+        # Boa noite diário 22:00
+        "agenda": [dict(hour=22, day_of_week='mon,tue,wed,thu,fri,sat,sun')],
+        "modelo": {"model": GENERATOR_MODEL, "extra_body": {}},
+    },
+    'sextou_bom_dia': {
+        "instrucao": "Gere uma única mensagem jovem de bom dia de sexta-feira (sextou) para {destinatario}, pronta para postagem, sem hashtags.",
+        "system": _SYSTEM_PADRAO,
+        # Sexta de manhã usa sextou_bom_dia
+        "agenda": [dict(hour=7, day_of_week='fri')],
+        "modelo": {"model": GENERATOR_MODEL, "extra_body": {}},
+    },
+    'sextou_boa_tarde': {
+        "instrucao": "Gere uma única mensagem jovem de boa tarde de sexta-feira (quem fez fez) para {destinatario}, pronta para postagem, sem hashtags.",
+        "system": _SYSTEM_PADRAO,
+        "agenda": [],
+        "modelo": {"model": GENERATOR_MODEL, "extra_body": {}},
+    },
+}
+
+# Execuções por ação: quantidade, latência acumulada (ms) e tokens
+acao_stats = {}
+
+
+def _prompts(action: str) -> tuple:
+    """(prompt de sistema, instrução) da ação com as variáveis do perfil atual.
+
+    O prompt de sistema de cada perfil é fixo entre chamadas, então o cache de prefixo do
+    provedor continua valendo por perfil.
+    """
+    perfil = perfis.obter()
+    spec = ACOES[action]
+    instrucao = perfil['instrucoes'].get(action, spec['instrucao'])
+    return spec['system'].format_map(perfil['variaveis']), instrucao.format_map(perfil['variaveis'])
+
+
+def validar_perfis() -> list:
+    """Confere ações, gatilhos da agenda e variáveis de todos os perfis; retorna a lista de problemas (vazia se tudo certo)."""
+    from apscheduler.triggers.cron import CronTrigger
+    problemas = []
+    for perfil_id, perfil in perfis.todos().items():
+        for acao in list(perfil['agenda'] or {}) + list(perfil['instrucoes']):
+            if acao not in ACOES:
+                problemas.append(f"{perfil_id}: ação desconhecida '{acao}'")
+        # Os mesmos gatilhos que o scheduler monta em `_sincronizar_agenda`, para o erro sair antes de iniciar
+        for acao, crons in (perfil['agenda'] or {}).items():
+            for cron in crons:
+                try:
+                    CronTrigger(timezone=TZ_SP, **cron)
+                except (TypeError, ValueError) as e:
+                    problemas.append(f"{perfil_id}: gatilho inválido em {acao} {cron!r} ({e})")
+        with perfis.usando(perfil_id):
+            for acao in ACOES:
+                try:
+                    _prompts(acao)
+                except (KeyError, ValueError, IndexError) as e:
+                    problemas.append(f"{perfil_id}: prompt de {acao} usa variável não definida ({e})")
+    return problemas
+
+
+def _registrar_acao(resultado: dict):
+    stats = acao_stats.setdefault(resultado['action'], {"execucoes": 0, "total_ms": 0.0, "total_tokens": 0, "cached_tokens": 0})
+    stats["execucoes"] += 1
+    stats["total_ms"] += resultado.get('latency_ms') or 0.0
+    stats["total_tokens"] += (resultado.get('usage') or {}).get('total_tokens') or 0
+    stats["cached_tokens"] += (resultado.get('usage') or {}).get('cached_tokens') or 0
+
+
+def _violacao(texto: str):
+    """Motivo pelo qual o texto não pode ser postado ('longo' ou 'hashtag'), ou None."""
+    if len(texto.strip()) > TWEET_MAX_CHARS:
+        return 'longo'
+    if _HASHTAG.search(texto):
+        return 'hashtag'
+    return None
+
+
+def _pontuar(texto: str):
+    """Pontua um texto completo: (pontuação, motivo, similaridade). Com motivo, o texto é descartado.
+
+    Pontuação = 1 - similaridade com o histórico recente - penalidade por sair de TAMANHO_IDEAL.
+    """
+    motivo = _violacao(texto)
+    if motivo:
+        return None, motivo, None
+    similaridade = _indice_recentes().max_similaridade(texto)
+    if similaridade >= SIMILARIDADE_LIMIAR:
+        return None, 'repetido', similaridade
+    tamanho = len(texto.strip())
+    fora = max(TAMANHO_IDEAL[0] - tamanho, tamanho - TAMANHO_IDEAL[1], 0)
+    return 1.0 - similaridade - min(1.0, fora / 100) / 2, None, similaridade
+
+
+def _pedido_candidatos(n: int):
+    """(trecho para a mensagem do usuário, parâmetros extras) para pedir `n` candidatos numa única chamada."""
+    if n <= 1:
+        return "", {}
+    if GERACAO_CANDIDATOS_MODO == 'n':
+        return "", {"n": n}
+    return (
+        f" Neste pedido, escreva {n} mensagens diferentes entre si e responda APENAS com um JSON array "
+        f"de {n} strings, sem nenhum outro texto."
+    ), {}
+
+
+def _extrair_candidatos(completion) -> list:
+    textos = [(c.message.content or '').strip() for c in completion.choices]
+    if GERACAO_CANDIDATOS_MODO == 'n':
+        return [t for t in textos if t]
+    resp_text = textos[0] if textos else ''
     try:
-        type_name = inspect.currentframe().f_code.co_name
-        inserir_last_tweet(resp_text, f"{type_name}:{tone['key']}")
-    except Exception as e:
-        print(f"❌ Erro ao gravar no SQLite: {e}")
+        # Tenta parse direto; se falhar, tenta extrair o bloco JSON entre []
+        data = json.loads(resp_text)
+    except Exception:
+        start = resp_text.find('[')
+        end = resp_text.rfind(']')
+        try:
+            data = json.loads(resp_text[start:end+1]) if start != -1 and end != -1 else [resp_text]
+        except Exception:
+            data = [resp_text]
+    if not isinstance(data, list):
+        data = [resp_text]
+    return [t.strip() for t in data if isinstance(t, str) and t.strip()]
 
 
-def sextou_bom_dia():
-    prev = _classificar_tons_por_tweet()
-    _print_prev_tones(prev)
-    tone = _definir_tom()
+async def _similaridade_historico(texto: str):
+    """Similaridade com o tweet mais parecido de todo o histórico (índice LSH no SQLite), se passar do limiar."""
+    parecidos = await asyncio.to_thread(find_similar, texto, SIMILARIDADE_LIMIAR, 1, perfis.atual())
+    return parecidos[0]['similaridade'] if parecidos else None
+
+
+async def _gerar_texto(messages: list, modelo: dict, eco: bool = False, extras: dict = None):
+    """Pede o texto ao gerador até GERACAO_TENTATIVAS vezes, descartando os que violam as regras ou repetem o histórico.
+
+    Em stream (LLM_STREAM) a violação cancela a resposta na hora. Com GERACAO_CANDIDATOS > 1 cada
+    tentativa pede vários candidatos numa só chamada (sem stream; `messages`/`extras` já trazem o
+    pedido de `_pedido_candidatos`) e fica o de maior `_pontuar`.
+    O escolhido ainda é conferido contra o histórico inteiro com `find_similar`.
+    Retorna (texto, completion, ttft_ms, tentativas, similaridade).
+    """
+    if perfis.atual() not in _indices:
+        await asyncio.to_thread(_indice_recentes)
+    motivo = None
+    for tentativa in range(1, GERACAO_TENTATIVAS + 1):
+        geracao_stats["tentativas"] += 1
+        ttft_ms = None
+        if GERACAO_CANDIDATOS > 1:
+            completion = await _achat('gerador', messages=messages, **modelo, **(extras or {}))
+            candidatos = _extrair_candidatos(completion)
+            geracao_stats["candidatos"] += len(candidatos)
+            pontuados = [(_pontuar(t), t) for t in candidatos]
+            validos = sorted(((p, t) for p, t in pontuados if p[1] is None), key=lambda v: v[0][0], reverse=True)
+            # Do melhor para o pior, o primeiro sem repetição no histórico inteiro vence
+            for (_, _, similaridade), texto in validos:
+                no_historico = await _similaridade_historico(texto)
+                if no_historico is None:
+                    return texto, completion, ttft_ms, tentativa, similaridade
+            geracao_stats["invalidas"] += 1
+            motivos = sorted({p[1] for p, _ in pontuados if p[1]} | ({'repetido'} if validos else set())) or ['vazio']
+            motivo = '/'.join(motivos)
+            print(f"✂️ {len(candidatos)} candidato(s) descartado(s) ({motivo}); tentativa {tentativa}/{GERACAO_TENTATIVAS}")
+            continue
+        if LLM_STREAM:
+            texto, usage, ttft_ms, motivo = await _achat_stream('gerador', _violacao, eco=eco, messages=messages, **modelo)
+            completion = types.SimpleNamespace(usage=usage)
+        else:
+            completion = await _achat('gerador', messages=messages, **modelo)
+            texto, motivo = completion.choices[0].message.content or '', None
+        similaridade = None
+        if not motivo:
+            _, motivo, similaridade = _pontuar(texto)
+        if motivo is None:
+            no_historico = await _similaridade_historico(texto)
+            if no_historico is not None:
+                motivo, similaridade = 'repetido', no_historico
+        if motivo is None:
+            return texto, completion, ttft_ms, tentativa, similaridade
+        geracao_stats["invalidas"] += 1
+        print(f"✂️ Texto descartado ({motivo}, {len(texto)} caracteres); tentativa {tentativa}/{GERACAO_TENTATIVAS}")
+    raise GeracaoInvalida(f"{GERACAO_TENTATIVAS} tentativas violaram as regras do tweet (última: {motivo})")
+
+
+async def gerar_async(action: str, persistir: bool = True, prev_tom: tuple = None, quando: datetime = None,
+                      eco: bool = False):
+    """Gera o tweet de uma ação no motor assíncrono e retorna o resultado estruturado.
+
+    `prev_tom` = (classificacoes, tom) já calculados; se omitido, lê e classifica a janela recente.
+    `quando` é o instante informado ao modelo (ex.: horário do slot de um rascunho); padrão: agora.
+    `eco` imprime o texto conforme chega quando a geração é em stream (dry-run).
+    """
+    inicio = time.perf_counter()
+    if prev_tom is None:
+        prev_tom = await _preparar_tom_async()
+    prev, tone = prev_tom
+    spec = ACOES[action]
+    system, instrucao = _prompts(action)
+    pedido, extras = _pedido_candidatos(GERACAO_CANDIDATOS)
+    # Do fixo para o variável: sistema e instrução da ação, tom, e por último a data/hora,
+    # para o prefixo idêntico entre chamadas ser o mais longo possível (cache do provedor)
     user_content = (
-        f"Data e hora atual (São Paulo/BR): {data_hora_sp} ({offset_fmt}). "
-        "Gere uma única mensagem jovem de bom dia de sexta-feira (sextou) para Laura, pronta para postagem, sem hashtags. "
+        f"{instrucao} "
+        f"Varie o estilo; não repita fórmulas; não use conteúdo de tweets anteriores.{pedido} "
         f"Tom alvo: {tone['nome']}. Diretriz de tom: {tone['diretriz']}. "
-        "Varie o estilo; não repita fórmulas; não use conteúdo de tweets anteriores."
-    )
-    completion = client.chat.completions.create(
-      extra_body={},
-      model="openai/gpt-oss-120b",
-      messages=[
-                  {
-                    "role": "system",
-                    "content": (
-                        "Você é um robô e suas respostas vão direto para uma conta no X (Twitter). "
-                        "Não faça perguntas, não peça confirmação e não inclua metacommentários. "
-                        "Escreva como alguém jovem (nascido em 2003+), com tom natural e leve, usando gírias brasileiras quando fizer sentido, sem soar forçado. "
-                        "Não use hashtags em nenhuma hipótese. "
-                        "Responda apenas com uma única mensagem pronta para postagem, sem prefixos. "
-                        "Você foi criado para escrever mensagens carinhosas e divertidas para a Laura. "
-                        "Use o dia e a hora que eu te enviar para criar uma saudação única: "
-                        "pode ser super romântica, bem-humorada, descontraída, educada ou até com um toque de malícia leve — "
-                        "sempre de forma surpreendente e aleatória. "
-                        "Varie o estilo a cada mensagem, mas sempre com carinho. "
-                        "Siga o 'Tom alvo' e a 'Diretriz de tom' enviados pelo usuário; use exatamente um dos 10 tons definidos. "
-                        "Não copie, não parafraseie e não use nenhum conteúdo dos tweets anteriores. Gere mensagem ORIGINAL."
-                    )
-                  },
-                  {
-                    "role": "user",
-                    "content": user_content
-                  }
-                ]
+        f"Data e hora atual (São Paulo/BR): {_carimbo(quando)}."
     )
-    resp_text = completion.choices[0].message.content
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user_content},
+    ]
+    _print_prev_tones(prev)
     _print_tone_info(tone)
-    print(resp_text)
-    try:
-        type_name = inspect.currentframe().f_code.co_name
-        inserir_last_tweet(resp_text, f"{type_name}:{tone['key']}")
-    except Exception as e:
-        print(f"❌ Erro ao gravar no SQLite: {e}")
+    eco = eco and LLM_STREAM and GERACAO_CANDIDATOS <= 1
+    with telemetria.span('geracao', action=action, perfil=perfis.atual(), model=spec['modelo'].get('model'),
+                         stream=LLM_STREAM) as s:
+        resp_text, completion, ttft_ms, tentativas, similaridade = await _gerar_texto(messages, spec['modelo'], eco, extras)
+        s.update(tentativas=tentativas, ttft_ms=round(ttft_ms, 3) if ttft_ms is not None else None,
+                 similaridade=similaridade)
+    if not eco:
+        print(resp_text)
+    if ttft_ms is not None:
+        print(f"⚡ Primeiro token em {ttft_ms:.0f} ms")
+    resultado = _montar_resultado(action, resp_text, tone, inicio, completion)
+    resultado.update(ttft_ms=ttft_ms, tentativas=tentativas, similaridade=similaridade)
+    _registrar_acao(resultado)
+    if persistir:
+        await asyncio.to_thread(salvar_tweet, resultado)
+    return resultado
 
 
-def sextou_boa_tarde():
-    prev = _classificar_tons_por_tweet()
-    _print_prev_tones(prev)
-    tone = _definir_tom()
-    user_content = (
-        f"Data e hora atual (São Paulo/BR): {data_hora_sp} ({offset_fmt}). "
-        "Gere uma única mensagem jovem de boa tarde de sexta-feira (quem fez fez) para Laura, pronta para postagem, sem hashtags. "
-        f"Tom alvo: {tone['nome']}. Diretriz de tom: {tone['diretriz']}. "
-        "Varie o estilo; não repita fórmulas; não use conteúdo de tweets anteriores."
-    )
-    completion = client.chat.completions.create(
-      extra_body={},
-      model="openai/gpt-oss-120b",
-      messages=[
-                  {
-                    "role": "system",
-                    "content": (
-                        "Você é um robô. Suas respostas irão direto para uma conta no X (Twitter). "
-                        "Não faça perguntas, não peça confirmação e não inclua metacommentários. "
-                        "Responda apenas com uma única mensagem pronta para postagem. "
-                        "Você foi criado para escrever mensagens carinhosas e divertidas para a Laura. "
-                        "Use o dia e a hora que eu te enviar para criar uma saudação única: "
-                        "pode ser super romântica, bem-humorada, descontraída, educada ou até com um toque de malícia leve — "
-                        "sempre de forma surpreendente e aleatória. "
-                        "Varie o estilo a cada mensagem, mas sempre com carinho. "
-                        "Siga o 'Tom alvo' e a 'Diretriz de tom' enviados pelo usuário; use exatamente um dos 10 tons definidos. "
-                        "Não copie, não parafraseie e não use nenhum conteúdo dos tweets anteriores. Gere mensagem ORIGINAL."
-                    )
-                  },
-                  {
-                    "role": "user",
-                    "content": user_content
-                  }
-                ]
+async def gerar_varias_async(acoes: list, persistir: bool = True, quandos: list = None, progresso=None,
+                             concorrencia: int = None):
+    """Gera várias ações do perfil atual em paralelo (respeitando LLM_MAX_CONCURRENCY).
+
+    Com `concorrencia`, as chamadas ao LLM do lote usam um semáforo próprio desse tamanho
+    no lugar do LLM_MAX_CONCURRENCY do processo.
+
+    A janela recente é lida e classificada uma única vez para o lote, e cada ação recebe
+    um tom diferente das anteriores do lote dentro da janela de tom do perfil. `quandos` (opcional) traz o
+    instante de cada ação. `progresso(i, resultado)`, se informado, é chamado (numa thread) assim
+    que a i-ésima ação termina, com o resultado ou a exceção.
+    Retorna a lista de resultados na ordem de `acoes`;
+    falhas aparecem como a exceção correspondente na posição da ação.
+    """
+    if concorrencia:
+        token = _semaforo_lote.set(asyncio.Semaphore(concorrencia))
+        try:
+            return await gerar_varias_async(acoes, persistir, quandos, progresso)
+        finally:
+            _semaforo_lote.reset(token)
+    await _esvaziar_fila()
+    janela = _janela_tom()
+    tweets = await asyncio.to_thread(recent_tweets, janela, perfil=perfis.atual())
+    prev = await _classificar_tons_por_tweet_async(janela, tweets=tweets)
+    escolhidos = []
+    tarefas = []
+    quandos = quandos or [None] * len(acoes)
+
+    async def acompanhar(i, coro):
+        try:
+            resultado = await coro
+        except Exception as e:
+            resultado = e
+        if progresso is not None:
+            await asyncio.to_thread(progresso, i, resultado)
+        return resultado
+
+    for i, (acao, quando) in enumerate(zip(acoes, quandos)):
+        tone = _definir_tom(janela, prev_class=prev, tweets=tweets, excluir=escolhidos[-janela:])
+        escolhidos.append(tone['key'])
+        tarefas.append(acompanhar(i, gerar_async(acao, persistir, prev_tom=(prev, tone), quando=quando)))
+    return await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+def gerar_varias(acoes: list, persistir: bool = True, quandos: list = None, progresso=None,
+                 concorrencia: int = None):
+    return executar(gerar_varias_async(acoes, persistir, quandos, progresso, concorrencia))
+
+
+async def _no_perfil(perfil_id: str, coro):
+    # Cada task tem sua cópia do contexto, então o perfil definido aqui não vaza para as outras
+    with perfis.usando(perfil_id):
+        return await coro
+
+
+async def gerar_perfis_async(pedidos: dict, persistir: bool = True) -> dict:
+    """Gera os lotes de vários perfis ao mesmo tempo: `pedidos` = {perfil: (acoes, quandos)}.
+
+    Todos dividem o mesmo LLM_MAX_CONCURRENCY e o limite de taxa do provedor, em vez de um
+    perfil esperar o outro terminar. Retorna {perfil: resultados de `gerar_varias_async`};
+    se o lote inteiro de um perfil falhar, a exceção fica no lugar da lista.
+    """
+    ids = list(pedidos)
+    resultados = await asyncio.gather(
+        *(_no_perfil(p, gerar_varias_async(pedidos[p][0], persistir, pedidos[p][1])) for p in ids),
+        return_exceptions=True,
     )
-    resp_text = completion.choices[0].message.content
-    _print_tone_info(tone)
-    print(resp_text)
-    try:
-        type_name = inspect.currentframe().f_code.co_name
-        inserir_last_tweet(resp_text, f"{type_name}:{tone['key']}")
-    except Exception as e:
-        print(f"❌ Erro ao gravar no SQLite: {e}")
+    return dict(zip(ids, resultados))
+
+
+def gerar_perfis(pedidos: dict, persistir: bool = True) -> dict:
+    return executar(gerar_perfis_async(pedidos, persistir))
+
+
+def gerar(action: str, persistir: bool = True, quando: datetime = None, eco: bool = False):
+    """Versão síncrona de `gerar_async` (CLI, scheduler)."""
+    return executar(gerar_async(action, persistir, quando=quando, eco=eco))
 
 
 if __name__ == '__main__':
-    sextou_boa_tarde()
-def _recent_tone_keys(limit: int = TONE_ROTATION_WINDOW):
-    """Extrai as keys de tom registradas em 'type' dos últimos N tweets (formato func:ton_key)."""
-    try:
-        tweets = listar_tweets() or []
-        keys = []
-        for t in tweets[:limit]:
-            typ = (t.get('type') or '')
-            if ':' in typ:
-                parts = typ.split(':', 1)
-                if len(parts) == 2 and parts[1]:
-                    keys.append(parts[1].strip())
-        return keys
-    except Exception:
-        return []
+    gerar('sextou_boa_tarde')
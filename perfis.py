@@ -0,0 +1,137 @@
+"""Perfis: várias contas/destinatários atendidos pelo mesmo processo.
+
+Cada perfil tem credenciais do Twitter próprias (variáveis de ambiente com um prefixo), variáveis
+do prompt (`destinatario` e outras usadas nas instruções), janela de rotação de tom e agenda das
+ações. Os perfis vêm de PERFIS_PATH (lista JSON, ver `perfis-example.json`); sem o arquivo existe
+só o perfil padrão, com as variáveis TWITTER_* e a agenda de ACOES, como antes dos perfis.
+
+O perfil em uso numa execução fica numa contextvar (`usando`), que acompanha a execução no loop
+do motor e nas threads de `asyncio.to_thread`; o banco é particionado pela coluna `perfil`.
+"""
+import contextvars
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from db_sqlite import PERFIL_PADRAO
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PERFIS_PATH = os.getenv('PERFIS_PATH', os.path.join(_BASE_DIR, 'perfis.json'))
+
+# Sufixos das credenciais lidas com o prefixo do perfil (ex.: TWITTER_ + CONSUMER_KEY)
+CREDENCIAIS = ('CONSUMER_KEY', 'CONSUMER_SECRET', 'ACCESS_KEY', 'ACCESS_SECRET')
+
+# O id entra no banco, nos ids dos jobs e nos traces
+_ID_VALIDO = re.compile(r'^[a-z0-9][a-z0-9_-]{0,39}$')
+
+_atual = contextvars.ContextVar('perfil', default=PERFIL_PADRAO)
+_perfis = None
+_perfis_lock = threading.Lock()
+
+
+def _normalizar(bruto: dict) -> dict:
+    """Valida um perfil do arquivo e completa os campos opcionais.
+
+    Campos: id, variaveis (com `destinatario`), credenciais (prefixo; padrão TWITTER_<ID>_),
+    janela_tom (padrão TONE_ROTATION_WINDOW), agenda ({ação: [gatilhos cron]}; padrão a de ACOES)
+    e instrucoes ({ação: texto com {variaveis}}; padrão a instrução de ACOES).
+    """
+    if not isinstance(bruto, dict):
+        raise ValueError(f"perfil inválido (esperado objeto JSON): {bruto!r}")
+    perfil_id = bruto.get('id')
+    if not isinstance(perfil_id, str) or not _ID_VALIDO.match(perfil_id):
+        raise ValueError(f"id de perfil inválido: {perfil_id!r} (minúsculas, dígitos, _ e -; até 40)")
+    variaveis = dict(bruto.get('variaveis') or {})
+    if not variaveis.get('destinatario'):
+        raise ValueError(f"perfil {perfil_id}: falta variaveis.destinatario")
+    janela = bruto.get('janela_tom')
+    if janela is not None and (not isinstance(janela, int) or janela < 1):
+        raise ValueError(f"perfil {perfil_id}: janela_tom deve ser um inteiro >= 1")
+    agenda = bruto.get('agenda')
+    if agenda is not None and not (isinstance(agenda, dict) and all(isinstance(v, list) for v in agenda.values())):
+        raise ValueError(f"perfil {perfil_id}: agenda deve ser {{ação: [gatilhos cron]}}")
+    return {
+        "id": perfil_id,
+        "variaveis": variaveis,
+        "credenciais": bruto.get('credenciais') or f"TWITTER_{perfil_id.upper().replace('-', '_')}_",
+        "janela_tom": janela,
+        "agenda": agenda,
+        "instrucoes": dict(bruto.get('instrucoes') or {}),
+    }
+
+
+def _padrao() -> dict:
+    return {"id": PERFIL_PADRAO, "variaveis": {"destinatario": "Laura"}, "credenciais": "TWITTER_",
+            "janela_tom": None, "agenda": None, "instrucoes": {}}
+
+
+def carregar(caminho: str = None) -> dict:
+    """Lê os perfis de `caminho` (padrão PERFIS_PATH); sem o arquivo, só o perfil padrão. Retorna {id: perfil}."""
+    caminho = PERFIS_PATH if caminho is None else caminho
+    if not caminho or not os.path.exists(caminho):
+        return {PERFIL_PADRAO: _padrao()}
+    with open(caminho, encoding='utf-8') as f:
+        lista = json.load(f)
+    if not isinstance(lista, list) or not lista:
+        raise ValueError(f"{caminho}: esperado uma lista JSON com pelo menos um perfil")
+    perfis = {}
+    for bruto in lista:
+        perfil = _normalizar(bruto)
+        if perfil['id'] in perfis:
+            raise ValueError(f"{caminho}: perfil repetido: {perfil['id']}")
+        perfis[perfil['id']] = perfil
+    return perfis
+
+
+def todos() -> dict:
+    """Perfis configurados ({id: perfil}), lidos do arquivo no primeiro uso."""
+    global _perfis
+    if _perfis is None:
+        with _perfis_lock:
+            if _perfis is None:
+                _perfis = carregar()
+    return _perfis
+
+
+def definir(lista: list = None):
+    """Troca os perfis configurados (ex.: testes e benchmarks); `None` volta a ler PERFIS_PATH."""
+    global _perfis
+    with _perfis_lock:
+        _perfis = None if lista is None else {p['id']: p for p in map(_normalizar, lista)}
+
+
+def atual() -> str:
+    """Id do perfil da execução atual (padrão: PERFIL_PADRAO)."""
+    return _atual.get()
+
+
+def obter(perfil_id: str = None) -> dict:
+    """Configuração do perfil (o atual, se omitido)."""
+    perfil_id = perfil_id or atual()
+    perfil = todos().get(perfil_id)
+    if perfil is None:
+        raise ValueError(f"perfil desconhecido: {perfil_id}")
+    return perfil
+
+
+@contextmanager
+def usando(perfil_id: str = None):
+    """Executa o bloco no perfil dado (`None` mantém o atual)."""
+    if perfil_id is None:
+        yield obter()
+        return
+    perfil = obter(perfil_id)
+    token = _atual.set(perfil_id)
+    try:
+        yield perfil
+    finally:
+        _atual.reset(token)
+
+
+def credenciais(perfil_id: str = None) -> dict:
+    """Credenciais do Twitter do perfil, lidas das variáveis <prefixo><CONSUMER_KEY...> (None se faltarem)."""
+    prefixo = obter(perfil_id)['credenciais']
+    valores = {nome.lower(): os.getenv(prefixo + nome) for nome in CREDENCIAIS}
+    return valores if all(valores.values()) else None
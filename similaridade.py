@@ -0,0 +1,130 @@
+"""Similaridade entre textos curtos para detectar quase-repetições.
+
+Cada texto vira um conjunto de shingles de caracteres (texto normalizado) e uma assinatura
+MinHash de uma permutação (um hash por shingle, mínimo por bin, bins vazios densificados).
+O índice agrupa as assinaturas em bandas (LSH): só os textos que colidem em alguma banda
+são comparados pelo Jaccard exato, então a busca não percorre o histórico inteiro.
+"""
+import re
+import threading
+import unicodedata
+import zlib
+from array import array
+from collections import deque
+
+# Tamanho dos shingles de caracteres
+SHINGLE_K = 4
+
+# Bins da assinatura e bandas do LSH (BANDAS x LINHAS = NUM_BINS)
+NUM_BINS = 96
+BANDAS = 16
+LINHAS = NUM_BINS // BANDAS
+
+# Identifica os parâmetros acima; chaves gravadas com outra versão precisam ser refeitas
+VERSAO = f"k{SHINGLE_K}-b{NUM_BINS}x{BANDAS}"
+
+# Valores de um bin ficam abaixo de 2^32 / NUM_BINS; bins densificados somam múltiplos disto
+_DESLOCAMENTO = (1 << 32) // NUM_BINS + 1
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação/emojis e com espaços colapsados."""
+    base = "".join(c for c in unicodedata.normalize("NFKD", texto.lower()) if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w\s]", " ", base).split())
+
+
+def shingles(texto: str, k: int = SHINGLE_K) -> frozenset:
+    t = normalizar(texto)
+    if len(t) <= k:
+        return frozenset([t]) if t else frozenset()
+    return frozenset(t[i:i + k] for i in range(len(t) - k + 1))
+
+
+def assinatura(sh) -> tuple:
+    """Assinatura MinHash (NUM_BINS inteiros) de um conjunto de shingles; vazia para conjunto vazio."""
+    if not sh:
+        return ()
+    bins = [None] * NUM_BINS
+    for s in sh:
+        h = zlib.crc32(s.encode('utf-8'))
+        b, v = h % NUM_BINS, h // NUM_BINS
+        if bins[b] is None or v < bins[b]:
+            bins[b] = v
+    # Densificação por rotação: bin vazio copia o próximo ocupado à direita, com deslocamento pela distância
+    sig = list(bins)
+    for j in range(NUM_BINS):
+        if bins[j] is None:
+            d = 1
+            while bins[(j + d) % NUM_BINS] is None:
+                d += 1
+            sig[j] = bins[(j + d) % NUM_BINS] + d * _DESLOCAMENTO
+    return tuple(sig)
+
+
+def chaves_lsh(sig: tuple) -> list:
+    """Uma chave inteira por banda da assinatura (estável entre processos, pode ir para o banco)."""
+    if not sig:
+        return []
+    return [zlib.crc32(array('Q', sig[i * LINHAS:(i + 1) * LINHAS]).tobytes()) for i in range(BANDAS)]
+
+
+def chaves_banco(texto: str):
+    """(shingles, chaves) do texto, com o número da banda nos bits altos de cada chave (uma coluna no SQLite)."""
+    sh = shingles(texto)
+    return sh, [(banda << 32) | chave for banda, chave in enumerate(chaves_lsh(assinatura(sh)))]
+
+
+def jaccard(a, b) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class IndiceLSH:
+    """Índice em memória dos últimos `max_itens` textos; `similares` devolve [(id, jaccard)]."""
+
+    def __init__(self, max_itens: int = None):
+        self.max_itens = max_itens
+        self._buckets = {}   # (banda, chave) -> set(ids)
+        self._itens = {}     # id -> (shingles, chaves)
+        self._ordem = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def adicionar(self, item_id, texto: str):
+        sh = shingles(texto)
+        chaves = chaves_lsh(assinatura(sh))
+        with self._lock:
+            if item_id in self._itens:
+                return
+            self._itens[item_id] = (sh, chaves)
+            self._ordem.append(item_id)
+            for banda, chave in enumerate(chaves):
+                self._buckets.setdefault((banda, chave), set()).add(item_id)
+            while self.max_itens and len(self._ordem) > self.max_itens:
+                self._remover(self._ordem.popleft())
+
+    def _remover(self, item_id):
+        _, chaves = self._itens.pop(item_id)
+        for banda, chave in enumerate(chaves):
+            bucket = self._buckets.get((banda, chave))
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._buckets[(banda, chave)]
+
+    def similares(self, texto: str, limiar: float = 0.0) -> list:
+        sh = shingles(texto)
+        chaves = chaves_lsh(assinatura(sh))
+        with self._lock:
+            candidatos = set()
+            for banda, chave in enumerate(chaves):
+                candidatos.update(self._buckets.get((banda, chave), ()))
+            pares = [(c, jaccard(sh, self._itens[c][0])) for c in candidatos]
+        return sorted((p for p in pares if p[1] >= limiar), key=lambda p: p[1], reverse=True)
+
+    def max_similaridade(self, texto: str) -> float:
+        pares = self.similares(texto)
+        return pares[0][1] if pares else 0.0
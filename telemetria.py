@@ -0,0 +1,172 @@
+"""Tracing e métricas das execuções do bot.
+
+Cada execução (ex.: `run_action`) abre um trace; as fases dentro dela abrem spans com
+duração, tokens e resultado. Ao fim do trace, uma linha JSON vai para TRACE_JSONL_PATH e os
+agregados são reescritos em formato texto do Prometheus em METRICS_PROM_PATH.
+Caminho vazio desativa a saída correspondente.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACE_JSONL_PATH = os.getenv('TRACE_JSONL_PATH', os.path.join(_BASE_DIR, 'traces.jsonl'))
+METRICS_PROM_PATH = os.getenv('METRICS_PROM_PATH', os.path.join(_BASE_DIR, 'metrics.prom'))
+
+# Limites superiores (s) dos buckets do histograma de duração dos spans
+BUCKETS_S = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+_trace_atual = contextvars.ContextVar('telemetria_trace', default=None)
+_span_atual = contextvars.ContextVar('telemetria_span', default=None)
+
+_lock = threading.Lock()
+# Escrita do snapshot de métricas: gerar, gravar e trocar o arquivo sem outro trace no meio
+_metricas_lock = threading.Lock()
+# Agregados por (trace, span, outcome): {"n": int, "soma_s": float, "buckets": [...], "tokens": {tipo: n}}
+_agregados = {}
+
+
+def _agregar(trace_nome: str, span: dict):
+    chave = (trace_nome, span['nome'], span['outcome'])
+    with _lock:
+        a = _agregados.get(chave)
+        if a is None:
+            a = _agregados[chave] = {"n": 0, "soma_s": 0.0, "buckets": [0] * len(BUCKETS_S), "tokens": {}}
+        a["n"] += 1
+        a["soma_s"] += span['duracao_ms'] / 1000
+        for i, limite in enumerate(BUCKETS_S):
+            if span['duracao_ms'] / 1000 <= limite:
+                a["buckets"][i] += 1
+                break
+        for tipo, n in (span.get('tokens') or {}).items():
+            a["tokens"][tipo] = a["tokens"].get(tipo, 0) + n
+
+
+@contextmanager
+def span(nome: str, **attrs):
+    """Mede uma fase. O dict devolvido pode receber atributos; exceções marcam outcome='erro'."""
+    s = {"nome": nome, **attrs, "outcome": "ok"}
+    token = _span_atual.set(s)
+    inicio = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s["outcome"] = "erro"
+        s["erro"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+        _span_atual.reset(token)
+        trace_atual = _trace_atual.get()
+        if trace_atual is not None:
+            with _lock:
+                trace_atual["spans"].append(s)
+            _agregar(trace_atual["nome"], s)
+        else:
+            _agregar("-", s)
+
+
+def anotar(**attrs):
+    """Acrescenta atributos ao span atual (se houver)."""
+    s = _span_atual.get()
+    if s is not None:
+        s.update(attrs)
+
+
+def anotar_uso(completion):
+    """Soma o uso de tokens de uma resposta do LLM ao span atual."""
+    s = _span_atual.get()
+    usage = getattr(completion, 'usage', None)
+    if s is None or usage is None:
+        return
+    tokens = s.setdefault("tokens", {})
+    detalhes = getattr(usage, 'prompt_tokens_details', None)
+    for tipo, valor in (
+        ("prompt", getattr(usage, 'prompt_tokens', None)),
+        ("completion", getattr(usage, 'completion_tokens', None)),
+        ("cached", getattr(detalhes, 'cached_tokens', None)),
+    ):
+        if valor:
+            tokens[tipo] = tokens.get(tipo, 0) + valor
+
+
+@contextmanager
+def trace(nome: str, **attrs):
+    """Abre um trace (uma execução); ao fechar grava a linha JSONL e o arquivo Prometheus."""
+    t = {
+        "trace_id": uuid.uuid4().hex,
+        "nome": nome,
+        **attrs,
+        "inicio": datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        "outcome": "ok",
+        "spans": [],
+    }
+    token = _trace_atual.set(t)
+    inicio = time.perf_counter()
+    try:
+        yield t
+    except BaseException as e:
+        t["outcome"] = "erro"
+        t["erro"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        t["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+        _trace_atual.reset(token)
+        _agregar(nome, {"nome": "total", "outcome": t["outcome"], "duracao_ms": t["duracao_ms"]})
+        _gravar(t)
+
+
+def _gravar(t: dict):
+    try:
+        if TRACE_JSONL_PATH:
+            with _lock, open(TRACE_JSONL_PATH, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(t, ensure_ascii=False, default=str) + "\n")
+        if METRICS_PROM_PATH:
+            # Um .tmp só para o processo; o lock garante que o snapshot mais novo é o último a entrar
+            with _metricas_lock:
+                tmp = f"{METRICS_PROM_PATH}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(prometheus())
+                os.replace(tmp, METRICS_PROM_PATH)
+    except Exception as e:
+        print(f"⚠️ Erro ao gravar telemetria: {e}")
+
+
+def _fmt_le(limite: float) -> str:
+    return "+Inf" if limite == float('inf') else repr(float(limite))
+
+
+def prometheus() -> str:
+    """Agregados no formato texto do Prometheus (spans, chamadas LLM por ponto de chamada e cache do classificador)."""
+    linhas = [
+        "# HELP laura_span_duration_seconds Duração das fases de cada execução.",
+        "# TYPE laura_span_duration_seconds histogram",
+    ]
+    tokens = []
+    with _lock:
+        itens = sorted(_agregados.items())
+        for (trace_nome, span_nome, outcome), a in itens:
+            rotulos = f'trace="{trace_nome}",span="{span_nome}",outcome="{outcome}"'
+            acumulado = 0
+            for limite, n in zip(BUCKETS_S, a["buckets"]):
+                acumulado += n
+                linhas.append(f'laura_span_duration_seconds_bucket{{{rotulos},le="{_fmt_le(limite)}"}} {acumulado}')
+            linhas.append(f"laura_span_duration_seconds_sum{{{rotulos}}} {a['soma_s']:.6f}")
+            linhas.append(f"laura_span_duration_seconds_count{{{rotulos}}} {a['n']}")
+            for tipo, n in sorted(a["tokens"].items()):
+                tokens.append(f'laura_tokens_total{{trace="{trace_nome}",span="{span_nome}",tipo="{tipo}"}} {n}')
+    if tokens:
+        linhas += ["# HELP laura_tokens_total Tokens consumidos por fase.", "# TYPE laura_tokens_total counter"] + tokens
+
+    import llm
+    if llm.metricas:
+        linhas += ["# HELP laura_llm_calls_total Chamadas ao LLM por ponto de chamada.", "# TYPE laura_llm_calls_total counter"]
+        for site, m in sorted(llm.metricas.items()):
+            for campo in ("chamadas", "erros", "tentativas", "fallbacks"):
+                linhas.append(f'laura_llm_calls_total{{call_site="{site}",tipo="{campo}"}} {m[campo]}')
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,114 @@
+"""Classificador de tom local (sem rede) usado antes de recorrer ao LLM.
+
+Modelo linear no espaço log (Naive Bayes multinomial com presença de features) sobre
+palavras, emojis e pontuação. Começa com sementes de vocabulário por tom e é treinado com o
+histórico rotulado do banco (tom em 'type' e classificações do LLM em cache).
+"""
+import math
+import re
+import unicodedata
+
+# Vocabulário inicial de cada tom (somado ao nome e à diretriz do catálogo)
+SEMENTES = {
+    "romantico_leve": "amor coracao carinho saudade sorriso lindo linda meu mundo sonho juntos ❤️ 💕 💖 🌹 😍",
+    "bem_humorado_memes": "kkk kkkk rs meme bugou real oficial zero chance plot twist modo ativado 😂 🤣 💀 😅",
+    "fofo_carinho": "fofinha fofura abracinho cheirinho beijinho docinho cuidadinho coisinha 🥺 🧸 🥰 🤗 💗",
+    "pimenta_suave": "provocar olhar perigosa tentacao pensando arrepio desejo boca 😏 🔥 😈 💋",
+    "poetico_simples": "lua estrelas estrela ceu luz mar brisa poesia verso flor amanhecer horizonte 🌙 ✨ 🌿 🌸 🌅",
+    "zoeira_respeitosa": "zoeira zoar doida folgada preguicosa mentira confessa admite duvido 😜 🙃 😝 🤭",
+    "sincero_direto": "simples verdade sincero queria dizer direto importante obrigado sempre",
+    "brincalhao_energia": "bora energia partiu animada vamo vamos agito pique alto astral 🎉 🚀 ⚡ 🥳 💥",
+    "calmo_acolhedor": "calma tranquila descansa respira paz abraco cobertor sossego aconchego silencio 😴 ☕ 🛌 🌙",
+    "confiante_sedutor": "charme elegante encantadora irresistivel confianca sabe sabia perigo 😎 😉 💋 🖤",
+}
+
+# Peso das sementes frente a um tweet real do histórico
+PESO_SEMENTE = 3
+
+# Palavras que indicam a ação (bom dia, sexta...) ou são genéricas, não o tom
+STOPWORDS = set(
+    "que com para por uma uns umas dos das nos nas seu sua seus suas voce voces mais mas como quando "
+    "tem ter ser esta esse essa isso aqui ali bem tao muito pra pro pros pras sem ate nao sim "
+    "laura bom boa dia tarde noite sexta feira sextou hoje agora hora horas fez quem ainda todo toda "
+    "mensagem tom leve jovem evitar exagero moderados moderadas".split()
+)
+
+
+def _sem_acentos(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def _eh_emoji(c: str) -> bool:
+    return ord(c) >= 0x1F000 or unicodedata.category(c) == "So"
+
+
+def features(texto: str) -> set:
+    """Conjunto de features do texto: palavras, emojis e sinais de pontuação/risada."""
+    base = _sem_acentos(texto.lower())
+    feats = {w for w in re.findall(r"[a-z]{3,}", base) if w not in STOPWORDS}
+    feats.update(f"emo:{c}" for c in texto if _eh_emoji(c))
+    if texto.count("!") >= 2:
+        feats.add("pont:!!")
+    elif "!" in texto:
+        feats.add("pont:!")
+    if "..." in texto or "…" in texto:
+        feats.add("pont:...")
+    if re.search(r"k{3,}|\brs+\b|haha", base):
+        feats.add("riso")
+    return feats
+
+
+class ClassificadorLocal:
+    """Classificador de tom em memória. `prever` devolve (key, confiança em [0, 1])."""
+
+    def __init__(self, tones: list, alpha: float = 0.5):
+        self.keys = [t["key"] for t in tones]
+        self.alpha = alpha
+        self._contagens = {k: {} for k in self.keys}
+        self._totais = {k: 0 for k in self.keys}
+        self.exemplos = 0
+        for t in tones:
+            semente = f"{t['nome']} {t['diretriz']} {SEMENTES.get(t['key'], '')}"
+            self._adicionar(semente, t["key"], PESO_SEMENTE)
+        self._compilar()
+
+    def _adicionar(self, texto: str, key: str, peso: int = 1):
+        contagem = self._contagens[key]
+        for f in features(texto):
+            contagem[f] = contagem.get(f, 0) + peso
+            self._totais[key] += peso
+
+    def _compilar(self):
+        vocab = set()
+        for contagem in self._contagens.values():
+            vocab.update(contagem)
+        v = max(1, len(vocab))
+        self._log_prob = {}
+        self._log_desconhecida = {}
+        for k in self.keys:
+            denom = self._totais[k] + self.alpha * v
+            self._log_prob[k] = {f: math.log((n + self.alpha) / denom) for f, n in self._contagens[k].items()}
+            self._log_desconhecida[k] = math.log(self.alpha / denom)
+
+    def treinar(self, exemplos):
+        """Acrescenta exemplos [(texto, key)] ao modelo; keys fora do catálogo são ignoradas."""
+        for texto, key in exemplos:
+            if key in self._contagens and texto:
+                self._adicionar(texto, key)
+                self.exemplos += 1
+        self._compilar()
+        return self
+
+    def prever(self, texto: str):
+        feats = features(texto)
+        if not feats:
+            return None, 0.0
+        scores = {}
+        for k in self.keys:
+            probs = self._log_prob[k]
+            desconhecida = self._log_desconhecida[k]
+            scores[k] = sum(probs.get(f, desconhecida) for f in feats)
+        melhor = max(scores, key=scores.get)
+        topo = scores[melhor]
+        soma = sum(math.exp(s - topo) for s in scores.values())
+        return melhor, 1.0 / soma